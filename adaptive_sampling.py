@@ -0,0 +1,211 @@
+import argparse
+import json
+import math
+import os
+import sys
+import uuid
+
+import numpy as np
+import pandas as pd
+from scipy.stats import t as student_t
+
+from arm_settings import ARM_KEYS, parse_arm
+from results_io import per_turn_values, write_run_metadata
+
+DEFAULT_ALPHA = 0.05
+MIN_RUNS = 3
+DEFAULT_TARGET_PCT = 10.0
+
+
+def max_looks(min_runs, max_runs, batch):
+    """Number of interim analyses: after min_runs, then every batch runs up to max_runs"""
+    return 1 + math.ceil(max(0, max_runs - min_runs) / batch)
+
+
+def look_alpha(alpha, looks, comparisons):
+    """
+    Error rate of each interval at each look. Bonferroni over every look and every turn keeps the chance
+    that any interval ever misses its mean below alpha, so stopping whenever they are narrow enough is valid.
+    """
+    return alpha / (looks * comparisons)
+
+
+def t_interval(values, alpha):
+    """(mean, half width) of the Student t interval of the mean"""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n < 2:
+        return float(values.mean()) if n else float('nan'), float('inf')
+    half_width = student_t.ppf(1 - alpha / 2, n - 1) * values.std(ddof=1) / math.sqrt(n)
+    return float(values.mean()), float(half_width)
+
+
+def welch_interval(a, b, alpha):
+    """(mean(b) - mean(a), half width) of the Welch t interval of the difference"""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    if len(a) < 2 or len(b) < 2:
+        return float('nan'), float('inf')
+    va, vb = a.var(ddof=1) / len(a), b.var(ddof=1) / len(b)
+    diff = float(b.mean() - a.mean())
+    if va + vb == 0:
+        return diff, 0.0
+    dof = (va + vb) ** 2 / (va ** 2 / (len(a) - 1) + vb ** 2 / (len(b) - 1))
+    return diff, float(student_t.ppf(1 - alpha / 2, dof) * math.sqrt(va + vb))
+
+
+def target_met(center, half_width, reference, target_pct=None, target_seconds=None):
+    """Half width within target_seconds, or within target_pct of the reference mean"""
+    if target_seconds is not None:
+        return half_width <= target_seconds
+    return half_width <= abs(reference) * target_pct / 100
+
+
+def precision_table(frames, metric, alpha, target_pct=None, target_seconds=None):
+    """
+    Per-turn intervals at the current look. One arm: interval of the mean; two arms: interval of
+    the difference (second minus first), relative to the first arm's mean. Returns (all_met, rows).
+    """
+    values = [per_turn_values(df, metric) for df in frames]
+    rows = []
+    for turn in sorted(values[0]):
+        if len(values) == 1:
+            center, half_width = t_interval(values[0][turn], alpha)
+            reference = center
+        else:
+            center, half_width = welch_interval(values[0][turn], values[1].get(turn, []), alpha)
+            reference = float(np.mean(values[0][turn]))
+        rows.append({"turn": turn, "center": center, "half_width": half_width,
+                     "met": target_met(center, half_width, reference, target_pct, target_seconds)})
+    return bool(rows) and all(row["met"] for row in rows), rows
+
+
+def run_adaptive(run_one, arm_names, n_turns, metric="ttft", alpha=DEFAULT_ALPHA, min_runs=MIN_RUNS,
+                 max_runs=20, batch=1, target_pct=DEFAULT_TARGET_PCT, target_seconds=None):
+    """
+    Run conversations of every arm (alternating, so drift hits both arms alike) until every per-turn
+    interval meets the target or max_runs is reached. run_one(arm_name, exp_num) returns turn rows.
+    Returns (frames per arm, history of looks).
+    """
+    if min_runs < 2:
+        raise ValueError("Intervals need at least 2 runs per arm")
+    looks = max_looks(min_runs, max_runs, batch)
+    alpha_per_look = look_alpha(alpha, looks, n_turns)
+    rows = {name: [] for name in arm_names}
+    history = []
+
+    runs = 0
+    while runs < max_runs:
+        step = min_runs if runs == 0 else min(batch, max_runs - runs)
+        for exp_num in range(runs, runs + step):
+            for name in arm_names:
+                rows[name].extend(run_one(name, exp_num))
+        runs += step
+
+        frames = [pd.DataFrame(rows[name]) for name in arm_names]
+        done, table = precision_table(frames, metric, alpha_per_look, target_pct, target_seconds)
+        widest = max(table, key=lambda row: row["half_width"])
+        history.append({"runs": runs, "alpha_per_interval": alpha_per_look, "met": done, "intervals": table})
+        print(f"  look {len(history)}/{looks}: {runs} runs per arm, widest interval turn {widest['turn']} "
+              f"{widest['center']:.3f} +/- {widest['half_width']:.3f}s, "
+              f"{sum(row['met'] for row in table)}/{len(table)} turns on target")
+        if done:
+            break
+    return {name: pd.DataFrame(rows[name]) for name in arm_names}, history
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="Run experiments until per-turn confidence intervals are narrow enough.")
+    parser.add_argument("--arm", nargs="+", action="append", metavar="NAME [KEY=VALUE ...]",
+                        help=f"Configuration to measure ({', '.join(ARM_KEYS)}); give two to estimate their "
+                             f"difference")
+    parser.add_argument("--metric", default="ttft")
+    parser.add_argument("--target-pct", type=float, default=DEFAULT_TARGET_PCT,
+                        help="Stop once every half width is within this percent of the (first arm's) mean")
+    parser.add_argument("--target-seconds", type=float, help="Absolute half width target instead")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA,
+                        help="Overall error rate, split over every look and turn")
+    parser.add_argument("--min-runs", type=int, default=MIN_RUNS)
+    parser.add_argument("--max-runs", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=1, help="Runs per arm between looks")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--model", default="us.anthropic.claude-3-7-sonnet-20250219-v1:0")
+    parser.add_argument("--region", default="us-west-2")
+    parser.add_argument("--endpoint-url")
+    parser.add_argument("--local", action="store_true", help="Start an in-process local stand-in endpoint")
+    parser.add_argument("--local-time-scale", type=float, default=1.0)
+    parser.add_argument("--ttl", choices=["5m", "1h"], default="5m")
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--document", default="RomeoAndJuliet.txt")
+    parser.add_argument("--result-dir", default="adaptive")
+    args = parser.parse_args(argv)
+
+    try:
+        arms = dict(parse_arm(values) for values in (args.arm or [["default"]]))
+    except ValueError as e:
+        parser.error(str(e))
+    if len(arms) > 2:
+        parser.error("Give one arm (interval of the mean) or two (interval of the difference)")
+
+    from benchmark_runner import DEFAULT_SYSTEM_PROMPT, make_bedrock_client, make_cache_control, run_conversation
+
+    local_server = None
+    endpoint_url = args.endpoint_url
+    if args.local:
+        from local_bedrock_server import LocalBedrockServer
+        local_server = LocalBedrockServer(profile={"time_scale": args.local_time_scale}).start()
+        endpoint_url = local_server.url
+
+    run_tag = uuid.uuid4().hex[:8]
+    settings = {}
+    for name, overrides in arms.items():
+        arm = dict({"model": args.model, "region": args.region, "endpoint_url": endpoint_url, "ttl": args.ttl,
+                    "max_tokens": args.max_tokens, "document": args.document}, **overrides)
+        with open(arm["document"], 'r') as file:
+            arm["sample_text"] = file.read()
+        arm["client"] = make_bedrock_client(arm["region"], base_url=arm["endpoint_url"])
+        settings[name] = arm
+
+    def run_one(name, exp_num):
+        arm = settings[name]
+        # Arms must not read each other's cache entries
+        return run_conversation(arm["client"], arm["model"], arm["sample_text"], exp_num, args.turns,
+                                cache_control=make_cache_control(arm["ttl"]), max_tokens=arm["max_tokens"],
+                                system_prompt=f"{DEFAULT_SYSTEM_PROMPT} [run {run_tag} {name}]")
+
+    frames, history = run_adaptive(run_one, list(settings), args.turns, metric=args.metric, alpha=args.alpha,
+                                   min_runs=args.min_runs, max_runs=args.max_runs, batch=args.batch,
+                                   target_pct=args.target_pct, target_seconds=args.target_seconds)
+
+    for name, df in frames.items():
+        folder = os.path.join(args.result_dir, name)
+        arm = settings[name]
+        write_run_metadata(folder, {"model": arm["model"], "provider": "bedrock", "endpoint": arm["endpoint_url"],
+                                    "policy": "sliding-window", "cache_ttl": arm["ttl"],
+                                    "n_experiments": int(df['experiment'].nunique()), "n_turns": args.turns,
+                                    "adaptive": True})
+        for exp_num, conversation in df.groupby('experiment'):
+            conversation.to_csv(f"{folder}/cache_experiment_results_adaptive_{exp_num - 1}.csv", index=False)
+    with open(os.path.join(args.result_dir, "adaptive_looks.json"), "w") as f:
+        json.dump({"arms": list(settings), "metric": args.metric, "alpha": args.alpha, "looks": history}, f,
+                  indent=2, default=float)
+
+    final = history[-1]
+    label = args.metric if len(settings) == 1 else f"{args.metric} difference ({' - '.join(reversed(list(settings)))})"
+    print(f"\n=== {label}: {'target met' if final['met'] else 'stopped at --max-runs'} after {final['runs']} runs "
+          f"per arm ({(1 - args.alpha):.0%} simultaneous intervals) ===")
+    print(f"{'Turn':>4s} | {'Estimate':>9s} | {'Half width':>10s} | {'Interval':>21s} | Target")
+    print("-" * 64)
+    for row in final["intervals"]:
+        low, high = row["center"] - row["half_width"], row["center"] + row["half_width"]
+        print(f"{row['turn']:4d} | {row['center']:8.3f}s | {row['half_width']:9.3f}s | "
+              f"[{low:8.3f}, {high:8.3f}] | {'met' if row['met'] else '-'}")
+
+    if local_server is not None:
+        local_server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
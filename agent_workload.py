@@ -0,0 +1,177 @@
+import argparse
+import os
+import random
+import sys
+import uuid
+
+# Where the shared prefix (tools, then system) gets breakpoints; the turns keep the rest of the budget of 4
+PREFIX_POLICIES = {
+    "none": (),                        # Nothing cached ahead of the conversation
+    "tools": ("tools",),               # Tool definitions only
+    "system": ("system",),             # One breakpoint after the system prompt (tools + system together)
+    "tools+system": ("tools", "system"),  # Separately, so a system prompt change keeps the tools cached
+}
+
+TOPICS = ["refunds", "shipping delays", "account security", "billing disputes", "subscription changes",
+          "warranty claims", "product recalls", "data privacy requests", "escalations", "loyalty points",
+          "gift cards", "international orders", "damaged items", "price matching", "accessibility requests"]
+RULES = ["Always confirm the customer's identity before discussing {topic}.",
+         "Quote the relevant policy section when explaining decisions about {topic}.",
+         "Never promise timelines for {topic} that the tools cannot confirm.",
+         "Escalate {topic} cases older than 30 days to a human supervisor.",
+         "Summarize the resolution of {topic} in one sentence at the end of the reply.",
+         "For {topic}, check the order history tool before answering.",
+         "Document every exception granted for {topic} in the case notes.",
+         "Use plain language and avoid internal jargon when handling {topic}."]
+
+ACTIONS = ["lookup", "update", "cancel", "refund", "escalate", "search", "create", "verify", "list", "schedule"]
+ENTITIES = ["order", "customer", "shipment", "invoice", "ticket", "subscription", "warranty", "return",
+            "payment_method", "loyalty_account"]
+FIELD_TYPES = ["string", "integer", "boolean", "number"]
+
+
+def build_system_prompt(n_sections=40, seed=0):
+    """Deterministic support-agent system prompt of roughly 100 tokens per section"""
+    rng = random.Random(seed)
+    parts = ["You are a customer support agent for an online retailer. Follow every policy below."]
+    for i in range(n_sections):
+        topic = TOPICS[i % len(TOPICS)]
+        rules = rng.sample(RULES, 4)
+        parts.append(f"\n## Policy {i + 1}: {topic}\n" + "\n".join(f"- {rule.format(topic=topic)}" for rule in rules))
+    return "\n".join(parts)
+
+
+def build_tools(n_tools=20, seed=0):
+    """Deterministic tool definitions with JSON-schema inputs (the tools block of a request)"""
+    rng = random.Random(seed)
+    tools = []
+    for i in range(n_tools):
+        action, entity = ACTIONS[i % len(ACTIONS)], ENTITIES[(i // len(ACTIONS) + i) % len(ENTITIES)]
+        properties = {f"{entity}_id": {"type": "string", "description": f"Identifier of the {entity}."}}
+        for j in range(rng.randint(3, 7)):
+            field_type = rng.choice(FIELD_TYPES)
+            properties[f"{action}_option_{j + 1}"] = {
+                "type": field_type,
+                "description": f"Optional {field_type} setting {j + 1} that controls how the {entity} {action} "
+                               f"is performed; see the {TOPICS[(i + j) % len(TOPICS)]} policy.",
+            }
+        tools.append({
+            "name": f"{action}_{entity}",
+            "description": f"{action.capitalize()} a {entity.replace('_', ' ')} in the support back office. "
+                           f"Use it only after verifying the customer, and report its result verbatim.",
+            "input_schema": {"type": "object", "properties": properties, "required": [f"{entity}_id"]},
+        })
+    return tools
+
+
+def apply_prefix_policy(system_prompt, tools, policy, cache_control, tag=None):
+    """
+    System blocks and tool definitions with the policy's breakpoints (on the last tool and/or the system block).
+    A tag, written into the first tool and the system prompt, keeps separate runs from sharing cache entries.
+    """
+    tools = [dict(tool) for tool in tools]
+    system_text = system_prompt
+    if tag:
+        system_text = f"[{tag}] {system_prompt}"
+        if tools:
+            tools[0]["description"] = f"[{tag}] {tools[0]['description']}"
+    system = [{"type": "text", "text": system_text}]
+
+    placements = PREFIX_POLICIES[policy]
+    if "tools" in placements and tools:
+        tools[-1]["cache_control"] = dict(cache_control)
+    if "system" in placements:
+        system[-1]["cache_control"] = dict(cache_control)
+    return system, tools
+
+
+def summarize_policy(df):
+    """TTFT and cache tokens of first turns (new conversation) and later turns"""
+    first = df[df['turn'] == 1]
+    later = df[df['turn'] > 1]
+    return {
+        'conversations': df['experiment'].nunique(),
+        'first_turn_ttft': first['ttft'].mean(),
+        'first_turn_ttft_after_first': first[first['experiment'] > 1]['ttft'].mean(),
+        'later_turn_ttft': later['ttft'].mean() if len(later) else float('nan'),
+        'first_turn_cache_read': first['cache_read_input_tokens'].mean(),
+        'first_turn_cache_write': first['cache_creation_input_tokens'].mean(),
+    }
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="Cache system prompt and tool definitions shared by conversations over different documents.")
+    parser.add_argument("--policies", nargs="+", choices=list(PREFIX_POLICIES), default=list(PREFIX_POLICIES))
+    parser.add_argument("--conversations", type=int, default=6)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--system-sections", type=int, default=40, help="About 100 tokens each")
+    parser.add_argument("--tools", type=int, default=20)
+    parser.add_argument("--system-variants", type=int, default=1,
+                        help="Distinct system prompts (e.g. per tenant) rotating over the conversations; tools stay shared")
+    parser.add_argument("--documents", nargs="+", default=["RomeoAndJuliet.txt"],
+                        help="Document files (a single file is split into one part per conversation)")
+    parser.add_argument("--model", default="us.anthropic.claude-3-7-sonnet-20250219-v1:0")
+    parser.add_argument("--region", default="us-west-2")
+    parser.add_argument("--endpoint-url", help="Bedrock-compatible endpoint, e.g. `cli.py simulate`")
+    parser.add_argument("--ttl", choices=["5m", "1h"], default="5m")
+    parser.add_argument("--result-dir", default="agent_workload")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from benchmark_runner import make_bedrock_client, make_cache_control, run_conversation
+    from prefix_planner import load_documents
+    from results_io import write_run_metadata
+
+    documents = list(load_documents(args.documents, args.conversations).values())
+    system_prompt = build_system_prompt(args.system_sections)
+    tools = build_tools(args.tools)
+    cache_control = make_cache_control(args.ttl)
+    client = make_bedrock_client(args.region, base_url=args.endpoint_url)
+    run_tag = uuid.uuid4().hex[:8]
+
+    rows = []
+    for policy in args.policies:
+        folder = os.path.join(args.result_dir, policy.replace("+", "_"))
+        os.makedirs(folder, exist_ok=True)
+        write_run_metadata(folder, {"model": args.model, "provider": "bedrock", "endpoint": args.endpoint_url,
+                                    "policy": f"prefix-{policy}", "cache_ttl": args.ttl,
+                                    "n_experiments": args.conversations, "n_turns": args.turns,
+                                    "system_sections": args.system_sections, "tools": args.tools,
+                                    "system_variants": args.system_variants})
+        frames = []
+        for i in range(args.conversations):
+            print(f"[{policy}] Conversation {i + 1}/{args.conversations}")
+            variant = i % args.system_variants
+            system, policy_tools = apply_prefix_policy(f"{system_prompt}\n\nTenant: {variant + 1}", tools, policy,
+                                                       cache_control, tag=f"run {run_tag} {policy}")
+            document = documents[i % len(documents)]
+            turn_rows = run_conversation(client, args.model, document, i, args.turns, cache_control=cache_control,
+                                         system_prompt=system, tools=policy_tools)
+            df = pd.DataFrame(turn_rows)
+            df.to_csv(f"{folder}/cache_experiment_results_agent_workload_{i}.csv", index=False)
+            frames.append(df)
+        rows.append({'policy': policy, **summarize_policy(pd.concat(frames, ignore_index=True))})
+
+    summary = pd.DataFrame(rows)
+    if 'none' in summary['policy'].values:
+        baseline = summary.loc[summary['policy'] == 'none', 'first_turn_ttft_after_first'].iloc[0]
+        summary['first_turn_ttft_saved'] = baseline - summary['first_turn_ttft_after_first']
+
+    print(f"\n=== Shared system/tools caching ({args.system_sections} policy sections, {args.tools} tools) ===")
+    print(f"{'Policy':14s} | {'1st-turn TTFT':>13s} | {'Conv 2+ 1st':>12s} | {'Later TTFT':>10s} | "
+          f"{'1st read':>8s} | {'1st write':>9s} | {'Saved':>7s}")
+    print("-" * 95)
+    for row in summary.to_dict('records'):
+        saved = row.get('first_turn_ttft_saved', float('nan'))
+        print(f"{row['policy']:14s} | {row['first_turn_ttft']:12.3f}s | {row['first_turn_ttft_after_first']:11.3f}s | "
+              f"{row['later_turn_ttft']:9.3f}s | {row['first_turn_cache_read']:8.0f} | "
+              f"{row['first_turn_cache_write']:9.0f} | {saved:6.3f}s")
+    summary.to_csv(os.path.join(args.result_dir, "summary.csv"), index=False)
+    print(f"\nSaved per-policy results and '{os.path.join(args.result_dir, 'summary.csv')}'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
 import os
@@ -8,6 +9,23 @@ import glob
 folders = ['37_250627_ttft', '37_250627_1p_ttft']
 date = '250630'
 
+# Backends that cannot open a window; plt.show() is skipped for them
+NON_INTERACTIVE_BACKENDS = ('agg', 'pdf', 'ps', 'svg', 'cairo', 'pgf', 'template')
+
+def folder_colors(n):
+    """Return n distinct colors, falling back to a continuous colormap beyond the qualitative palettes"""
+    if n <= 10:
+        return [plt.cm.tab10(i) for i in range(n)]
+    if n <= 20:
+        return [plt.cm.tab20(i) for i in range(n)]
+    return [plt.cm.viridis(x) for x in np.linspace(0, 1, n)]
+
+def show_figure(fig):
+    """Display the figure only on interactive backends so headless runs never block"""
+    if matplotlib.get_backend().lower() not in NON_INTERACTIVE_BACKENDS:
+        plt.show()
+    plt.close(fig)
+
 def calculate_generation_time_differences():
     """
     Calculate turn-by-turn averages of Generation Time (Latency - TTFT) for each folder
@@ -283,7 +301,7 @@ def plot_comparison_metrics():
     fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(20, 6))
     
     # Color settings
-    colors = ['blue', 'red', 'green']
+    colors = folder_colors(len(folders))
     
     for idx, folder in enumerate(folders):
         csv_files = glob.glob(os.path.join(folder, "*.csv"))
@@ -398,7 +416,7 @@ def plot_comparison_metrics():
     # Save and display graph
     plt.tight_layout()
     plt.savefig(f'performance_comparison_{date}.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    show_figure(fig)
     
     print(f"\nGraph saved as 'performance_comparison_{date}.png'.")
     
@@ -446,7 +464,7 @@ def plot_cache_metrics():
     """Cache-related metrics comparison graph"""
     
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
-    colors = ['blue', 'red', 'green']
+    colors = folder_colors(len(folders))
     
     for idx, folder in enumerate(folders):
         csv_files = glob.glob(os.path.join(folder, "*.csv"))
@@ -505,7 +523,7 @@ def plot_cache_metrics():
     
     plt.tight_layout()
     plt.savefig(f'cache_metrics_comparison_{date}.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    show_figure(fig)
     
     print(f"\nCache metrics graph saved as 'cache_metrics_comparison_{date}.png'.")
 
@@ -517,7 +535,7 @@ def plot_generation_time_and_tokens_comparison():
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
     
     # Color settings
-    colors = ['blue', 'red', 'green']
+    colors = folder_colors(len(folders))
     
     for idx, folder in enumerate(folders):
         csv_files = glob.glob(os.path.join(folder, "*.csv"))
@@ -600,7 +618,7 @@ def plot_generation_time_and_tokens_comparison():
     # Save and display graph
     plt.tight_layout()
     plt.savefig(f'generation_time_tokens_comparison_{date}.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    show_figure(fig)
     
     print(f"\nGeneration Time & Milliseconds per token graph saved as 'generation_time_tokens_comparison_{date}.png'.")
 
@@ -0,0 +1,16 @@
+# Settings an arm may override (see parse_arm); kept free of heavy imports for the shard planner
+ARM_KEYS = {"model": str, "region": str, "endpoint_url": str, "ttl": str, "max_tokens": int, "document": str}
+
+
+def parse_arm(values):
+    """['name', 'key=value', ...] -> (name, overrides)"""
+    name, overrides = values[0], {}
+    for item in values[1:]:
+        key, _, value = item.partition("=")
+        if key not in ARM_KEYS:
+            raise ValueError(f"Unknown arm setting '{key}' (one of {', '.join(ARM_KEYS)})")
+        try:
+            overrides[key] = ARM_KEYS[key](value)
+        except ValueError:
+            raise ValueError(f"Bad value '{value}' for arm setting '{key}'") from None
+    return name, overrides
@@ -0,0 +1,720 @@
+import argparse
+import copy
+import logging
+import os
+import random
+import sys
+import time
+from functools import wraps
+
+from run_log import configure_logging, get_logger, log_event, shutdown_logging
+from tracing import shutdown_tracing, span
+
+log = get_logger()
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant that answers questions concisely."
+
+# We'll use different questions for each turn to simulate a real conversation
+QUESTIONS = [
+    "Please summarize the storyline of the play.",
+    "Who are the main characters in the tragedy?",
+    "Why are the Montagues and Capulets in conflict with each other?",
+    "What role does the Nurse play in Juliet's life?",
+    "How does Romeo respond after killing Tybalt?",
+    "What advice does Friar Lawrence give to Romeo after his banishment?",
+    "Why does Paris visit the Capulet tomb in the final scene?",
+    "What message fails to reach Romeo and what are the consequences?",
+    "How do the parents react to finding their children dead?",
+    "What reconciliation occurs between the families at the end of the play?"
+]
+
+# Breakpoint budget of the Messages API
+MAX_CACHE_BREAKPOINTS = 4
+
+# Context compaction: once a prompt reaches budget_tokens, the turns between the first exchange
+# (the document) and the keep_recent_turns latest ones are summarized ("summarize") or dropped ("drop")
+COMPACTION_DEFAULTS = {
+    "budget_tokens": 150000,
+    "keep_recent_turns": 4,
+    "strategy": "summarize",
+    "summary_max_tokens": 512,
+    # After a compaction the prompt must grow by this fraction of the budget before the next one
+    "hysteresis": 0.25,
+}
+
+SUMMARY_PROMPT = ("Summarize the following conversation so it can replace it as context. Keep every fact, "
+                  "decision and open question; answer with the summary only.\n\n")
+
+
+def make_cache_control(cache_ttl="5m"):
+    """cache_control block for the given TTL tier ("5m" is the API default and is sent without a ttl)"""
+    return {"type": "ephemeral"} if cache_ttl == "5m" else {"type": "ephemeral", "ttl": cache_ttl}
+
+
+def utc_timestamp(seconds):
+    """ISO 8601 UTC with milliseconds, e.g. 2025-06-27T14:03:12.345Z"""
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)) + f".{int(seconds % 1 * 1000):03d}Z"
+
+
+def make_bedrock_client(aws_region="us-west-2", base_url=None, pre_encoded=False, max_retries=None):
+    """
+    AnthropicBedrock client for the real endpoint, or for a local stand-in at base_url
+    (requests to the stand-in are signed with dummy credentials).
+    With pre_encoded, request bodies are assembled from cached bytes of the unchanged blocks instead.
+    max_retries overrides the SDK's own retries (0 lets a router fail over on the first 429).
+    """
+    if pre_encoded:
+        from request_body_cache import PreEncodedBedrockClient
+        return PreEncodedBedrockClient(aws_region, endpoint_url=base_url)
+
+    from anthropic import AnthropicBedrock
+
+    options = {} if max_retries is None else {"max_retries": max_retries}
+    if base_url is None:
+        return AnthropicBedrock(aws_region=aws_region, **options)
+    return AnthropicBedrock(aws_region=aws_region, base_url=base_url,
+                            aws_access_key="local", aws_secret_key="local", **options)
+
+
+def is_throttling_error(exception):
+    """True for Bedrock ThrottlingException / HTTP 429 style errors"""
+    if getattr(exception, "status_code", None) == 429:
+        return True
+    name = type(exception).__name__
+    return "Throttl" in name or "RateLimit" in name or "Throttl" in str(exception)
+
+
+def retry_with_exponential_backoff(
+    max_retries=5,
+    initial_delay=2,
+    exponential_base=2,
+    jitter=True,
+    on_retry=None
+):
+    """
+    Retry the wrapped call on any exception.
+    Every attempt and every backoff sleep is traced as its own span.
+    `on_retry(exception, attempt, delay)` is called before each backoff sleep.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            num_retries = 0
+            delay = initial_delay
+
+            while True:
+                try:
+                    with span("attempt", {"attempt": num_retries + 1}):
+                        return func(*args, **kwargs)
+
+                except Exception as e:
+                    num_retries += 1
+                    if num_retries > max_retries:
+                        raise e
+
+                    delay *= exponential_base
+                    if jitter:
+                        delay *= (0.5 + random.random())
+
+                    if on_retry is not None:
+                        on_retry(e, num_retries, delay)
+                    with span("backoff_sleep", {"delay_seconds": delay, "retry": num_retries,
+                                                "exception.type": type(e).__name__,
+                                                "throttled": is_throttling_error(e)}):
+                        time.sleep(delay)
+
+        return wrapper
+    return decorator
+
+
+# 재시도 로직을 제거한 순수 API 호출 함수
+# system_prompt is a string or a list of system content blocks; tools are optional tool definitions
+def anthropic_bedrock_model_api_call(client, model_id, messages, system_prompt=DEFAULT_SYSTEM_PROMPT, max_tokens=256,
+                                     tools=None):
+    if isinstance(system_prompt, str):
+        system_prompt = [
+            {
+                "type": "text",
+                "text": system_prompt
+            }
+        ]
+    # Tools are sent for their share of the cached prefix only; the harness handles text answers,
+    # so the model must not call them (any tool_use that still comes back is counted, not dropped)
+    optional = {"tools": tools, "tool_choice": {"type": "none"}} if tools else {}
+
+    start_time = time.time()
+    ttft = None
+    full_response = ""
+    client_processing_time = 0.0  # Time spent in our own event handling inside the measured window
+    inter_token_latencies = []
+    last_delta_time = None
+    tool_calls = []
+
+    stream = client.messages.create(
+        model=model_id,
+        max_tokens=max_tokens,
+        temperature=0.7,
+        system=system_prompt,
+        messages=messages,
+        stream=True,  # Streaming
+        **optional
+    )
+    stream_open_latency = time.time() - start_time  # Request encoding, signing, connection and response headers
+    for event in stream:
+        event_received = time.time()
+        if event.type == "content_block_start":
+            # TTFT
+            if ttft is None:
+                ttft = event_received - start_time
+            if event.content_block.type == "tool_use":
+                tool_calls.append(event.content_block.name)
+
+        elif event.type == "content_block_delta":
+            # Txt
+            if hasattr(event.delta, 'text'):
+                full_response += event.delta.text
+            if last_delta_time is not None:
+                inter_token_latencies.append(event_received - last_delta_time)
+            last_delta_time = event_received
+
+        elif event.type == "message_stop":
+            # usage
+            usage_data = getattr(event, 'amazon-bedrock-invocationMetrics')
+
+        client_processing_time += time.time() - event_received
+
+    end_time = time.time()
+    total_latency = end_time - start_time
+    client_timings = {
+        "stream_open_latency": stream_open_latency,
+        "client_processing_time": client_processing_time,
+        "inter_token_latencies": inter_token_latencies,
+        "tool_calls": tool_calls,
+    }
+
+    return full_response, usage_data, ttft, total_latency, client_timings
+
+
+# Helper function to remove cache_control from a message
+# (the first keep_blocks blocks keep theirs: the pinned document breakpoints of the first message)
+def remove_cache_control(message, keep_blocks=0):
+    if message["role"] == "user":
+        new_content = []
+        for i, item in enumerate(message["content"]):
+            if item.get("type") == "text" and "cache_control" in item and i >= keep_blocks:
+                # Create a new item without cache_control
+                new_item = {
+                    "type": "text",
+                    "text": item["text"]
+                }
+                new_content.append(new_item)
+            else:
+                new_content.append(item)
+        message["content"] = new_content
+    return message
+
+
+def build_user_message(turn, question, sample_text, cache_control, pin_document=False, documents=None):
+    """
+    User message of a turn; the first turn carries the document ahead of the question.
+    With pin_document the document block gets its own breakpoint that the sliding window never removes.
+    documents: prebuilt content blocks (e.g. from prefix_planner) used instead of sample_text;
+    breakpoints placed on them are pinned the same way.
+    """
+    content = []
+    if turn == 0 and documents is not None:
+        content.extend(dict(block) for block in documents)
+    elif turn == 0:
+        document = {
+            "type": "text",
+            "text": sample_text,
+        }
+        if pin_document:
+            document["cache_control"] = dict(cache_control)
+        content.append(document)
+    content.append({
+        "type": "text",
+        "text": question + " ",
+        "cache_control": dict(cache_control)  # Cache this content
+    })
+    return {"role": "user", "content": content}
+
+
+def new_conversation(client, model_id, sample_text, exp_num, questions=QUESTIONS, cache_control=None,
+                     metrics=None, system_prompt=DEFAULT_SYSTEM_PROMPT, max_tokens=256, compaction=None,
+                     documents=None, tools=None):
+    """
+    State of one conversation: its settings, the message history and the breakpoints currently placed.
+    run_turn() advances it one turn at a time.
+    compaction: None, or settings for compact_conversation() (see COMPACTION_DEFAULTS).
+    documents: None, or content blocks that replace sample_text in the first message.
+    system_prompt / tools: breakpoints placed on system blocks or tool definitions count against the budget.
+    """
+    if compaction is not None:
+        compaction = dict(COMPACTION_DEFAULTS, **compaction)
+        if compaction["keep_recent_turns"] < 1:
+            raise ValueError("Compaction must keep at least one recent turn")
+    if documents is not None:
+        pinned_blocks = len(documents)
+        pinned_breakpoints = sum("cache_control" in block for block in documents)
+    else:
+        pinned_blocks = pinned_breakpoints = 1 if compaction is not None else 0
+    prefix_breakpoints = sum("cache_control" in block for block in (tools or []))
+    if not isinstance(system_prompt, str):
+        prefix_breakpoints += sum("cache_control" in block for block in system_prompt)
+    if prefix_breakpoints + pinned_breakpoints >= MAX_CACHE_BREAKPOINTS:
+        raise ValueError(f"At most {MAX_CACHE_BREAKPOINTS - 1} tools, system and document breakpoints "
+                         f"leave room for the turns")
+    state = {
+        "client": client,
+        "model_id": model_id,
+        "sample_text": sample_text,
+        "exp_num": exp_num,
+        "questions": questions,
+        "cache_control": cache_control or make_cache_control(),
+        "metrics": metrics,
+        "system_prompt": system_prompt,
+        "max_tokens": max_tokens,
+        "compaction": compaction,
+        "documents": documents,
+        # Leading blocks of the first message whose breakpoints stay for the whole conversation
+        "pinned_blocks": pinned_blocks,
+        "pinned_breakpoints": pinned_breakpoints,
+        "tools": tools,
+        "prefix_breakpoints": prefix_breakpoints,
+        # Prompt size of the previous request plus its answer, which compaction compares to its budget
+        "last_prompt_tokens": 0,
+        # Set by a compaction until the next prompt shows its size; then the size the next compaction waits for
+        "compaction_pending": False,
+        "compaction_threshold": None,
+        # Conversation history
+        "conversation": [],
+        # Keep track of which messages have cache_control
+        "cached_message_indices": [],
+        # Tracking metrics for this experiment
+        "experiment_data": [],
+        # Attempts and backoff time of the current turn, so retries show up in the results
+        "retry_state": {"attempts": 1, "retry_sleep_time": 0.0},
+    }
+
+    def on_retry(exception, attempt, delay):
+        state["retry_state"]["attempts"] = attempt + 1
+        state["retry_state"]["retry_sleep_time"] += delay
+        if state["metrics"] is not None:
+            state["metrics"].observe_retry(exception, is_throttling_error(exception))
+
+    # 재시도 로직을 적용한 래퍼 함수 (재시도 로직과 관계없이 실제 API 호출 시간만 측정)
+    state["model_call"] = retry_with_exponential_backoff(on_retry=on_retry)(anthropic_bedrock_model_api_call)
+    return state
+
+
+def fork_conversation(state, exp_num=None, questions=None):
+    """
+    New conversation state continuing from state's history: the messages and the breakpoints placed
+    so far are copied, so the branch's next request shares the cached prefix up to the fork point.
+    questions replaces the question list from here on (e.g. an edited version of the next question).
+    """
+    branch = new_conversation(state["client"], state["model_id"], state["sample_text"],
+                              state["exp_num"] if exp_num is None else exp_num,
+                              questions=questions or state["questions"], cache_control=state["cache_control"],
+                              metrics=state["metrics"], system_prompt=state["system_prompt"],
+                              max_tokens=state["max_tokens"], compaction=state["compaction"],
+                              documents=state["documents"], tools=state["tools"])
+    branch["conversation"] = copy.deepcopy(state["conversation"])
+    branch["cached_message_indices"] = list(state["cached_message_indices"])
+    branch["last_prompt_tokens"] = state["last_prompt_tokens"]
+    branch["compaction_pending"] = state["compaction_pending"]
+    branch["compaction_threshold"] = state["compaction_threshold"]
+    return branch
+
+
+def message_text(message):
+    return " ".join(block["text"] for block in message["content"] if block.get("type") == "text")
+
+
+def compact_conversation(state):
+    """
+    Once the previous prompt reached the token budget, replace the middle turns with a summary
+    (or drop them). The first exchange, which carries the document, stays byte-identical so its
+    pinned breakpoint keeps hitting; all other breakpoints are cleared, so the compacted history
+    is written to the cache once, by the next request, and read from then on.
+    The next compaction waits until the prompt has grown by `hysteresis` times the budget past the
+    compacted size, so a compacted prompt still near the budget (document, summary and recent turns)
+    is not summarized and re-cached again on every turn.
+    Returns the compaction columns of the turn_data row.
+    """
+    settings = state["compaction"]
+    conversation = state["conversation"]
+    keep_recent = settings["keep_recent_turns"]
+    columns = {"compacted": False, "compacted_turns": 0, "compaction_latency": 0.0,
+               "compaction_input_tokens": 0, "compaction_output_tokens": 0}
+    middle = conversation[2:len(conversation) - 2 * keep_recent]
+    budget = settings["budget_tokens"]
+    if state["compaction_pending"]:
+        # First prompt after a compaction: what the compaction could not remove
+        state["compaction_pending"] = False
+        state["compaction_threshold"] = max(budget, state["last_prompt_tokens"] + settings["hysteresis"] * budget)
+    if state["last_prompt_tokens"] < (state["compaction_threshold"] or budget) or not middle:
+        return columns
+
+    with span("compaction", {"experiment": state["exp_num"] + 1, "strategy": settings["strategy"]}):
+        recent = [remove_cache_control(dict(message)) for message in conversation[len(conversation) - 2 * keep_recent:]]
+        if settings["strategy"] == "summarize":
+            transcript = "\n\n".join(f"{m['role'].upper()}: {message_text(m)}" for m in middle)
+            summary, usage, _, latency, _ = state["model_call"](
+                state["client"], state["model_id"],
+                [{"role": "user", "content": [{"type": "text", "text": SUMMARY_PROMPT + transcript}]}],
+                system_prompt=state["system_prompt"], max_tokens=settings["summary_max_tokens"],
+            )
+            columns["compaction_latency"] = latency
+            columns["compaction_input_tokens"] = (usage["inputTokenCount"] + (usage["cacheWriteInputTokenCount"] or 0)
+                                                  + (usage["cacheReadInputTokenCount"] or 0))
+            columns["compaction_output_tokens"] = usage["outputTokenCount"]
+            recent[0] = {"role": "user", "content": [
+                {"type": "text", "text": f"Summary of the earlier conversation:\n{summary}"}] + recent[0]["content"]}
+
+        conversation[:] = [remove_cache_control(dict(conversation[0]), keep_blocks=state["pinned_blocks"]),
+                           conversation[1]] + recent
+        state["cached_message_indices"] = []
+        state["compaction_pending"] = True
+        columns["compacted"] = True
+        columns["compacted_turns"] = len(middle) // 2
+        log_event(log, logging.INFO, "compaction", experiment=state["exp_num"] + 1,
+                  prompt_tokens=state["last_prompt_tokens"], **columns)
+    return columns
+
+
+def run_turn(state, turn, n_turns=None):
+    """
+    Run one turn with the sliding-window breakpoint policy: every user turn gets a breakpoint
+    and the oldest one is dropped once the 4-breakpoint budget is used. Returns the turn_data row.
+    Questions repeat in order when the conversation is longer than the question list;
+    n_turns is the conversation's length, for the log.
+    """
+    questions = state["questions"]
+    question = questions[turn % len(questions)]
+    compaction_columns = compact_conversation(state) if state["compaction"] is not None else {}
+    conversation = state["conversation"]
+    cached_message_indices = state["cached_message_indices"]
+    state["retry_state"] = {"attempts": 1, "retry_sleep_time": 0.0}
+    # Tools, system and pinned document breakpoints take their slots of the budget
+    breakpoint_budget = MAX_CACHE_BREAKPOINTS - state["prefix_breakpoints"] - state["pinned_breakpoints"]
+
+    with span("turn", {"experiment": state["exp_num"] + 1, "turn": turn + 1}) as turn_span:
+        log_event(log, logging.INFO, "turn_start", experiment=state["exp_num"] + 1, turn=turn + 1,
+                  of=n_turns or len(questions), question=question)
+        turn_start = time.time()
+
+        if len(cached_message_indices) >= breakpoint_budget:
+            oldest_cached_index = cached_message_indices.pop(0)
+            conversation[oldest_cached_index] = remove_cache_control(
+                conversation[oldest_cached_index], keep_blocks=state["pinned_blocks"] if oldest_cached_index == 0 else 0)
+
+        # Construct messages for this turn: conversation history plus the current question
+        messages = []
+        messages.extend(conversation)
+        current_message = build_user_message(turn, question, state["sample_text"], state["cache_control"],
+                                             pin_document=state["compaction"] is not None,
+                                             documents=state["documents"])
+        messages.append(current_message)
+
+        # Prompt bodies only at DEBUG, stored by content hash on the writer thread.
+        # Messages are snapshotted because remove_cache_control() later swaps their content.
+        if log.isEnabledFor(logging.DEBUG):
+            log_event(log, logging.DEBUG, "request", experiment=state["exp_num"] + 1, turn=turn + 1,
+                      prompt={"tools": state["tools"], "system": state["system_prompt"],
+                              "messages": [dict(m) for m in messages]})
+
+        # Make the API call with TTFT measurement
+
+        full_response, usage, ttft, invocation_latency, client_timings = state["model_call"](
+            state["client"], state["model_id"], messages,
+            system_prompt=state["system_prompt"], max_tokens=state["max_tokens"], tools=state["tools"],
+        )
+
+        # Update conversation history with message containing cache_control
+        conversation.append(current_message)
+        cached_message_indices.append(len(conversation)-1)
+
+        # Add assistant response to conversation
+        conversation.append({
+            "role": "assistant",
+            "content": [
+                {
+                    "type": "text",
+                    "text": full_response,
+                }
+            ]
+        })
+
+        # Store data for this turn (one clock read for the wall time and the end timestamp)
+        turn_end = time.time()
+        turn_data = {
+            "experiment": state["exp_num"] + 1,
+            "turn": turn + 1,
+            "question": question,
+            "input_tokens": usage["inputTokenCount"],
+            "output_tokens": usage["outputTokenCount"],
+            "cache_creation_input_tokens": usage["cacheWriteInputTokenCount"] or 0,
+            "cache_read_input_tokens": usage["cacheReadInputTokenCount"] or 0,
+            "invocation_latency": invocation_latency,
+            "invocation_latency_bedrock": usage["invocationLatency"],
+            "first_byte_latency": usage["firstByteLatency"],
+            "ttft": ttft,
+            "stream_open_latency": client_timings["stream_open_latency"],
+            "client_processing_time": client_timings["client_processing_time"],
+            "attempts": state["retry_state"]["attempts"],
+            "retry_sleep_time": state["retry_state"]["retry_sleep_time"],
+            "turn_wall_time": turn_end - turn_start,
+            "turn_start_utc": utc_timestamp(turn_start),
+            "turn_end_utc": utc_timestamp(turn_end),
+            **compaction_columns,
+        }
+        if state["tools"]:
+            turn_data["tool_calls"] = len(client_timings["tool_calls"])
+            if client_timings["tool_calls"]:
+                log_event(log, logging.WARNING, "tool_use", experiment=state["exp_num"] + 1, turn=turn + 1,
+                          tools=client_timings["tool_calls"])
+        state["last_prompt_tokens"] = (turn_data["input_tokens"] + turn_data["cache_creation_input_tokens"]
+                                       + turn_data["cache_read_input_tokens"] + turn_data["output_tokens"])
+        turn_span.set_attributes({key: value for key, value in {
+            "attempts": turn_data["attempts"],
+            "input_tokens": turn_data["input_tokens"],
+            "output_tokens": turn_data["output_tokens"],
+            "cache_creation_input_tokens": turn_data["cache_creation_input_tokens"],
+            "cache_read_input_tokens": turn_data["cache_read_input_tokens"],
+            "cache_hit": turn_data["cache_read_input_tokens"] > 0,
+            "ttft": ttft,
+            "invocation_latency": invocation_latency,
+        }.items() if value is not None})
+        log_event(log, logging.INFO, "turn", **turn_data)
+        state["experiment_data"].append(turn_data)
+
+        if state["metrics"] is not None:
+            state["metrics"].observe_turn(turn_data, client_timings["inter_token_latencies"])
+
+    return turn_data
+
+
+def run_conversation(client, model_id, sample_text, exp_num, n_turns, questions=QUESTIONS,
+                     cache_control=None, metrics=None, system_prompt=DEFAULT_SYSTEM_PROMPT, max_tokens=256,
+                     profiler=None, compaction=None, documents=None, tools=None):
+    """
+    Run one multi-turn conversation and return one turn_data dict per turn.
+    With a profiler, samples of each turn are attributed to that turn.
+    """
+    state = new_conversation(client, model_id, sample_text, exp_num, questions=questions,
+                             cache_control=cache_control, metrics=metrics,
+                             system_prompt=system_prompt, max_tokens=max_tokens, compaction=compaction,
+                             documents=documents, tools=tools)
+
+    with span("conversation", {"experiment": exp_num + 1, "model": model_id, "turns": n_turns}):
+        # Simulate n_turns
+        for turn in range(n_turns):
+            if profiler is not None:
+                profiler.set_phase(f"exp {exp_num+1} turn {turn+1}")
+            run_turn(state, turn, n_turns)
+        if profiler is not None:
+            profiler.set_phase("between turns")
+
+    return state["experiment_data"]
+
+
+def run_experiments(client, model_id, sample_text, result_dir, n_experiments, n_turns, questions=QUESTIONS,
+                    cache_control=None, metrics=None, file_prefix="cache_experiment_results_cache_control_added_test",
+                    profiler=None, compaction=None, think_time=0.0, interleave=1):
+    """
+    Run n_experiments conversations and save each one as its own CSV in result_dir.
+    With a think_time (seconds between a conversation's turns), turns of up to `interleave`
+    conversations are interleaved instead of sleeping (see turn_scheduler.py).
+    """
+    import pandas as pd
+
+    os.makedirs(result_dir, exist_ok=True)
+
+    if think_time > 0 or interleave > 1:
+        from turn_scheduler import run_interleaved, sequential_estimate
+
+        states = [new_conversation(client, model_id, sample_text, exp_num, questions=questions,
+                                   cache_control=cache_control, metrics=metrics, compaction=compaction)
+                  for exp_num in range(n_experiments)]
+        stats = run_interleaved(states, n_turns, think_time=think_time, interleave=interleave, profiler=profiler)
+        for exp_num, state in enumerate(states):
+            pd.DataFrame(state["experiment_data"]).to_csv(f"{result_dir}/{file_prefix}_{exp_num}.csv", index=False)
+        sequential = sequential_estimate(stats, n_experiments, n_turns, think_time)
+        log_event(log, logging.INFO, "campaign", **stats, sequential_estimate=sequential)
+        print(f"Campaign wall time {stats['wall_time']:.1f}s ({stats['busy_time']:.1f}s in turns, "
+              f"max schedule lag {stats['max_schedule_lag']:.1f}s); one at a time: ~{sequential:.1f}s")
+        return stats
+
+    for exp_num in range(n_experiments):
+        log_event(log, logging.INFO, "experiment_start", experiment=exp_num + 1, of=n_experiments)
+
+        experiment_data = run_conversation(client, model_id, sample_text, exp_num, n_turns, questions=questions,
+                                           cache_control=cache_control, metrics=metrics, profiler=profiler,
+                                           compaction=compaction)
+
+        # Convert to DataFrame and save
+        pd.DataFrame(experiment_data).to_csv(f"{result_dir}/{file_prefix}_{exp_num}.csv", index=False)
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Multi-turn prompt caching benchmark on Bedrock.")
+    parser.add_argument("--model", default="us.anthropic.claude-3-7-sonnet-20250219-v1:0")
+    parser.add_argument("--region", default="us-west-2")
+    parser.add_argument("--endpoint-url", help="Send requests to this Bedrock-compatible endpoint instead")
+    parser.add_argument("--local", action="store_true", help="Start an in-process local stand-in endpoint")
+    parser.add_argument("--local-time-scale", type=float, default=1.0,
+                        help="Delay multiplier of the local stand-in (0 = no simulated model time)")
+    parser.add_argument("--result-dir", default="37_250630_ttft")
+    parser.add_argument("--experiments", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--ttl", choices=["5m", "1h"], default="5m")
+    parser.add_argument("--document", default="RomeoAndJuliet.txt")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="Seconds between a conversation's turns (user think time)")
+    parser.add_argument("--interleave", type=int, default=1,
+                        help="Conversations kept open at once; their turns fill each other's think time")
+    parser.add_argument("--compact-at", type=int, metavar="TOKENS",
+                        help="Compact the conversation once a prompt reaches this many tokens")
+    parser.add_argument("--compaction", choices=["summarize", "drop"], default=COMPACTION_DEFAULTS["strategy"],
+                        help="What happens to the middle turns when compacting")
+    parser.add_argument("--keep-recent-turns", type=int, default=COMPACTION_DEFAULTS["keep_recent_turns"])
+    parser.add_argument("--pre-encoded", action="store_true",
+                        help="Reuse the encoded bytes of unchanged prompt blocks instead of re-encoding the body")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Log at DEBUG level, including every prompt body (stored by content hash)")
+    parser.add_argument("--log-file", help="JSON-lines run log (default: <result-dir>/run_log.jsonl)")
+    parser.add_argument("--record", metavar="LOG", help="Record every request and stream event (gzip JSON lines)")
+    parser.add_argument("--replay", metavar="LOG", help="Answer from a recorded log instead of an endpoint")
+    parser.add_argument("--replay-time-scale", type=float, default=1.0,
+                        help="Multiply the recorded event offsets (0 = as fast as possible)")
+    parser.add_argument("--memoize", metavar="DIR",
+                        help="Development cache: answer repeated identical requests from DIR at their original timing")
+    parser.add_argument("--memoize-time-scale", type=float, default=1.0,
+                        help="Multiply the stored timings of cache hits (0 = instantly)")
+    parser.add_argument("--memoize-max-mb", type=float, default=512)
+    parser.add_argument("--memoize-max-age-hours", type=float, default=24 * 7)
+    parser.add_argument("--check-prefix", action="store_true",
+                        help="Alert when a turn reads less from the cache than the previous turn cached, "
+                             "naming the first prompt block that changed")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Expose live OpenMetrics on http://127.0.0.1:<port>/metrics during the run")
+    parser.add_argument("--trace-file", help="Export OpenTelemetry spans to this JSON-lines file")
+    parser.add_argument("--otlp-endpoint", help="Export spans to an OTLP/HTTP collector, e.g. http://localhost:4318/v1/traces")
+    parser.add_argument("--profile", action="store_true",
+                        help="Run the turn loop under the sampling profiler and report client-side time per turn")
+    parser.add_argument("--profile-interval", type=float, default=0.002, help="Seconds between stack samples")
+    parser.add_argument("--profile-output", default="profile_report.json")
+    args = parser.parse_args(argv)
+
+    from results_io import write_run_metadata
+
+    configure_logging(args.log_file or os.path.join(args.result_dir, "run_log.jsonl"),
+                      level="DEBUG" if args.verbose else "INFO",
+                      prompt_dir=os.path.join(args.result_dir, "prompts"))
+
+    base_url = args.endpoint_url
+    local_server = None
+    if args.local:
+        from local_bedrock_server import LocalBedrockServer
+        local_server = LocalBedrockServer(profile={"time_scale": args.local_time_scale}).start()
+        base_url = local_server.url
+        print(f"Using local stand-in endpoint {base_url}")
+
+    compaction = None
+    if args.compact_at:
+        compaction = {"budget_tokens": args.compact_at, "strategy": args.compaction,
+                      "keep_recent_turns": args.keep_recent_turns}
+
+    if args.replay:
+        from replay_log import ReplayClient
+        client = ReplayClient(args.replay, time_scale=args.replay_time_scale)
+    else:
+        client = make_bedrock_client(args.region, base_url=base_url, pre_encoded=args.pre_encoded)
+    if args.memoize:
+        from response_cache import MemoizingClient
+        client = MemoizingClient(client, args.memoize, max_bytes=args.memoize_max_mb * 1024 * 1024,
+                                 max_age=args.memoize_max_age_hours * 3600, time_scale=args.memoize_time_scale)
+    checker = None
+    if args.check_prefix:
+        from prefix_checker import PrefixChecker
+        client = checker = PrefixChecker(client)
+    with open(args.document, 'r') as file:
+        sample_text = file.read()
+
+    metadata = {
+        "model": args.model,
+        "provider": "bedrock",
+        "endpoint": base_url,
+        "policy": "sliding-window",
+        "started": utc_timestamp(time.time()),
+        "cache_ttl": args.ttl,
+        "pre_encoded": args.pre_encoded,
+        "n_experiments": args.experiments,
+        "n_turns": args.turns,
+        "compaction": compaction,
+        "think_time": args.think_time,
+        "interleave": args.interleave,
+        "replay": args.replay,
+        "memoized": bool(args.memoize),
+    }
+    write_run_metadata(args.result_dir, metadata)
+    recorder = None
+    if args.record:
+        from replay_log import ReplayRecorder
+        client = recorder = ReplayRecorder(client, args.record, metadata)
+
+    metrics = None
+    if args.metrics_port is not None:
+        from metrics_exporter import BenchmarkMetrics, start_metrics_server
+        metrics = BenchmarkMetrics(model=args.model, provider="bedrock", policy="sliding-window")
+        start_metrics_server(metrics, args.metrics_port)
+
+    if args.trace_file or args.otlp_endpoint:
+        from tracing import configure_tracing
+        configure_tracing(output_file=args.trace_file, otlp_endpoint=args.otlp_endpoint)
+
+    profiler = None
+    if args.profile:
+        from profiling import SamplingProfiler, measure_import_times
+        profiler = SamplingProfiler(interval=args.profile_interval).start()
+
+    run_experiments(client, args.model, sample_text, args.result_dir, args.experiments, args.turns,
+                    cache_control=make_cache_control(args.ttl), metrics=metrics, profiler=profiler,
+                    compaction=compaction, think_time=args.think_time, interleave=args.interleave)
+    shutdown_tracing()
+    shutdown_logging()
+
+    if profiler is not None:
+        profiler.stop()
+        profiler.report(output=args.profile_output)
+        print("\n=== Cold import time (ms) ===")
+        for module, elapsed in measure_import_times().items():
+            print(f"  {module:20s} {elapsed if elapsed is not None else float('nan'):8.1f}")
+
+    if recorder is not None:
+        recorder.close()
+        client = recorder.client
+        print(f"Recorded {recorder.requests} requests to '{args.record}'")
+    if checker is not None:
+        client = checker.client
+        print(f"Prefix check: {checker.summary()}")
+        for alert in checker.alerts:
+            print(f"  read {alert['reported_read']} of {alert['expected_read']} expected tokens: {alert['reason']}")
+    if args.memoize:
+        client.close()
+        print(f"Response cache: {client.stats()}")
+        client = client.client
+    if args.replay:
+        print(f"Replayed {client.log.matched} requests by body, {client.log.unmatched} in recording order")
+    if args.pre_encoded and not args.replay:
+        print(f"Request body cache: {client.body_cache.stats()}")
+    if local_server is not None:
+        local_server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+import argparse
+import os
+import sys
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from analyze_cache_and_latency_ttft import folder_colors, show_figure
+from results_io import load_folder, load_run_metadata
+
+# Prompt cache lifetime in seconds for each TTL tier
+TTL_SECONDS = {'5m': 300, '1h': 3600}
+
+
+def add_turn_efficiency(df):
+    """
+    Add per-turn cache efficiency columns:
+    hit ratio (cache read / total prompt tokens) and the prompt tokens the model still had to prefill.
+    """
+    df = df.copy()
+    df['prompt_tokens'] = df['input_tokens'] + df['cache_creation_input_tokens'] + df['cache_read_input_tokens']
+    df['cache_hit_ratio'] = np.where(df['prompt_tokens'] > 0,
+                                     df['cache_read_input_tokens'] / df['prompt_tokens'].where(df['prompt_tokens'] > 0, 1), 0.0)
+    df['uncached_prefill_tokens'] = df['input_tokens'] + df['cache_creation_input_tokens']
+    return df
+
+
+def turn_elapsed_seconds(conversation, think_time=0.0):
+    """
+    Seconds since the start of the conversation at which each turn was sent.
+    Uses recorded start timestamps when present, otherwise the cumulative client latency plus think time.
+    """
+    if 'turn_start_utc' in conversation.columns:
+        starts = pd.to_datetime(conversation['turn_start_utc'], utc=True)
+        return (starts - starts.iloc[0]).dt.total_seconds().to_numpy()
+    durations = conversation['invocation_latency'].to_numpy() + think_time
+    return np.concatenate([[0.0], np.cumsum(durations)[:-1]])
+
+
+def unread_cache_writes(conversation, ttl_seconds, think_time=0.0):
+    """
+    Tokens written to the cache at each turn that no later turn read before the entry expired.
+    A write at turn t covers prompt positions [read_t, read_t + write_t); a later turn u reads the part
+    of it below read_u. Each read refreshes the entry, so the TTL window restarts at the last hit.
+    """
+    conversation = conversation.sort_values('turn')
+    reads = conversation['cache_read_input_tokens'].to_numpy()
+    writes = conversation['cache_creation_input_tokens'].to_numpy()
+    elapsed = turn_elapsed_seconds(conversation, think_time)
+
+    unread = np.zeros(len(conversation))
+    for t in range(len(conversation)):
+        if writes[t] == 0:
+            continue
+        start, end = reads[t], reads[t] + writes[t]
+        covered = start
+        last_touch = elapsed[t]
+        for u in range(t + 1, len(conversation)):
+            if elapsed[u] - last_touch > ttl_seconds:
+                break
+            if reads[u] > start:
+                covered = max(covered, min(reads[u], end))
+                last_touch = elapsed[u]
+        unread[t] = end - covered
+    return unread
+
+
+def efficiency_by_turn(df, ttl_seconds, think_time=0.0):
+    """Add write-amplification columns to every conversation and return the per-turn frame"""
+    frames = []
+    for _, conversation in df.groupby('source_file'):
+        conversation = conversation.sort_values('turn').copy()
+        conversation['unread_cache_write_tokens'] = unread_cache_writes(conversation, ttl_seconds, think_time)
+        frames.append(conversation)
+    return pd.concat(frames, ignore_index=True) if frames else df
+
+
+def summarize_runs(df):
+    """Per-run (conversation) efficiency totals"""
+    runs = df.groupby('source_file').agg(
+        prompt_tokens=('prompt_tokens', 'sum'),
+        cache_read_tokens=('cache_read_input_tokens', 'sum'),
+        cache_write_tokens=('cache_creation_input_tokens', 'sum'),
+        unread_cache_write_tokens=('unread_cache_write_tokens', 'sum'),
+        uncached_prefill_tokens=('uncached_prefill_tokens', 'sum'),
+        total_ttft=('ttft', 'sum'),
+    ).reset_index()
+    runs['cache_hit_ratio'] = runs['cache_read_tokens'] / runs['prompt_tokens']
+    runs['write_amplification'] = np.where(runs['cache_write_tokens'] > 0,
+                                           runs['unread_cache_write_tokens'] / runs['cache_write_tokens'].where(runs['cache_write_tokens'] > 0, 1), 0.0)
+    return runs
+
+
+def ttft_savings(df, baseline_df):
+    """Mean TTFT per turn of a no-cache baseline minus that of the cached run"""
+    base = baseline_df.groupby('turn')['ttft'].mean()
+    current = df.groupby('turn')['ttft'].mean()
+    saved = (base - current).dropna()
+    return pd.DataFrame({'baseline_ttft': base.reindex(saved.index), 'ttft': current.reindex(saved.index),
+                         'ttft_saved': saved, 'ttft_saved_pct': saved / base.reindex(saved.index) * 100})
+
+
+def analyze_folder(folder, ttl, think_time, baseline_df=None):
+    """Compute per-turn, per-run and TTFT-saving efficiency tables for one result folder"""
+    df = add_turn_efficiency(load_folder(folder))
+    df = efficiency_by_turn(df, TTL_SECONDS[ttl], think_time)
+    runs = summarize_runs(df)
+
+    per_turn = df.groupby('turn').agg(
+        cache_hit_ratio=('cache_hit_ratio', 'mean'),
+        uncached_prefill_tokens=('uncached_prefill_tokens', 'mean'),
+        cache_write_tokens=('cache_creation_input_tokens', 'mean'),
+        unread_cache_write_tokens=('unread_cache_write_tokens', 'mean'),
+    )
+    if baseline_df is not None:
+        per_turn = per_turn.join(ttft_savings(df, baseline_df)[['ttft_saved', 'ttft_saved_pct']])
+    return df, per_turn.reset_index(), runs
+
+
+def plot_cache_efficiency(results, output):
+    """Hit ratio and TTFT saved per turn for every folder"""
+    with_savings = any('ttft_saved' in per_turn for _, per_turn, _ in results)
+    fig, axes = plt.subplots(1, 2 if with_savings else 1, figsize=(16 if with_savings else 8, 6), squeeze=False)
+    colors = folder_colors(len(results))
+
+    for idx, (folder, per_turn, _) in enumerate(results):
+        axes[0][0].plot(per_turn['turn'], per_turn['cache_hit_ratio'], marker='o', color=colors[idx],
+                        label=folder, linewidth=2, markersize=6, alpha=0.8)
+        if with_savings and 'ttft_saved' in per_turn:
+            axes[0][1].plot(per_turn['turn'], per_turn['ttft_saved'], marker='s', color=colors[idx],
+                            label=folder, linewidth=2, markersize=6, alpha=0.8)
+
+    axes[0][0].set_xlabel('Turn', fontsize=12)
+    axes[0][0].set_ylabel('Cache Hit Ratio', fontsize=12)
+    axes[0][0].set_title('Cache Hit Ratio by Turn', fontsize=14)
+    axes[0][0].set_ylim(0, 1.05)
+    if with_savings:
+        axes[0][1].axhline(0, color='black', linewidth=0.8)
+        axes[0][1].set_xlabel('Turn', fontsize=12)
+        axes[0][1].set_ylabel('TTFT Saved vs No-Cache Baseline (seconds)', fontsize=12)
+        axes[0][1].set_title('TTFT Saved by Turn', fontsize=14)
+    for ax in axes[0]:
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+
+    fig.suptitle('Cache Efficiency', fontsize=16)
+    plt.tight_layout()
+    plt.savefig(output, dpi=150, bbox_inches='tight')
+    show_figure(fig)
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Cache hit ratio, write amplification, prefill and TTFT savings.")
+    parser.add_argument('folders', nargs='+', help="Result folders of cached runs")
+    parser.add_argument('--no-cache-baseline', help="Result folder of a run without cache_control")
+    parser.add_argument('--ttl', choices=list(TTL_SECONDS), default=None,
+                        help="Cache TTL (default: from run_metadata.json, else 5m)")
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help="Seconds between turns when the CSVs carry no timestamps")
+    parser.add_argument('--output-prefix', default='cache_efficiency')
+    args = parser.parse_args(argv)
+
+    for folder in args.folders + ([args.no_cache_baseline] if args.no_cache_baseline else []):
+        if not os.path.exists(folder):
+            print(f"Warning: {folder} folder not found.")
+            return 1
+
+    baseline_df = load_folder(args.no_cache_baseline) if args.no_cache_baseline else None
+
+    results = []
+    run_frames = []
+    for folder in args.folders:
+        ttl = args.ttl or load_run_metadata(folder).get('cache_ttl', '5m')
+        _, per_turn, runs = analyze_folder(folder, ttl, args.think_time, baseline_df)
+        results.append((folder, per_turn, runs))
+        runs.insert(0, 'folder', folder)
+        run_frames.append(runs)
+
+        print(f"\n=== Cache Efficiency: {folder} (TTL {ttl}) ===")
+        header = "Turn | Hit Ratio | Uncached Prefill | Written | Never Read"
+        if 'ttft_saved' in per_turn:
+            header += " | TTFT Saved"
+        print(header)
+        print("-" * len(header))
+        for row in per_turn.itertuples(index=False):
+            line = (f"{row.turn:4d} | {row.cache_hit_ratio:9.1%} | {row.uncached_prefill_tokens:16.0f} | "
+                    f"{row.cache_write_tokens:7.0f} | {row.unread_cache_write_tokens:10.0f}")
+            if 'ttft_saved' in per_turn:
+                line += f" | {row.ttft_saved:+.3f}s ({row.ttft_saved_pct:+.1f}%)"
+            print(line)
+
+        print(f"  Run hit ratio: {runs['cache_hit_ratio'].mean():.1%}, "
+              f"write amplification: {runs['write_amplification'].mean():.1%} of written tokens never read, "
+              f"uncached prefill per run: {runs['uncached_prefill_tokens'].mean():.0f} tokens")
+        if baseline_df is not None:
+            baseline_runs = baseline_df.groupby('source_file')['ttft'].sum().mean()
+            print(f"  TTFT per run: {runs['total_ttft'].mean():.3f}s vs {baseline_runs:.3f}s without cache "
+                  f"({baseline_runs - runs['total_ttft'].mean():+.3f}s saved)")
+
+    pd.concat([per_turn.assign(folder=folder) for folder, per_turn, _ in results]).to_csv(
+        f"{args.output_prefix}_per_turn.csv", index=False)
+    pd.concat(run_frames).to_csv(f"{args.output_prefix}_per_run.csv", index=False)
+    plot_cache_efficiency(results, f"{args.output_prefix}.png")
+    print(f"\nSaved '{args.output_prefix}_per_turn.csv', '{args.output_prefix}_per_run.csv' "
+          f"and '{args.output_prefix}.png'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import argparse
+import importlib
+import sys
+
+# Subcommand -> (module, help). A module is imported only when its subcommand runs,
+# so e.g. `cli.py simulate` never loads pandas, matplotlib or the AWS/Anthropic SDKs.
+COMMANDS = {
+    "run": ("benchmark_runner", "Run the multi-turn caching benchmark"),
+    "simulate": ("local_bedrock_server", "Serve the local stand-in Bedrock endpoint"),
+    "analyze": ("analyze_cache_and_latency_ttft", "Comparison graphs of result folders"),
+    "report": ("report_generator", "Headless HTML/Markdown report of result folders"),
+    "gate": ("regression_gate", "Statistical regression gate, candidate vs baseline"),
+    "cost": ("cost_model", "Cost per turn / conversation and cost vs TTFT"),
+    "cache-efficiency": ("cache_efficiency", "Cache hit ratio, write amplification and TTFT saved"),
+    "latency": ("latency_reconciliation", "Server vs client latency reconciliation"),
+    "time-of-day": ("time_of_day", "TTFT and throughput by hour / weekday, and rolling drift"),
+    "compaction": ("compaction_report", "TTFT and cost trade-off of context compaction"),
+    "prefix-plan": ("prefix_planner", "Document order and breakpoints for cross-conversation cache reuse"),
+    "agent-workload": ("agent_workload", "Cache shared system prompt and tool definitions across conversations"),
+    "route": ("endpoint_router", "Cache-affinity routing across regions / inference profiles"),
+    "replay": ("replay_log", "Inspect or serve a recorded replay log"),
+    "adaptive": ("adaptive_sampling", "Run experiments until per-turn confidence intervals are narrow enough"),
+    "output-sweep": ("output_sweep", "Decode throughput over max_tokens with long-answer prompts"),
+    "response-cache": ("response_cache", "Inspect, trim or clear the development response cache"),
+    "fork": ("fork_benchmark", "Fork conversations at a cached turn into concurrent branches"),
+    "shard": ("sharded_runner", "Split experiments into shards run by independent workers, then merge"),
+    "catalog": ("results_catalog", "Index result folders in SQLite and select runs by query"),
+}
+
+# Packages too heavy for startup; the modules below must import none of them at import time
+HEAVY_PACKAGES = ("pandas", "numpy", "matplotlib", "scipy", "anthropic", "boto3", "botocore",
+                  "httpx", "pydantic", "opentelemetry")
+
+# Cold import budget (ms) of the modules every sharded run loads
+IMPORT_BUDGETS_MS = {
+    "cli": 25,
+    "benchmark_runner": 120,
+    "local_bedrock_server": 120,
+}
+
+
+def run_analyze(argv):
+    """The analyzer is configured by module globals; set them from the command line"""
+    parser = argparse.ArgumentParser(prog="cli.py analyze", description=COMMANDS["analyze"][1])
+    parser.add_argument("folders", nargs="*", help="Result folders; the first one is the baseline")
+    parser.add_argument("--query", nargs="+", action="append", metavar="KEY=VALUE",
+                        help="Add the catalog runs matching a selector, oldest first (repeatable)")
+    parser.add_argument("--catalog", default="results_catalog.sqlite")
+    parser.add_argument("--date", default="250630", help="Suffix of the saved graph files")
+    args = parser.parse_args(argv)
+
+    folders = list(args.folders)
+    if args.query:
+        from results_catalog import open_catalog, parse_selector, select_runs
+        conn = open_catalog(args.catalog)
+        for query in args.query:
+            try:
+                folders += [run["folder"] for run in select_runs(conn, parse_selector(query))]
+            except ValueError as e:
+                parser.error(str(e))
+    if not folders:
+        parser.error("Give result folders or a --query matching catalog runs.")
+
+    analyzer = importlib.import_module("analyze_cache_and_latency_ttft")
+    analyzer.folders = folders
+    analyzer.date = args.date
+    analyzer.main()
+    return 0
+
+
+def check_imports(argv):
+    """Fail if an entry module pulls in a heavy package at import time or exceeds its cold import budget"""
+    parser = argparse.ArgumentParser(prog="cli.py check-imports", description=check_imports.__doc__)
+    parser.add_argument("--repeat", type=int, default=3, help="Imports per module; the fastest one counts")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply all budgets (slow CI machines)")
+    args = parser.parse_args(argv)
+
+    from profiling import import_profile
+
+    failures = 0
+    print(f"{'Module':22s} | {'Import (ms)':>11s} | {'Budget':>7s} | Heavy packages")
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        elapsed = min(ms for ms, _ in runs)
+        heavy = sorted(set(HEAVY_PACKAGES) & runs[0][1])
+        ok = elapsed <= budget * args.scale and not heavy
+        failures += not ok
+        print(f"{module:22s} | {elapsed:11.1f} | {budget * args.scale:7.0f} | "
+              f"{', '.join(heavy) or '-'}{'' if ok else '  <-- FAIL'}")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="Bedrock prompt caching benchmark tools.",
+        epilog="Run `cli.py <command> --help` for the options of a command.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    subcommands = "\n".join(f"  {name:18s} {help_text}" for name, (_, help_text) in COMMANDS.items())
+    parser.usage = f"cli.py <command> [options]\n\ncommands:\n{subcommands}\n  {'check-imports':18s} " \
+                   f"{check_imports.__doc__}"
+    parser.add_argument("command", choices=list(COMMANDS) + ["check-imports"])
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    if args.command == "check-imports":
+        return check_imports(args.args)
+    if args.command == "analyze":
+        return run_analyze(args.args)
+    module = importlib.import_module(COMMANDS[args.command][0])
+    return module.main(args.args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import argparse
+import os
+import sys
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from analyze_cache_and_latency_ttft import folder_colors, show_figure
+from cost_model import DEFAULT_MODEL, DEFAULT_PROVIDER, DEFAULT_TTL, add_turn_costs, load_price_table, \
+    lookup_prices, resolve_configuration
+from results_io import load_folder
+
+COMPACTION_COLUMNS = ['compacted', 'compacted_turns', 'compaction_latency',
+                      'compaction_input_tokens', 'compaction_output_tokens']
+
+# Turns after a compaction whose TTFT is attributed to it
+AFTER_COMPACTION_TURNS = 3
+
+
+def add_compaction_costs(df, model_prices):
+    """
+    Prompt size and cost columns including the summarization request of compacting turns.
+    Folders run without compaction get all-zero compaction columns.
+    """
+    df = df.copy()
+    for column in COMPACTION_COLUMNS:
+        if column not in df.columns:
+            df[column] = False if column == 'compacted' else 0
+    df['compacted'] = df['compacted'].fillna(False).astype(bool)
+    df['prompt_tokens'] = df['input_tokens'] + df['cache_creation_input_tokens'] + df['cache_read_input_tokens']
+    df['compaction_cost'] = (df['compaction_input_tokens'] * model_prices['input']
+                             + df['compaction_output_tokens'] * model_prices['output']) / 1e6
+    df['total_turn_cost'] = df['turn_cost'] + df['compaction_cost']
+    return df
+
+
+def label_turns(df):
+    """'compaction', 'after compaction' (the next few turns of the same conversation) or 'other'"""
+    labels = pd.Series('other', index=df.index)
+    for _, conversation in df.sort_values('turn').groupby('source_file'):
+        turns = conversation['turn'].values
+        for turn in conversation.loc[conversation['compacted'], 'turn']:
+            after = conversation.index[(turns > turn) & (turns <= turn + AFTER_COMPACTION_TURNS)]
+            labels[after] = 'after compaction'
+        labels[conversation.index[conversation['compacted']]] = 'compaction'
+    return labels
+
+
+def summarize_folder(folder, df):
+    """Cost, prompt size and TTFT of one configuration, with TTFT split around compactions"""
+    conversations = df.groupby('source_file').agg(
+        cost=('total_turn_cost', 'sum'),
+        compaction_cost=('compaction_cost', 'sum'),
+        compactions=('compacted', 'sum'),
+    )
+    ttft_by_label = df.groupby('turn_label')['ttft'].mean()
+    return {
+        'folder': folder,
+        'conversations': len(conversations),
+        'turns': int(df.groupby('source_file')['turn'].count().mean()),
+        'compactions': conversations['compactions'].mean(),
+        'mean_prompt_tokens': df['prompt_tokens'].mean(),
+        'max_prompt_tokens': df['prompt_tokens'].max(),
+        'conversation_cost': conversations['cost'].mean(),
+        'compaction_cost': conversations['compaction_cost'].mean(),
+        'mean_ttft': df['ttft'].mean(),
+        'p90_ttft': df['ttft'].quantile(0.9),
+        'ttft_compaction': ttft_by_label.get('compaction', float('nan')),
+        'ttft_after_compaction': ttft_by_label.get('after compaction', float('nan')),
+        'ttft_other': ttft_by_label.get('other', float('nan')),
+        'compaction_latency': df.loc[df['compacted'], 'compaction_latency'].mean() if df['compacted'].any()
+        else float('nan'),
+    }
+
+
+def format_seconds(value, width):
+    return f"{'-':>{width}s}" if pd.isna(value) else f"{value:{width - 1}.3f}s"
+
+
+def plot_compaction(frames, output):
+    """Mean prompt tokens and TTFT per turn of every folder, compaction turns marked"""
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10), sharex=True)
+    colors = folder_colors(len(frames))
+    for (folder, df), color in zip(frames.items(), colors):
+        per_turn = df.groupby('turn').agg(prompt_tokens=('prompt_tokens', 'mean'), ttft=('ttft', 'mean'),
+                                          compacted=('compacted', 'mean'))
+        ax1.plot(per_turn.index, per_turn['prompt_tokens'], color=color, linewidth=1.5, label=folder)
+        ax2.plot(per_turn.index, per_turn['ttft'], color=color, linewidth=1.5, label=folder)
+        marked = per_turn[per_turn['compacted'] > 0]
+        ax2.scatter(marked.index, marked['ttft'], color=color, marker='v', s=40, zorder=3)
+
+    ax1.set_ylabel('Prompt tokens', fontsize=12)
+    ax1.set_title('Prompt Size per Turn', fontsize=14)
+    ax2.set_xlabel('Turn', fontsize=12)
+    ax2.set_ylabel('TTFT (seconds)', fontsize=12)
+    ax2.set_title('TTFT per Turn (triangles: compaction turns)', fontsize=14)
+    for ax in (ax1, ax2):
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(output, dpi=150, bbox_inches='tight')
+    show_figure(fig)
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="TTFT and cost trade-off of context compaction.")
+    parser.add_argument('folders', nargs='+', help="Result folders; the first one is the baseline")
+    parser.add_argument('--prices', help="JSON price table overriding the defaults")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="Model for folders without run_metadata.json")
+    parser.add_argument('--provider', default=DEFAULT_PROVIDER, choices=['bedrock', 'anthropic'])
+    parser.add_argument('--ttl', default=DEFAULT_TTL, choices=['5m', '1h'])
+    parser.add_argument('--output-prefix', default='compaction', help="Prefix of the CSV and PNG outputs")
+    args = parser.parse_args(argv)
+
+    prices = load_price_table(args.prices)
+    defaults = {'model': args.model, 'provider': args.provider, 'cache_ttl': args.ttl}
+
+    frames = {}
+    rows = []
+    for folder in args.folders:
+        if not os.path.exists(folder):
+            print(f"Warning: {folder} folder not found.")
+            return 1
+        config = resolve_configuration(folder, defaults)
+        model_prices = lookup_prices(prices, config['provider'], config['model'])
+        df = add_compaction_costs(add_turn_costs(load_folder(folder), model_prices, config['cache_ttl']), model_prices)
+        df['turn_label'] = label_turns(df)
+        frames[folder] = df
+        rows.append(summarize_folder(folder, df))
+
+    summary = pd.DataFrame(rows)
+    baseline = rows[0]
+    summary['cost_change_pct'] = (summary['conversation_cost'] / baseline['conversation_cost'] - 1) * 100
+    summary['ttft_change_pct'] = (summary['mean_ttft'] / baseline['mean_ttft'] - 1) * 100
+
+    print(f"\n=== Compaction trade-off (baseline: {baseline['folder']}) ===")
+    print(f"{'Folder':28s} | {'Turns':>5s} | {'Compact.':>8s} | {'Max prompt':>10s} | {'$/conv':>8s} | "
+          f"{'Cost %':>7s} | {'TTFT':>7s} | {'TTFT %':>7s} | {'@compact':>8s} | {'after':>7s} | {'other':>7s}")
+    print("-" * 135)
+    for row in summary.to_dict('records'):
+        print(f"{row['folder']:28s} | {row['turns']:5d} | {row['compactions']:8.1f} | {row['max_prompt_tokens']:10.0f} | "
+              f"{row['conversation_cost']:8.4f} | {row['cost_change_pct']:+6.1f}% | {row['mean_ttft']:6.3f}s | "
+              f"{row['ttft_change_pct']:+6.1f}% | {format_seconds(row['ttft_compaction'], 8)} | "
+              f"{format_seconds(row['ttft_after_compaction'], 7)} | {format_seconds(row['ttft_other'], 7)}")
+    for row in rows:
+        if row['compaction_cost'] > 0:
+            print(f"  {row['folder']}: summarization adds ${row['compaction_cost']:.4f} per conversation "
+                  f"and {row['compaction_latency']:.3f}s per compaction before the compacting turn")
+
+    summary.to_csv(f"{args.output_prefix}_summary.csv", index=False)
+    plot_compaction(frames, f"{args.output_prefix}_per_turn.png")
+    print(f"\nSaved '{args.output_prefix}_summary.csv' and '{args.output_prefix}_per_turn.png'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
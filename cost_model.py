@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import sys
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from analyze_cache_and_latency_ttft import show_figure
+from results_io import load_folder, load_run_metadata
+
+# USD per million tokens by provider and model family (list prices; override with --prices).
+# cache_write_5m / cache_write_1h are the premiums for the two ephemeral TTL tiers,
+# cache_read is the discounted price of tokens served from the cache.
+DEFAULT_PRICES = {
+    'bedrock': {
+        'claude-3-7-sonnet': {'input': 3.00, 'output': 15.00, 'cache_write_5m': 3.75, 'cache_write_1h': 6.00, 'cache_read': 0.30},
+        'claude-sonnet-4': {'input': 3.00, 'output': 15.00, 'cache_write_5m': 3.75, 'cache_write_1h': 6.00, 'cache_read': 0.30},
+        'claude-3-5-haiku': {'input': 0.80, 'output': 4.00, 'cache_write_5m': 1.00, 'cache_write_1h': 1.60, 'cache_read': 0.08},
+        'claude-3-haiku': {'input': 0.25, 'output': 1.25, 'cache_write_5m': 0.30, 'cache_write_1h': 0.50, 'cache_read': 0.03},
+        'claude-opus-4': {'input': 15.00, 'output': 75.00, 'cache_write_5m': 18.75, 'cache_write_1h': 30.00, 'cache_read': 1.50},
+    },
+    'anthropic': {
+        'claude-3-7-sonnet': {'input': 3.00, 'output': 15.00, 'cache_write_5m': 3.75, 'cache_write_1h': 6.00, 'cache_read': 0.30},
+        'claude-sonnet-4': {'input': 3.00, 'output': 15.00, 'cache_write_5m': 3.75, 'cache_write_1h': 6.00, 'cache_read': 0.30},
+        'claude-3-5-haiku': {'input': 0.80, 'output': 4.00, 'cache_write_5m': 1.00, 'cache_write_1h': 1.60, 'cache_read': 0.08},
+        'claude-3-haiku': {'input': 0.25, 'output': 1.25, 'cache_write_5m': 0.30, 'cache_write_1h': 0.50, 'cache_read': 0.03},
+        'claude-opus-4': {'input': 15.00, 'output': 75.00, 'cache_write_5m': 18.75, 'cache_write_1h': 30.00, 'cache_read': 1.50},
+    },
+}
+
+DEFAULT_MODEL = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
+DEFAULT_PROVIDER = "bedrock"
+DEFAULT_TTL = "5m"
+
+
+def load_price_table(path=None):
+    """Return the default price table, updated with the provider/model entries of a JSON file"""
+    prices = {provider: dict(models) for provider, models in DEFAULT_PRICES.items()}
+    if path:
+        with open(path) as f:
+            overrides = json.load(f)
+        for provider, models in overrides.items():
+            prices.setdefault(provider, {}).update(models)
+    return prices
+
+
+def lookup_prices(prices, provider, model):
+    """
+    Find the prices of a model id such as 'us.anthropic.claude-3-7-sonnet-20250219-v1:0'.
+    The longest model family key contained in the id wins, so 'claude-3-5-haiku' beats 'claude-3-haiku'.
+    """
+    if provider not in prices:
+        raise KeyError(f"No prices for provider '{provider}'")
+    matches = [family for family in prices[provider] if family in model]
+    if not matches:
+        raise KeyError(f"No prices for model '{model}' on provider '{provider}'")
+    return prices[provider][max(matches, key=len)]
+
+
+def add_turn_costs(df, model_prices, cache_ttl=DEFAULT_TTL):
+    """
+    Add per-turn cost columns (USD) to a results DataFrame.
+    `input_tokens` are the uncached prompt tokens, so the four token classes never overlap.
+    """
+    write_price = model_prices['cache_write_1h'] if cache_ttl == '1h' else model_prices['cache_write_5m']
+    df = df.copy()
+    df['input_cost'] = df['input_tokens'] * model_prices['input'] / 1e6
+    df['output_cost'] = df['output_tokens'] * model_prices['output'] / 1e6
+    df['cache_write_cost'] = df['cache_creation_input_tokens'] * write_price / 1e6
+    df['cache_read_cost'] = df['cache_read_input_tokens'] * model_prices['cache_read'] / 1e6
+    df['turn_cost'] = df['input_cost'] + df['output_cost'] + df['cache_write_cost'] + df['cache_read_cost']
+
+    # What the same prompt would have cost without any caching
+    prompt_tokens = df['input_tokens'] + df['cache_creation_input_tokens'] + df['cache_read_input_tokens']
+    df['uncached_turn_cost'] = prompt_tokens * model_prices['input'] / 1e6 + df['output_cost']
+    return df
+
+
+def conversation_costs(df):
+    """Total cost of every conversation (one experiment CSV = one conversation)"""
+    return df.groupby('source_file').agg(
+        turns=('turn', 'count'),
+        conversation_cost=('turn_cost', 'sum'),
+        uncached_conversation_cost=('uncached_turn_cost', 'sum'),
+        mean_ttft=('ttft', 'mean'),
+    ).reset_index()
+
+
+def resolve_configuration(folder, defaults):
+    """Model, provider and TTL of a folder: its run_metadata.json first, then the command-line defaults"""
+    metadata = load_run_metadata(folder)
+    return {
+        'model': metadata.get('model', defaults['model']),
+        'provider': metadata.get('provider', defaults['provider']),
+        'cache_ttl': metadata.get('cache_ttl', defaults['cache_ttl']),
+        'policy': metadata.get('policy', ''),
+    }
+
+
+def summarize_configuration(folder, config, prices):
+    """Per-turn costs, per-conversation costs and the cost/TTFT point of one result folder"""
+    df = load_folder(folder)
+    model_prices = lookup_prices(prices, config['provider'], config['model'])
+    df = add_turn_costs(df, model_prices, config['cache_ttl'])
+    conversations = conversation_costs(df)
+    point = {
+        'folder': folder,
+        **config,
+        'conversations': len(conversations),
+        'mean_turn_cost': df['turn_cost'].mean(),
+        'mean_conversation_cost': conversations['conversation_cost'].mean(),
+        'uncached_conversation_cost': conversations['uncached_conversation_cost'].mean(),
+        'mean_ttft': df['ttft'].mean(),
+        'p90_ttft': df['ttft'].quantile(0.9),
+    }
+    point['savings_pct'] = (1 - point['mean_conversation_cost'] / point['uncached_conversation_cost']) * 100
+    return df, conversations, point
+
+
+def pareto_front(points, cost_key='mean_conversation_cost', latency_key='mean_ttft'):
+    """Mark configurations that no other configuration beats on both cost and TTFT"""
+    for point in points:
+        point['pareto_optimal'] = not any(
+            other is not point
+            and other[cost_key] <= point[cost_key] and other[latency_key] <= point[latency_key]
+            and (other[cost_key] < point[cost_key] or other[latency_key] < point[latency_key])
+            for other in points
+        )
+    return points
+
+
+def plot_cost_vs_ttft(points, output):
+    """Scatter of conversation cost against TTFT with the Pareto front highlighted"""
+    fig, ax = plt.subplots(figsize=(10, 7))
+    for point in points:
+        ax.scatter(point['mean_conversation_cost'], point['mean_ttft'], s=60,
+                   color='tab:red' if point['pareto_optimal'] else 'tab:gray', alpha=0.8)
+        ax.annotate(point['folder'], (point['mean_conversation_cost'], point['mean_ttft']),
+                    textcoords='offset points', xytext=(5, 5), fontsize=9)
+
+    front = sorted((p for p in points if p['pareto_optimal']), key=lambda p: p['mean_conversation_cost'])
+    if len(front) > 1:
+        ax.step([p['mean_conversation_cost'] for p in front], [p['mean_ttft'] for p in front],
+                where='post', color='tab:red', linewidth=1.5, label='Pareto front')
+        ax.legend()
+
+    ax.set_xlabel('Mean cost per conversation (USD)', fontsize=12)
+    ax.set_ylabel('Mean TTFT (seconds)', fontsize=12)
+    ax.set_title('Cost vs TTFT by Configuration', fontsize=14)
+    ax.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(output, dpi=150, bbox_inches='tight')
+    show_figure(fig)
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Cost per turn/conversation and cost vs TTFT Pareto analysis.")
+    parser.add_argument('folders', nargs='+', help="Result folders, one per configuration")
+    parser.add_argument('--prices', help="JSON price table overriding the defaults ({provider: {model: {...}}})")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="Model for folders without run_metadata.json")
+    parser.add_argument('--provider', default=DEFAULT_PROVIDER, choices=['bedrock', 'anthropic'])
+    parser.add_argument('--ttl', default=DEFAULT_TTL, choices=['5m', '1h'], help="Cache write TTL tier")
+    parser.add_argument('--output-prefix', default='cost', help="Prefix of the CSV and PNG outputs")
+    args = parser.parse_args(argv)
+
+    prices = load_price_table(args.prices)
+    defaults = {'model': args.model, 'provider': args.provider, 'cache_ttl': args.ttl}
+
+    points = []
+    turn_frames = []
+    for folder in args.folders:
+        if not os.path.exists(folder):
+            print(f"Warning: {folder} folder not found.")
+            return 1
+        config = resolve_configuration(folder, defaults)
+        df, conversations, point = summarize_configuration(folder, config, prices)
+        df['folder'] = folder
+        turn_frames.append(df)
+        points.append(point)
+
+        print(f"\n{folder} ({config['provider']} / {config['model']} / TTL {config['cache_ttl']}):")
+        per_turn = df.groupby('turn')['turn_cost'].mean()
+        for turn, cost in per_turn.items():
+            print(f"  Turn {turn:2d}: ${cost:.5f}")
+        print(f"  Conversation: ${point['mean_conversation_cost']:.4f} "
+              f"(without cache ${point['uncached_conversation_cost']:.4f}, {point['savings_pct']:+.1f}% saved)")
+
+    pareto_front(points)
+
+    print("\n=== Cost vs TTFT ===")
+    print(f"{'Folder':30s} | {'$/conversation':>14s} | {'Mean TTFT':>9s} | {'P90 TTFT':>8s} | Pareto")
+    print("-" * 80)
+    for point in sorted(points, key=lambda p: p['mean_conversation_cost']):
+        print(f"{point['folder']:30s} | {point['mean_conversation_cost']:14.4f} | {point['mean_ttft']:8.3f}s | "
+              f"{point['p90_ttft']:7.3f}s | {'*' if point['pareto_optimal'] else ''}")
+
+    pd.concat(turn_frames, ignore_index=True).to_csv(f"{args.output_prefix}_per_turn.csv", index=False)
+    pd.DataFrame(points).to_csv(f"{args.output_prefix}_pareto.csv", index=False)
+    plot_cost_vs_ttft(points, f"{args.output_prefix}_vs_ttft.png")
+    print(f"\nSaved '{args.output_prefix}_per_turn.csv', '{args.output_prefix}_pareto.csv' "
+          f"and '{args.output_prefix}_vs_ttft.png'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from functools import lru_cache
+
+from benchmark_runner import is_throttling_error
+
+ROUTING_POLICIES = ("sticky", "round-robin")
+DEFAULT_COOLDOWN_SECONDS = 30.0
+
+
+def affinity_key(params):
+    """
+    Identity of a request's cacheable prefix: tool names, system texts and the blocks of the first message.
+    Breakpoints are ignored (the sliding window moves them). A digest rather than hash(), whose string
+    hashes are salted per process, so every process and host places a prefix on the same endpoint;
+    it is computed once per prefix (the lookup uses Python's cached string hashes).
+    """
+    tools = tuple(tool.get("name") for tool in params.get("tools") or [])
+    system = params.get("system") or []
+    if isinstance(system, str):
+        system = [{"text": system}]
+    messages = params.get("messages") or []
+    first = messages[0]["content"] if messages else []
+    if isinstance(first, str):
+        first = [{"text": first}]
+    return _prefix_digest((tools, tuple(block.get("text") for block in system),
+                           tuple(block.get("text") for block in first)))
+
+
+@lru_cache(maxsize=1024)
+def _prefix_digest(identity):
+    return hashlib.sha1(json.dumps(identity, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def rendezvous_order(key, names):
+    """Endpoints ordered by highest random weight for the key: stable, and a lost endpoint only moves its own keys"""
+    return sorted(names, key=lambda name: hashlib.md5(f"{key}:{name}".encode()).digest(), reverse=True)
+
+
+class _RoutedMessages:
+    def __init__(self, router):
+        self._router = router
+
+    def create(self, model, **params):
+        return self._router.create(model, **params)
+
+
+class CacheAffinityRouter:
+    """
+    Client-side router over several Bedrock endpoints (regions, inference profiles or local stand-ins),
+    used in place of a single client: router.messages.create(...) has the same shape.
+
+    With the sticky policy every prefix (see affinity_key) stays on the endpoint that served it, so its
+    prompt cache keeps hitting. A throttled endpoint cools down and the request fails over to the next
+    endpoint in rendezvous order, which then keeps the conversation. round-robin spreads requests
+    regardless of prefix and is the baseline.
+    endpoints: list of {"name", "client", optional "model"} (model replaces the request's model id).
+    """
+
+    def __init__(self, endpoints, policy="sticky", cooldown=DEFAULT_COOLDOWN_SECONDS):
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown routing policy '{policy}'")
+        self.endpoints = {endpoint["name"]: endpoint for endpoint in endpoints}
+        self.policy = policy
+        self.cooldown = cooldown
+        self.assignments = {}
+        self.cooldown_until = {}
+        self.requests = []
+        self.messages = _RoutedMessages(self)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def route(self, key):
+        """Endpoints to try in order: assigned/preferred first, cooling-down ones last (soonest available first)"""
+        now = time.time()
+        with self._lock:
+            if self.policy == "round-robin":
+                names = list(self.endpoints)
+                start = self._next % len(names)
+                self._next += 1
+                order = names[start:] + names[:start]
+            else:
+                order = rendezvous_order(key, list(self.endpoints))
+                assigned = self.assignments.get(key)
+                if assigned is not None:
+                    order.remove(assigned)
+                    order.insert(0, assigned)
+            healthy = [name for name in order if self.cooldown_until.get(name, 0) <= now]
+            cooling = sorted((name for name in order if name not in healthy), key=lambda name: self.cooldown_until[name])
+        return healthy + cooling
+
+    def create(self, model, **params):
+        key = affinity_key(params)
+        last_error = None
+        for failovers, name in enumerate(self.route(key)):
+            endpoint = self.endpoints[name]
+            start = time.time()
+            try:
+                stream = endpoint["client"].messages.create(model=endpoint.get("model") or model, **params)
+            except Exception as e:
+                if not is_throttling_error(e):
+                    raise
+                with self._lock:
+                    self.cooldown_until[name] = time.time() + self.cooldown
+                self._record(name, key, failovers, start, throttled=True)
+                last_error = e
+                continue
+            with self._lock:
+                self.assignments[key] = name
+            return self._observe(stream, name, key, failovers, start)
+        raise last_error
+
+    def _observe(self, stream, name, key, failovers, start):
+        """Pass the events through while noting the endpoint's TTFT and cache usage"""
+        ttft = None
+        usage = {}
+        for event in stream:
+            if ttft is None and event.type == "content_block_start":
+                ttft = time.time() - start
+            elif event.type == "message_stop":
+                usage = getattr(event, 'amazon-bedrock-invocationMetrics', None) or {}
+            yield event
+        self._record(name, key, failovers, start, ttft=ttft, usage=usage)
+
+    def _record(self, name, key, failovers, start, throttled=False, ttft=None, usage=None):
+        usage = usage or {}
+        with self._lock:
+            self.requests.append({
+                "endpoint": name,
+                "affinity_key": key,
+                "policy": self.policy,
+                "time": start,
+                "failovers": failovers,
+                "throttled": throttled,
+                "ttft": ttft,
+                "input_tokens": usage.get("inputTokenCount", 0),
+                "cache_creation_input_tokens": usage.get("cacheWriteInputTokenCount") or 0,
+                "cache_read_input_tokens": usage.get("cacheReadInputTokenCount") or 0,
+            })
+
+    def endpoint_stats(self):
+        """Per endpoint: requests, throttles, failovers received, TTFT and cache-hit statistics"""
+        import pandas as pd
+
+        df = pd.DataFrame(self.requests)
+        if df.empty:
+            return df
+        served = df[~df["throttled"]].copy()
+        served["prompt_tokens"] = (served["input_tokens"] + served["cache_creation_input_tokens"]
+                                   + served["cache_read_input_tokens"])
+        stats = served.groupby("endpoint").agg(
+            requests=("ttft", "size"),
+            failovers_in=("failovers", lambda x: int((x > 0).sum())),
+            mean_ttft=("ttft", "mean"),
+            p90_ttft=("ttft", lambda x: x.quantile(0.9)),
+            cache_hits=("cache_read_input_tokens", lambda x: int((x > 0).sum())),
+            cache_read=("cache_read_input_tokens", "sum"),
+            prompt_tokens=("prompt_tokens", "sum"),
+        )
+        stats = stats.reindex(list(self.endpoints)).fillna({"requests": 0, "failovers_in": 0, "cache_hits": 0,
+                                                           "cache_read": 0, "prompt_tokens": 0})
+        stats.index.name = "endpoint"
+        stats["throttles"] = df[df["throttled"]].groupby("endpoint").size()
+        stats = stats.fillna({"throttles": 0}).astype({"requests": int, "failovers_in": int, "cache_hits": int,
+                                                        "throttles": int})
+        stats["cache_read_ratio"] = stats["cache_read"] / stats["prompt_tokens"]
+        return stats.reset_index()
+
+
+def parse_endpoint(spec, max_retries=0):
+    """'us-west-2', 'eu-central-1@eu.anthropic.claude-...' or 'http://host:port' -> endpoint dict"""
+    from benchmark_runner import make_bedrock_client
+
+    target, _, model = spec.partition("@")
+    if target.startswith("http://") or target.startswith("https://"):
+        client = make_bedrock_client(base_url=target, max_retries=max_retries)
+    else:
+        client = make_bedrock_client(target, max_retries=max_retries)
+    return {"name": target, "client": client, "model": model or None}
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Route conversations across Bedrock endpoints with cache affinity.")
+    parser.add_argument("--endpoint", action="append", default=[],
+                        help="Region (optionally region@model-id) or stand-in URL; repeat for each endpoint")
+    parser.add_argument("--local", type=int, default=0, help="Start this many local stand-in endpoints instead")
+    parser.add_argument("--local-throttle", type=float, nargs="+", default=[0.0],
+                        help="Throttle rate of each local endpoint (the last value repeats)")
+    parser.add_argument("--local-time-scale", type=float, default=0.2)
+    parser.add_argument("--policies", nargs="+", choices=ROUTING_POLICIES, default=list(ROUTING_POLICIES))
+    parser.add_argument("--cooldown", type=float, default=DEFAULT_COOLDOWN_SECONDS)
+    parser.add_argument("--conversations", type=int, default=6)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--model", default="us.anthropic.claude-3-7-sonnet-20250219-v1:0")
+    parser.add_argument("--document", default="RomeoAndJuliet.txt")
+    parser.add_argument("--ttl", choices=["5m", "1h"], default="5m")
+    parser.add_argument("--result-dir", default="endpoint_router")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from benchmark_runner import DEFAULT_SYSTEM_PROMPT, make_cache_control, run_conversation
+    from results_io import write_run_metadata
+
+    servers = []
+    specs = list(args.endpoint)
+    for i in range(args.local):
+        from local_bedrock_server import LocalBedrockServer
+        rate = args.local_throttle[min(i, len(args.local_throttle) - 1)]
+        servers.append(LocalBedrockServer(profile={"time_scale": args.local_time_scale}, throttle_rate=rate,
+                                          seed=i).start())
+        specs.append(servers[-1].url)
+    if not specs:
+        parser.error("Give at least one --endpoint or --local N")
+
+    with open(args.document, 'r') as file:
+        sample_text = file.read()
+    endpoints = [parse_endpoint(spec) for spec in specs]
+    run_tag = uuid.uuid4().hex[:8]
+
+    for policy in args.policies:
+        router = CacheAffinityRouter(endpoints, policy=policy, cooldown=args.cooldown)
+        folder = os.path.join(args.result_dir, policy)
+        os.makedirs(folder, exist_ok=True)
+        write_run_metadata(folder, {"model": args.model, "provider": "bedrock", "policy": f"router-{policy}",
+                                    "endpoints": specs, "cache_ttl": args.ttl,
+                                    "n_experiments": args.conversations, "n_turns": args.turns})
+        # Each conversation gets its own prefix so the router has several to place; the run tag isolates policies
+        for exp_num in range(args.conversations):
+            print(f"[{policy}] Conversation {exp_num + 1}/{args.conversations}")
+            rows = run_conversation(router, args.model, f"[Conversation {exp_num + 1}]\n{sample_text}", exp_num,
+                                    args.turns, cache_control=make_cache_control(args.ttl),
+                                    system_prompt=f"{DEFAULT_SYSTEM_PROMPT} [run {run_tag} {policy}]")
+            pd.DataFrame(rows).to_csv(f"{folder}/cache_experiment_results_router_{exp_num}.csv", index=False)
+        # Beside the policy folder, not in it: load_folder reads every CSV of a folder as turn rows
+        pd.DataFrame(router.requests).to_csv(os.path.join(args.result_dir, f"router_requests_{policy}.csv"),
+                                             index=False)
+
+        stats = router.endpoint_stats()
+        print(f"\n=== {policy}: per-endpoint statistics ===")
+        print(f"{'Endpoint':28s} | {'Requests':>8s} | {'Throttled':>9s} | {'Failover in':>11s} | {'Mean TTFT':>9s} | "
+              f"{'P90 TTFT':>8s} | {'Hits':>5s} | {'Read ratio':>10s}")
+        print("-" * 110)
+        for row in stats.to_dict('records'):
+            print(f"{row['endpoint']:28s} | {row['requests']:8d} | {row['throttles']:9d} | {row['failovers_in']:11d} | "
+                  f"{row['mean_ttft']:8.3f}s | {row['p90_ttft']:7.3f}s | {row['cache_hits']:5d} | "
+                  f"{row['cache_read_ratio']:10.1%}")
+        total_read = stats['cache_read'].sum() / stats['prompt_tokens'].sum()
+        print(f"Overall cache-read ratio: {total_read:.1%}")
+
+    for server in servers:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import argparse
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+FORK_MODES = ("regenerate", "edit")
+
+# Edits of the question at the fork point, one per branch (regenerate re-asks it unchanged)
+QUESTION_EDITS = [
+    "{question}",
+    "Answer briefly: {question}",
+    "{question} Please answer in detail.",
+    "{question} Quote the text where possible.",
+    "Thinking about the ending, {question_lower}",
+    "{question} Answer as a bullet list.",
+    "{question} Compare two characters in your answer.",
+    "In plain words: {question_lower}",
+]
+
+
+def branch_questions(questions, fork_turn, branch, mode):
+    """Question list of one branch: the fork turn's question edited per branch in edit mode"""
+    questions = list(questions)
+    if mode == "edit":
+        question = questions[fork_turn % len(questions)]
+        edit = QUESTION_EDITS[branch % len(QUESTION_EDITS)]
+        questions[fork_turn % len(questions)] = edit.format(question=question,
+                                                            question_lower=question[0].lower() + question[1:])
+    return questions
+
+
+def run_fork(state, fork_turn, n_branches, branch_turns, mode, stagger=0.0):
+    """
+    Run the trunk up to fork_turn, then n_branches continuations of it concurrently (each one
+    branch_turns long, started stagger seconds apart). Returns the rows of the trunk and every branch,
+    labelled with branch (0 = trunk) and phase ('trunk', 'fork' for a branch's first turn, 'branch').
+    """
+    from benchmark_runner import fork_conversation, run_turn
+
+    rows = []
+    for turn in range(fork_turn):
+        rows.append(dict(run_turn(state, turn, fork_turn + branch_turns), branch=0, phase="trunk"))
+
+    def run_branch(branch):
+        time.sleep(branch * stagger)
+        branch_state = fork_conversation(state, questions=branch_questions(state["questions"], fork_turn,
+                                                                           branch, mode))
+        return [dict(run_turn(branch_state, turn, fork_turn + branch_turns), branch=branch + 1,
+                     phase="fork" if turn == fork_turn else "branch")
+                for turn in range(fork_turn, fork_turn + branch_turns)]
+
+    with ThreadPoolExecutor(max_workers=n_branches) as executor:
+        for branch_rows in executor.map(run_branch, range(n_branches)):
+            rows.extend(branch_rows)
+    return rows
+
+
+def summarize_forks(df):
+    """Per mode: the fork point's prompt, and cache reads / writes / cost of the branches' turns"""
+    df = df.copy()
+    df['prompt_tokens'] = df['input_tokens'] + df['cache_creation_input_tokens'] + df['cache_read_input_tokens']
+    df['read_ratio'] = df['cache_read_input_tokens'] / df['prompt_tokens']
+    rows = []
+    for mode, group in df.groupby('mode'):
+        trunk = group[group['phase'] == 'trunk']
+        fork = group[group['phase'] == 'fork']
+        later = group[group['phase'] == 'branch']
+        branches = group[group['branch'] > 0]
+        rows.append({
+            'mode': mode,
+            'forks': group['experiment'].nunique(),
+            'branches': int(fork.groupby('experiment')['branch'].nunique().mean()),
+            'trunk_prompt_tokens': trunk.groupby('experiment')['prompt_tokens'].last().mean(),
+            'fork_read_ratio': fork['read_ratio'].mean(),
+            'fork_write_tokens': fork['cache_creation_input_tokens'].mean(),
+            'fork_uncached_tokens': fork['input_tokens'].mean(),
+            'fork_ttft': fork['ttft'].mean(),
+            'fork_ttft_spread': fork.groupby('experiment')['ttft'].agg(lambda x: x.max() - x.min()).mean(),
+            'branch_read_ratio': later['read_ratio'].mean() if len(later) else float('nan'),
+            'branch_write_cost': branches['cache_write_cost'].sum() / group['experiment'].nunique(),
+            'branch_cost': branches['turn_cost'].sum() / group['experiment'].nunique(),
+            'branch_uncached_cost': branches['uncached_turn_cost'].sum() / group['experiment'].nunique(),
+        })
+    return rows
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Fork conversations at a cached turn into concurrent branches.")
+    parser.add_argument("--fork-at", type=int, default=3, help="Turns of the shared trunk before the fork")
+    parser.add_argument("--branches", type=int, default=4)
+    parser.add_argument("--branch-turns", type=int, default=2)
+    parser.add_argument("--modes", nargs="+", choices=FORK_MODES, default=list(FORK_MODES),
+                        help="regenerate: every branch re-asks the next question; edit: each branch edits it")
+    parser.add_argument("--stagger", type=float, default=0.0, help="Seconds between branch starts")
+    parser.add_argument("--conversations", type=int, default=2, help="Forked conversations per mode")
+    parser.add_argument("--model", default="us.anthropic.claude-3-7-sonnet-20250219-v1:0")
+    parser.add_argument("--region", default="us-west-2")
+    parser.add_argument("--endpoint-url")
+    parser.add_argument("--local", action="store_true", help="Start an in-process local stand-in endpoint")
+    parser.add_argument("--local-time-scale", type=float, default=1.0)
+    parser.add_argument("--document", default="RomeoAndJuliet.txt")
+    parser.add_argument("--ttl", choices=["5m", "1h"], default="5m")
+    parser.add_argument("--result-dir", default="fork_benchmark")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from benchmark_runner import DEFAULT_SYSTEM_PROMPT, make_bedrock_client, make_cache_control, new_conversation
+    from cost_model import add_turn_costs, load_price_table, lookup_prices
+    from results_io import write_run_metadata
+
+    endpoint_url = args.endpoint_url
+    local_server = None
+    if args.local:
+        from local_bedrock_server import LocalBedrockServer
+        local_server = LocalBedrockServer(profile={"time_scale": args.local_time_scale}).start()
+        endpoint_url = local_server.url
+
+    with open(args.document, 'r') as file:
+        sample_text = file.read()
+    client = make_bedrock_client(args.region, base_url=endpoint_url)
+    cache_control = make_cache_control(args.ttl)
+    run_tag = uuid.uuid4().hex[:8]
+
+    frames = []
+    for mode in args.modes:
+        # One result folder per mode, so analyze / catalog can compare them; the summary goes beside them
+        folder = os.path.join(args.result_dir, mode)
+        write_run_metadata(folder, {"model": args.model, "provider": "bedrock", "endpoint": endpoint_url,
+                                    "policy": "sliding-window", "cache_ttl": args.ttl, "fork_mode": mode,
+                                    "fork_at": args.fork_at, "branches": args.branches,
+                                    "branch_turns": args.branch_turns, "stagger": args.stagger})
+        for exp_num in range(args.conversations):
+            print(f"[{mode}] Conversation {exp_num + 1}/{args.conversations}: {args.fork_at} trunk turns, "
+                  f"{args.branches} branches of {args.branch_turns}")
+            # Every trunk is new, so the fork point is the only prefix its branches can share
+            state = new_conversation(client, args.model, sample_text, exp_num, cache_control=cache_control,
+                                     system_prompt=f"{DEFAULT_SYSTEM_PROMPT} [run {run_tag} {mode} {exp_num}]")
+            df = pd.DataFrame(run_fork(state, args.fork_at, args.branches, args.branch_turns, mode, args.stagger))
+            df['mode'] = mode
+            df.to_csv(os.path.join(folder, f"cache_experiment_results_fork_{exp_num}.csv"), index=False)
+            frames.append(df)
+    if local_server is not None:
+        local_server.stop()
+
+    prices = lookup_prices(load_price_table(), "bedrock", args.model)
+    summary = pd.DataFrame(summarize_forks(add_turn_costs(pd.concat(frames, ignore_index=True), prices, args.ttl)))
+    summary_path = os.path.join(args.result_dir, "fork_summary.csv")
+    summary.to_csv(summary_path, index=False)
+
+    print(f"\n=== Forks at turn {args.fork_at + 1}: {args.branches} concurrent branches ===")
+    print(f"{'Mode':10s} | {'Trunk tok':>9s} | {'Fork read':>9s} | {'Fork write':>10s} | {'Fork TTFT':>9s} | "
+          f"{'Spread':>7s} | {'Later read':>10s} | {'Write $':>8s} | {'Branch $':>8s} | {'Uncached $':>10s}")
+    print("-" * 122)
+    for row in summary.to_dict('records'):
+        print(f"{row['mode']:10s} | {row['trunk_prompt_tokens']:9.0f} | {row['fork_read_ratio']:9.1%} | "
+              f"{row['fork_write_tokens']:10.0f} | {row['fork_ttft']:8.3f}s | {row['fork_ttft_spread']:6.3f}s | "
+              f"{row['branch_read_ratio']:10.1%} | {row['branch_write_cost']:8.4f} | {row['branch_cost']:8.4f} | "
+              f"{row['branch_uncached_cost']:10.4f}")
+    print(f"\nSaved per-conversation rows in '{args.result_dir}/<mode>' and '{summary_path}'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
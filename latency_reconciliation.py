@@ -0,0 +1,141 @@
+import argparse
+import os
+import sys
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from analyze_cache_and_latency_ttft import show_figure
+from results_io import load_folder
+
+# Components of each turn, in seconds.
+# Server columns come from amazon-bedrock-invocationMetrics (milliseconds), client columns from the runner.
+COMPONENTS = {
+    'server_ttft': 'Server time to first byte',
+    'ttft_overhead': 'Network/transfer before first token',
+    'server_generation': 'Server generation after first byte',
+    'network_transfer': 'Network/transfer/SDK overhead (total)',
+    'client_processing': 'Client processing overhead',
+}
+
+PERCENTILES = [50, 90, 99]
+
+
+def reconcile(df):
+    """
+    Split each turn's client-measured latency into server, network/transfer and client processing time.
+    Rows recorded without invocation metrics are dropped.
+    """
+    required = ['invocation_latency_bedrock', 'first_byte_latency', 'ttft', 'invocation_latency']
+    missing = [column for column in required if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns {missing}; record with test_AnthropicBedrock_api_cache_control_added.py")
+
+    df = df.dropna(subset=required).copy()
+    client_processing = df['client_processing_time'] if 'client_processing_time' in df.columns else 0.0
+
+    df['server_total'] = df['invocation_latency_bedrock'] / 1000
+    df['server_ttft'] = df['first_byte_latency'] / 1000
+    df['server_generation'] = df['server_total'] - df['server_ttft']
+    df['ttft_overhead'] = df['ttft'] - df['server_ttft']
+    df['client_processing'] = client_processing
+    df['network_transfer'] = df['invocation_latency'] - df['server_total'] - df['client_processing']
+    df['server_share_of_ttft'] = df['server_ttft'] / df['ttft']
+    df['server_share_of_latency'] = df['server_total'] / df['invocation_latency']
+    return df
+
+
+def component_distributions(df):
+    """Mean and percentiles of every component over all turns"""
+    rows = []
+    for column, label in COMPONENTS.items():
+        values = df[column].to_numpy(dtype=float)
+        row = {'component': label, 'mean': values.mean(), 'std': values.std()}
+        for p in PERCENTILES:
+            row[f"p{p}"] = np.percentile(values, p)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def per_turn_breakdown(df):
+    """Median of every component per turn"""
+    columns = list(COMPONENTS) + ['ttft', 'invocation_latency', 'server_share_of_ttft']
+    return df.groupby('turn')[columns].median().reset_index()
+
+
+def plot_reconciliation(folder, df, per_turn, output):
+    """Stacked per-turn latency breakdown and the distribution of each component"""
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(18, 6))
+
+    stacks = ['server_ttft', 'server_generation', 'network_transfer', 'client_processing']
+    bottom = np.zeros(len(per_turn))
+    for column in stacks:
+        ax1.bar(per_turn['turn'], per_turn[column], bottom=bottom, label=COMPONENTS.get(column, column), alpha=0.85)
+        bottom += per_turn[column].to_numpy()
+    ax1.plot(per_turn['turn'], per_turn['ttft'], marker='s', color='black', label='Client TTFT', linewidth=2)
+    ax1.set_xlabel('Turn', fontsize=12)
+    ax1.set_ylabel('Seconds (median)', fontsize=12)
+    ax1.set_title('Latency Breakdown by Turn', fontsize=14)
+    ax1.legend()
+    ax1.grid(True, alpha=0.3)
+
+    ax2.boxplot([df[column] for column in COMPONENTS], showfliers=True)
+    ax2.set_xticks(range(1, len(COMPONENTS) + 1))
+    ax2.set_xticklabels([label.replace(' ', '\n', 2) for label in COMPONENTS.values()], fontsize=9)
+    ax2.set_ylabel('Seconds', fontsize=12)
+    ax2.set_title('Component Distributions', fontsize=14)
+    ax2.grid(True, alpha=0.3)
+
+    fig.suptitle(f'Server vs Client Latency Reconciliation ({folder})', fontsize=16)
+    plt.tight_layout()
+    plt.savefig(output, dpi=150, bbox_inches='tight')
+    show_figure(fig)
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Reconcile Bedrock server latency with client-measured latency.")
+    parser.add_argument('folders', nargs='+', help="Result folders recorded with invocation metrics")
+    parser.add_argument('--output-prefix', default='latency_reconciliation')
+    args = parser.parse_args(argv)
+
+    for folder in args.folders:
+        if not os.path.exists(folder):
+            print(f"Warning: {folder} folder not found.")
+            return 1
+
+        try:
+            df = reconcile(load_folder(folder))
+        except ValueError as e:
+            print(f"Warning: {folder} skipped: {e}")
+            continue
+        if df.empty:
+            print(f"Warning: {folder} skipped: no turns with invocation metrics.")
+            continue
+        per_turn = per_turn_breakdown(df)
+        distributions = component_distributions(df)
+
+        print(f"\n=== Latency Reconciliation: {folder} ({len(df)} turns) ===")
+        print(f"{'Component':40s} | {'Mean':>7s} | {'Std':>7s} | " + " | ".join(f"{f'P{p}':>7s}" for p in PERCENTILES))
+        print("-" * 90)
+        for row in distributions.itertuples(index=False):
+            print(f"{row.component:40s} | {row.mean:6.3f}s | {row.std:6.3f}s | "
+                  + " | ".join(f"{getattr(row, f'p{p}'):6.3f}s" for p in PERCENTILES))
+
+        print("\nTurn | Client TTFT | Server TTFB | Overhead | Server share of TTFT")
+        for row in per_turn.itertuples(index=False):
+            print(f"{row.turn:4d} | {row.ttft:10.3f}s | {row.server_ttft:10.3f}s | {row.ttft_overhead:7.3f}s | "
+                  f"{row.server_share_of_ttft:.1%}")
+        print(f"\n  The model accounts for {df['server_ttft'].sum() / df['ttft'].sum():.1%} of TTFT and "
+              f"{df['server_total'].sum() / df['invocation_latency'].sum():.1%} of total latency.")
+
+        name = os.path.basename(os.path.normpath(folder))
+        df.to_csv(f"{args.output_prefix}_{name}.csv", index=False)
+        plot_reconciliation(folder, df, per_turn, f"{args.output_prefix}_{name}.png")
+        print(f"  Saved '{args.output_prefix}_{name}.csv' and '{args.output_prefix}_{name}.png'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
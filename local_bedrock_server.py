@@ -0,0 +1,281 @@
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import struct
+import sys
+import threading
+import time
+import uuid
+import zlib
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Default timing profile of the stand-in model, in seconds
+DEFAULT_PROFILE = {
+    "base_ttft": 0.35,              # Fixed time to first byte
+    "prefill_per_token": 0.00015,   # Added per uncached prompt token
+    "cached_per_token": 0.00001,    # Added per prompt token read from the cache
+    "token_interval": 0.02,         # Between output tokens
+    "tokens_per_chunk": 3,          # Output tokens per content_block_delta
+    "output_tokens": 200,           # Answer length when max_tokens allows it
+    "time_scale": 1.0,              # 0 disables all sleeps (profiling), 0.1 runs 10x faster
+}
+
+CACHE_TTL_SECONDS = {"5m": 300, "1h": 3600}
+
+ANSWER_WORDS = ("Romeo and Juliet are young lovers from feuding families in Verona whose secret marriage "
+                "and hasty choices end in tragedy that finally reconciles the Montagues and Capulets").split()
+
+
+def estimate_tokens(text):
+    """Rough token count used by the stand-in (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def encode_event_stream_message(headers, payload):
+    """Encode one AWS event-stream message (prelude, string headers, payload, CRC32 checksums)"""
+    encoded_headers = b""
+    for name, value in headers.items():
+        name_bytes, value_bytes = name.encode(), value.encode()
+        encoded_headers += struct.pack("!B", len(name_bytes)) + name_bytes
+        encoded_headers += struct.pack("!BH", 7, len(value_bytes)) + value_bytes
+    total_length = 12 + len(encoded_headers) + len(payload) + 4
+    prelude = struct.pack("!II", total_length, len(encoded_headers))
+    prelude += struct.pack("!I", zlib.crc32(prelude))
+    message = prelude + encoded_headers + payload
+    return message + struct.pack("!I", zlib.crc32(message))
+
+
+def encode_chunk(event):
+    """Wrap a Messages API stream event the way invoke-with-response-stream does"""
+    payload = json.dumps({"bytes": base64.b64encode(json.dumps(event).encode()).decode()}).encode()
+    return encode_event_stream_message(
+        {":event-type": "chunk", ":content-type": "application/json", ":message-type": "event"}, payload)
+
+
+def prompt_blocks(body):
+    """Flatten system, tools and messages into (text, cache_control) blocks in prompt order"""
+    blocks = []
+    for tool in body.get("tools") or []:
+        tool = dict(tool)
+        cache_control = tool.pop("cache_control", None)
+        blocks.append((json.dumps(tool, sort_keys=True), cache_control))
+    system = body.get("system") or []
+    if isinstance(system, str):
+        system = [{"type": "text", "text": system}]
+    for block in system:
+        blocks.append((block.get("text", ""), block.get("cache_control")))
+    for message in body.get("messages", []):
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        for block in content:
+            text = block.get("text") or json.dumps({k: v for k, v in block.items() if k != "cache_control"}, sort_keys=True)
+            blocks.append((message["role"] + ":" + text, block.get("cache_control")))
+    return blocks
+
+
+class PromptCacheSimulator:
+    """
+    Prefix cache keyed on the hash of everything up to a breakpoint.
+    A request reads the longest cached breakpoint prefix and writes every later breakpoint prefix.
+    """
+
+    def __init__(self):
+        self._entries = {}  # prefix hash -> (tokens, expires_at, ttl_seconds)
+        self._lock = threading.Lock()
+
+    def account(self, body, now=None):
+        """Return (input_tokens, cache_write_tokens, cache_read_tokens) for a request body"""
+        now = time.time() if now is None else now
+        digest = hashlib.sha256()
+        position = 0
+        breakpoints = []
+        for text, cache_control in prompt_blocks(body):
+            digest.update(text.encode())
+            position += estimate_tokens(text)
+            if cache_control:
+                ttl = CACHE_TTL_SECONDS.get(cache_control.get("ttl", "5m"), 300)
+                breakpoints.append((digest.copy().hexdigest(), position, ttl))
+        total = position
+
+        with self._lock:
+            read = 0
+            for key, tokens, ttl in breakpoints:
+                entry = self._entries.get(key)
+                if entry and entry[1] >= now:
+                    read = max(read, tokens)
+                    self._entries[key] = (tokens, now + entry[2], entry[2])
+            written_until = read
+            for key, tokens, ttl in breakpoints:
+                if tokens > read:
+                    self._entries[key] = (tokens, now + ttl, ttl)
+                    written_until = max(written_until, tokens)
+        return total - written_until, written_until - read, read
+
+
+class LocalBedrockServer:
+    """Stand-in for the Bedrock runtime streaming endpoint used by AnthropicBedrock(base_url=...)"""
+
+    def __init__(self, host="127.0.0.1", port=0, profile=None, throttle_rate=0.0, seed=None, replay=None):
+        self.profile = dict(DEFAULT_PROFILE, **(profile or {}))
+        self.throttle_rate = throttle_rate
+        self.replay = replay
+        self.cache = PromptCacheSimulator()
+        self.requests_served = 0
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="local-bedrock").start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _sleep(self, seconds):
+        scaled = seconds * self.profile["time_scale"]
+        if scaled > 0:
+            time.sleep(scaled)
+
+    def replay_events(self, exchange):
+        """Yield (delay_before_seconds, event) pairs of a recorded exchange (see replay_log.py)"""
+        previous = 0
+        for offset, event in exchange["events"]:
+            yield (offset - previous) / 1e9, event
+            previous = offset
+
+    def stream_events(self, model, body):
+        """Yield (delay_before_seconds, event) pairs for one request"""
+        profile = self.profile
+        input_tokens, write_tokens, read_tokens = self.cache.account(body)
+        output_tokens = min(body.get("max_tokens", 256), profile["output_tokens"])
+        ttft = (profile["base_ttft"] + (input_tokens + write_tokens) * profile["prefill_per_token"]
+                + read_tokens * profile["cached_per_token"])
+
+        usage = {"input_tokens": input_tokens, "output_tokens": 1,
+                 "cache_creation_input_tokens": write_tokens, "cache_read_input_tokens": read_tokens}
+        message_id = f"msg_bdrk_{uuid.uuid4().hex[:24]}"
+        yield ttft, {"type": "message_start", "message": {
+            "id": message_id, "type": "message", "role": "assistant", "model": model, "content": [],
+            "stop_reason": None, "stop_sequence": None, "usage": usage}}
+        yield 0.0, {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+
+        emitted = 0
+        while emitted < output_tokens:
+            n = min(profile["tokens_per_chunk"], output_tokens - emitted)
+            words = [ANSWER_WORDS[(emitted + i) % len(ANSWER_WORDS)] for i in range(n)]
+            emitted += n
+            yield n * profile["token_interval"], {"type": "content_block_delta", "index": 0,
+                                                  "delta": {"type": "text_delta", "text": " " + " ".join(words)}}
+
+        generation = output_tokens * profile["token_interval"]
+        yield 0.0, {"type": "content_block_stop", "index": 0}
+        yield 0.0, {"type": "message_delta",
+                    "delta": {"stop_reason": "max_tokens" if output_tokens == body.get("max_tokens") else "end_turn",
+                              "stop_sequence": None},
+                    "usage": {"output_tokens": output_tokens}}
+        yield 0.0, {"type": "message_stop", "amazon-bedrock-invocationMetrics": {
+            "inputTokenCount": input_tokens,
+            "outputTokenCount": output_tokens,
+            "invocationLatency": int((ttft + generation) * 1000 * profile["time_scale"]),
+            "firstByteLatency": int(ttft * 1000 * profile["time_scale"]),
+            "cacheReadInputTokenCount": read_tokens,
+            "cacheWriteInputTokenCount": write_tokens,
+        }}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                match = re.match(r"^/model/([^/]+)/invoke-with-response-stream$", self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                raw_body = self.rfile.read(length)
+                if not match:
+                    self._send_json(404, {"message": f"Unknown path {self.path}"})
+                    return
+                if server.throttle_rate and server._random.random() < server.throttle_rate:
+                    server.throttled += 1
+                    self._send_json(429, {"message": "Too many requests, please wait before trying again."},
+                                    error_type="ThrottlingException")
+                    return
+
+                body = json.loads(raw_body)
+                model = unquote(match.group(1))
+                events = None
+                if server.replay is not None:
+                    exchange = server.replay.next_exchange(body)
+                    if exchange is not None and exchange["error"]:
+                        error = exchange["error"]
+                        server._sleep(error["offset_ns"] / 1e9)
+                        self._send_json(error["status"] or 500, {"message": error["message"]},
+                                        error_type=error["error_type"])
+                        return
+                    if exchange is not None:
+                        events = server.replay_events(exchange)
+
+                server.requests_served += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/vnd.amazon.eventstream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for delay, event in events or server.stream_events(model, body):
+                    server._sleep(delay)
+                    data = encode_chunk(event)
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _send_json(self, status, payload, error_type=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if error_type:
+                    self.send_header("x-amzn-ErrorType", error_type)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Local stand-in for the Bedrock streaming endpoint.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiply all simulated delays")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args(argv)
+
+    server = LocalBedrockServer(port=args.port, profile={"time_scale": args.time_scale},
+                                throttle_rate=args.throttle_rate)
+    print(f"Local Bedrock endpoint on {server.url} (use AnthropicBedrock(base_url=...))")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 30.0, 60.0)
+INTER_TOKEN_BUCKETS = (0.005, 0.01, 0.02, 0.03, 0.05, 0.075, 0.1, 0.2, 0.5, 1.0)
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues)) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def expose(self):
+        lines = [f"# TYPE {self.name} counter", f"# HELP {self.name} {self.documentation}"]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}_total{_format_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets and a fixed set of label names"""
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labelvalues, value):
+        with self._lock:
+            series = self._series.setdefault(labelvalues, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def expose(self):
+        lines = [f"# TYPE {self.name} histogram", f"# HELP {self.name} {self.documentation}"]
+        with self._lock:
+            for labelvalues, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, {'le': bound})} {count}")
+                count = series[len(self.buckets)]
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, {'le': '+Inf'})} {count}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labelvalues)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labelvalues)} {series[-1]}")
+        return lines
+
+
+class BenchmarkMetrics:
+    """
+    Live metrics of a benchmark run, labelled by model, provider and breakpoint policy.
+    The runner records into it; start_metrics_server() exposes it for Prometheus to scrape.
+    """
+
+    LABELS = ('model', 'provider', 'policy')
+
+    def __init__(self, model, provider, policy):
+        self.labelvalues = (model, provider, policy)
+        self.ttft = Histogram('bench_ttft_seconds', 'Client-measured time to first token.',
+                              self.LABELS, LATENCY_BUCKETS)
+        self.latency = Histogram('bench_invocation_latency_seconds', 'Client-measured end-to-end latency of a turn.',
+                                 self.LABELS, LATENCY_BUCKETS)
+        self.inter_token = Histogram('bench_inter_token_latency_seconds', 'Gap between consecutive streamed text deltas.',
+                                     self.LABELS, INTER_TOKEN_BUCKETS)
+        self.turns = Counter('bench_turns', 'Completed conversation turns.', self.LABELS)
+        self.input_tokens = Counter('bench_input_tokens', 'Uncached input tokens.', self.LABELS)
+        self.output_tokens = Counter('bench_output_tokens', 'Output tokens.', self.LABELS)
+        self.cache_write_tokens = Counter('bench_cache_write_tokens', 'Tokens written to the prompt cache.', self.LABELS)
+        self.cache_read_tokens = Counter('bench_cache_read_tokens', 'Tokens read from the prompt cache.', self.LABELS)
+        self.retries = Counter('bench_retries', 'API call attempts that failed and were retried.',
+                               self.LABELS + ('exception',))
+        self.throttles = Counter('bench_throttles', 'Attempts rejected by throttling or rate limits.', self.LABELS)
+
+    def collectors(self):
+        return [self.ttft, self.latency, self.inter_token, self.turns, self.input_tokens, self.output_tokens,
+                self.cache_write_tokens, self.cache_read_tokens, self.retries, self.throttles]
+
+    def observe_turn(self, turn_data, inter_token_latencies=()):
+        """Record one completed turn (a turn_data row of the runner)"""
+        labels = self.labelvalues
+        if turn_data.get("ttft") is not None:
+            self.ttft.observe(labels, turn_data["ttft"])
+        self.latency.observe(labels, turn_data["invocation_latency"])
+        for gap in inter_token_latencies:
+            self.inter_token.observe(labels, gap)
+        self.turns.inc(labels)
+        self.input_tokens.inc(labels, turn_data["input_tokens"])
+        self.output_tokens.inc(labels, turn_data["output_tokens"])
+        self.cache_write_tokens.inc(labels, turn_data["cache_creation_input_tokens"])
+        self.cache_read_tokens.inc(labels, turn_data["cache_read_input_tokens"])
+
+    def observe_retry(self, exception, throttled):
+        """Record one failed attempt that is about to be retried"""
+        self.retries.inc(self.labelvalues + (type(exception).__name__,))
+        if throttled:
+            self.throttles.inc(self.labelvalues)
+
+    def expose(self):
+        lines = []
+        for collector in self.collectors():
+            lines.extend(collector.expose())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(metrics, port, host="127.0.0.1"):
+    """Serve the metrics on http://host:port/metrics from a daemon thread; returns the server"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.expose().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep scrapes out of the benchmark output
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-exporter").start()
+    print(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,222 @@
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from analyze_cache_and_latency_ttft import folder_colors, show_figure
+
+DEFAULT_MAX_TOKENS = [256, 1024, 4096]
+
+# Questions that need long answers, so generation runs up to max_tokens instead of stopping early
+LONG_ANSWER_QUESTIONS = [
+    "Retell the whole story scene by scene, in as much detail as you can, quoting key lines.",
+    "Write a detailed essay on every major character: their motives, relationships and how they change.",
+    "Explain, act by act, every decision that leads to the tragic ending and what could have prevented it.",
+]
+
+# Output tokens per window of the time-per-token curve
+DEFAULT_WINDOW_TOKENS = 128
+
+
+class _Messages:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model, **params):
+        return self._owner.create(model, **params)
+
+
+class DecodeTimeline:
+    """
+    Client wrapper noting when each text delta arrives and how long its text is, so the output
+    tokens of a generation can be placed in time (run_turn only keeps the total).
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.messages = _Messages(self)
+        self.deltas = []
+
+    def create(self, model, **params):
+        self.deltas = []
+        return self._observe(self.client.messages.create(model=model, **params))
+
+    def _observe(self, stream):
+        for event in stream:
+            if event.type == "content_block_delta" and hasattr(event.delta, 'text'):
+                self.deltas.append((time.perf_counter(), len(event.delta.text)))
+            yield event
+
+
+def decode_windows(deltas, output_tokens, window_tokens=DEFAULT_WINDOW_TOKENS):
+    """
+    Time per output token along one generation. Tokens are spread over the deltas in proportion to
+    their text length; the time of a delta is the gap since the previous one (the first delta is TTFT).
+    Returns rows of (window_start_token, ms_per_token).
+    """
+    if len(deltas) < 2 or output_tokens <= 0:
+        return []
+    times = np.array([t for t, _ in deltas])
+    chars = np.array([n for _, n in deltas], dtype=float)
+    tokens = chars[1:] / chars.sum() * output_tokens
+    gaps = np.diff(times)
+    positions = np.cumsum(tokens) - tokens
+    rows = []
+    for start in range(0, int(positions[-1]) + 1, window_tokens):
+        in_window = (positions >= start) & (positions < start + window_tokens)
+        if tokens[in_window].sum() > 0:
+            rows.append({'window_start_token': start,
+                         'ms_per_token': gaps[in_window].sum() / tokens[in_window].sum() * 1000})
+    return rows
+
+
+def drift_per_1k_tokens(windows):
+    """Slope of ms/token against position, per 1000 output tokens (0 = steady decode rate)"""
+    if len(windows) < 2:
+        return float('nan')
+    x = np.array([w['window_start_token'] for w in windows], dtype=float)
+    y = np.array([w['ms_per_token'] for w in windows])
+    return float(np.polyfit(x, y, 1)[0] * 1000)
+
+
+def summarize_sweep(df):
+    """Decode throughput per model, max_tokens and prefix cache state"""
+    return df.groupby(['model', 'max_tokens', 'prefix_cached']).agg(
+        generations=('ttft', 'size'),
+        output_tokens=('output_tokens', 'mean'),
+        truncated=('truncated', 'mean'),
+        ttft=('ttft', 'mean'),
+        decode_time=('decode_time', 'mean'),
+        tokens_per_second=('tokens_per_second', 'mean'),
+        ms_per_token=('ms_per_token', 'mean'),
+        drift_ms_per_1k=('drift_ms_per_1k', 'mean'),
+    ).reset_index()
+
+
+def plot_decode_curves(windows, output):
+    """ms per output token against position in the answer, one line per model / max_tokens / cache state"""
+    curves = windows.groupby(['model', 'max_tokens', 'prefix_cached', 'window_start_token'])['ms_per_token'].mean()
+    keys = sorted({key[:3] for key in curves.index})
+    fig, ax = plt.subplots(figsize=(14, 7))
+    for (model, max_tokens, cached), color in zip(keys, folder_colors(len(keys))):
+        curve = curves.loc[(model, max_tokens, cached)]
+        ax.plot(curve.index, curve.values, color=color, linewidth=1.5, linestyle='-' if cached else '--',
+                label=f"{model.split('.')[-1]} max_tokens={max_tokens} {'cached' if cached else 'uncached'} prefix")
+    ax.set_xlabel('Output token position', fontsize=12)
+    ax.set_ylabel('Time per output token (ms)', fontsize=12)
+    ax.set_title('Decode Rate over Long Generations', fontsize=14)
+    ax.legend(fontsize=8)
+    ax.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(output, dpi=150, bbox_inches='tight')
+    show_figure(fig)
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="Sweep max_tokens with long-answer prompts to measure decode rate. Bedrock only: the harness "
+                    "reads Bedrock's invocation metrics, so the first-party API is not covered; compare models "
+                    "or inference profiles with --models.")
+    parser.add_argument("--models", nargs="+", default=["us.anthropic.claude-3-7-sonnet-20250219-v1:0"],
+                        help="Bedrock model ids or inference profiles")
+    parser.add_argument("--max-tokens", type=int, nargs="+", default=DEFAULT_MAX_TOKENS)
+    parser.add_argument("--repeats", type=int, default=3, help="Generations per model, max_tokens and cache state")
+    parser.add_argument("--window-tokens", type=int, default=DEFAULT_WINDOW_TOKENS)
+    parser.add_argument("--region", default="us-west-2")
+    parser.add_argument("--endpoint-url")
+    parser.add_argument("--local", action="store_true", help="Start an in-process local stand-in endpoint")
+    parser.add_argument("--local-time-scale", type=float, default=1.0)
+    parser.add_argument("--document", default="RomeoAndJuliet.txt")
+    parser.add_argument("--ttl", choices=["5m", "1h"], default="5m")
+    parser.add_argument("--result-dir", default="output_sweep")
+    args = parser.parse_args(argv)
+
+    from benchmark_runner import DEFAULT_SYSTEM_PROMPT, make_bedrock_client, make_cache_control, run_conversation
+    from results_io import write_run_metadata
+
+    endpoint_url = args.endpoint_url
+    local_server = None
+    if args.local:
+        from local_bedrock_server import LocalBedrockServer
+        local_server = LocalBedrockServer(profile={"time_scale": args.local_time_scale,
+                                                   "output_tokens": max(args.max_tokens)}).start()
+        endpoint_url = local_server.url
+
+    with open(args.document, 'r') as file:
+        sample_text = file.read()
+    client = DecodeTimeline(make_bedrock_client(args.region, base_url=endpoint_url))
+    cache_control = make_cache_control(args.ttl)
+    run_tag = uuid.uuid4().hex[:8]
+    os.makedirs(args.result_dir, exist_ok=True)
+    write_run_metadata(args.result_dir, {"models": args.models, "provider": "bedrock", "endpoint": endpoint_url,
+                                         "max_tokens": args.max_tokens, "repeats": args.repeats,
+                                         "cache_ttl": args.ttl})
+
+    # The document carries its own breakpoint, so the primer's cache write serves every question after it
+    documents = [{"type": "text", "text": sample_text, "cache_control": dict(cache_control)}]
+
+    rows, windows = [], []
+    for model in args.models:
+        for max_tokens in args.max_tokens:
+            for cached in (False, True):
+                # Uncached: a fresh system prompt per generation. Cached: one shared prefix, written by a primer
+                warm_prompt = f"{DEFAULT_SYSTEM_PROMPT} [run {run_tag} warm {max_tokens}]"
+                if cached:
+                    run_conversation(client, model, sample_text, 0, 1, questions=LONG_ANSWER_QUESTIONS,
+                                     cache_control=cache_control, system_prompt=warm_prompt, max_tokens=1,
+                                     documents=documents)
+                for i in range(args.repeats):
+                    print(f"{model} max_tokens={max_tokens} {'cached' if cached else 'uncached'} prefix "
+                          f"{i + 1}/{args.repeats}")
+                    question = LONG_ANSWER_QUESTIONS[i % len(LONG_ANSWER_QUESTIONS)]
+                    system_prompt = warm_prompt if cached else f"{DEFAULT_SYSTEM_PROMPT} [run {run_tag} cold {uuid.uuid4().hex[:8]}]"
+                    turn = run_conversation(client, model, sample_text, i, 1, questions=[question],
+                                            cache_control=cache_control, system_prompt=system_prompt,
+                                            max_tokens=max_tokens, documents=documents)[0]
+                    generation = decode_windows(client.deltas, turn['output_tokens'], args.window_tokens)
+                    decode_time = turn['invocation_latency'] - turn['ttft']
+                    row = dict(turn, model=model, provider="bedrock", max_tokens=max_tokens,
+                               prefix_cached=turn['cache_read_input_tokens'] > 0,
+                               truncated=turn['output_tokens'] >= max_tokens, decode_time=decode_time,
+                               tokens_per_second=turn['output_tokens'] / decode_time if decode_time > 0 else float('nan'),
+                               ms_per_token=decode_time / turn['output_tokens'] * 1000 if turn['output_tokens'] else float('nan'),
+                               drift_ms_per_1k=drift_per_1k_tokens(generation))
+                    rows.append(row)
+                    windows.extend(dict(w, model=model, max_tokens=max_tokens, prefix_cached=row['prefix_cached'],
+                                        generation=len(rows)) for w in generation)
+    if local_server is not None:
+        local_server.stop()
+
+    df = pd.DataFrame(rows)
+    window_df = pd.DataFrame(windows)
+    summary = summarize_sweep(df)
+    # Generations are turn rows and stay in the result folder; the window and summary tables go beside it,
+    # since load_folder reads every CSV of a folder as turn rows
+    prefix = os.path.normpath(args.result_dir)
+    df.to_csv(os.path.join(args.result_dir, "cache_experiment_results_output_sweep.csv"), index=False)
+    window_df.to_csv(f"{prefix}_decode_windows.csv", index=False)
+    summary.to_csv(f"{prefix}_decode_summary.csv", index=False)
+
+    print("\n=== Decode throughput ===")
+    print(f"{'Model':46s} | {'Max tok':>7s} | {'Prefix':>8s} | {'Output':>6s} | {'Capped':>6s} | {'TTFT':>7s} | "
+          f"{'Tok/s':>6s} | {'ms/tok':>6s} | {'Drift/1k':>8s}")
+    print("-" * 124)
+    for row in summary.to_dict('records'):
+        print(f"{row['model']:46s} | {row['max_tokens']:7d} | {'cached' if row['prefix_cached'] else 'uncached':>8s} | "
+              f"{row['output_tokens']:6.0f} | {row['truncated']:6.0%} | {row['ttft']:6.3f}s | "
+              f"{row['tokens_per_second']:6.1f} | {row['ms_per_token']:6.2f} | {row['drift_ms_per_1k']:+8.2f}")
+    if not window_df.empty:
+        plot_decode_curves(window_df, os.path.join(args.result_dir, "decode_rate.png"))
+    print(f"\nSaved generations in '{args.result_dir}', '{prefix}_decode_windows.csv' and "
+          f"'{prefix}_decode_summary.csv'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
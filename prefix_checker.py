@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from run_log import get_logger, log_event
+
+log = get_logger()
+
+# Reported cache reads may fall this far short of the expected ones before an alert is raised
+DEFAULT_TOLERANCE = 0.01
+
+CACHE_TTL_SECONDS = {"5m": 300, "1h": 3600}
+
+
+def request_blocks(params):
+    """
+    Prompt blocks of a request in prompt order: (location, canonical, cache_control).
+    canonical is the block's JSON without cache_control, keys in their given order, since the
+    cached prefix is byte-identical only if the serialized blocks are.
+    """
+    blocks = []
+
+    def add(location, block, role=None):
+        block = dict(block)
+        cache_control = block.pop("cache_control", None)
+        canonical = json.dumps(block, separators=(",", ":"), ensure_ascii=False)
+        blocks.append((location, f"{role}:{canonical}" if role else canonical, cache_control))
+
+    for i, tool in enumerate(params.get("tools") or []):
+        add(f"tools[{i}]", tool)
+    system = params.get("system") or []
+    if isinstance(system, str):
+        system = [{"type": "text", "text": system}]
+    for i, block in enumerate(system):
+        add(f"system[{i}]", block)
+    for m, message in enumerate(params.get("messages") or []):
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        for c, block in enumerate(content):
+            add(f"messages[{m}].content[{c}]", block, role=message["role"])
+    return blocks
+
+
+def breakpoint_prefixes(blocks):
+    """(block index, digest of everything up to and including it, characters so far, ttl) per breakpoint"""
+    digest = hashlib.sha256()
+    chars = 0
+    prefixes = []
+    for i, (_, canonical, cache_control) in enumerate(blocks):
+        digest.update(canonical.encode())
+        digest.update(b"\x00")
+        chars += len(canonical)
+        if cache_control:
+            prefixes.append((i, digest.hexdigest(), chars,
+                             CACHE_TTL_SECONDS.get(cache_control.get("ttl", "5m"), 300)))
+    return prefixes
+
+
+def describe_difference(old, new):
+    """Why two blocks at the same position differ, in a few words"""
+    if old is None:
+        return f"{new[0]} was added"
+    if new is None:
+        return f"{old[0]} was removed"
+    old_location, old_text, _ = old
+    new_location, new_text, _ = new
+    if old_location != new_location:
+        return f"{old_location} moved to {new_location}"
+    try:
+        old_block, new_block = (json.loads(text.split(":", 1)[1] if text[0] != "{" else text)
+                                for text in (old_text, new_text))
+    except ValueError:
+        old_block = new_block = None
+    if isinstance(old_block, dict) and isinstance(new_block, dict):
+        if old_block == new_block:
+            return f"{new_location} has the same content with its keys in a different order"
+        changed = sorted(key for key in set(old_block) | set(new_block) if old_block.get(key) != new_block.get(key))
+        if changed == ["text"]:
+            old_value, new_value = old_block["text"], new_block["text"]
+            if old_value.rstrip() == new_value.rstrip():
+                return (f"{new_location} text differs only in trailing whitespace "
+                        f"({old_value[len(old_value.rstrip()):]!r} -> {new_value[len(new_value.rstrip()):]!r})")
+            at = next((i for i, (a, b) in enumerate(zip(old_value, new_value)) if a != b),
+                      min(len(old_value), len(new_value)))
+            return (f"{new_location} text differs at character {at}: "
+                    f"{old_value[max(0, at - 20):at + 20]!r} -> {new_value[max(0, at - 20):at + 20]!r}")
+        return f"{new_location} differs in {', '.join(changed)}"
+    return f"{new_location} differs"
+
+
+def first_divergence(previous, current, limit):
+    """Index and description of the first of previous' first `limit` blocks that current does not repeat"""
+    for i in range(limit):
+        old = previous[i]
+        new = current[i] if i < len(current) else None
+        if new is None or old[1] != new[1] or old[0] != new[0]:
+            return i, describe_difference(old, new)
+    return None, None
+
+
+def shared_blocks(a, b):
+    """Number of leading blocks two requests have in common"""
+    n = 0
+    for old, new in zip(a, b):
+        if old[:2] != new[:2]:
+            break
+        n += 1
+    return n
+
+
+class _Messages:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model, **params):
+        return self._owner.create(model, **params)
+
+
+class PrefixChecker:
+    """
+    Client wrapper that checks every request against the request it continues: the recent one with
+    fewer messages sharing the most leading blocks with it (the latest of equals). The tokens that
+    request cached up to its last breakpoint (its read + write tokens) are expected to be read again;
+    when the reported cache_read_input_tokens fall short, an alert names the first block that diverged,
+    or says the prefix was unchanged (expired, evicted, written concurrently, or another endpoint).
+    predicted_read is what an exact-prefix cache would read given the blocks seen so far.
+    """
+
+    def __init__(self, client, tolerance=DEFAULT_TOLERANCE, history=256):
+        self.client = client
+        self.tolerance = tolerance
+        self.messages = _Messages(self)
+        self.checked = 0
+        self.alerts = []
+        self._recent = deque(maxlen=history)
+        self._cached = {}  # prefix digest -> (estimated tokens, written at, ttl seconds)
+        self._lock = threading.Lock()
+
+    def create(self, model, **params):
+        blocks = request_blocks(params)
+        prefixes = breakpoint_prefixes(blocks)
+        stream = self.client.messages.create(model=model, **params)
+        return self._observe(stream, blocks, prefixes, len(params.get("messages") or []))
+
+    def _observe(self, stream, blocks, prefixes, n_messages):
+        usage = None
+        for event in stream:
+            if event.type == "message_start" and usage is None:
+                usage = _message_start_usage(event)
+            elif event.type == "message_stop":
+                usage = _invocation_usage(event) or usage
+            yield event
+        if usage is not None:
+            self.check(blocks, prefixes, usage, n_messages)
+
+    def predecessor(self, blocks, n_messages):
+        """The recent request this one continues, or None for a new conversation"""
+        best, best_shared = None, -1
+        for request in reversed(self._recent):
+            if request["n_messages"] < n_messages and request["prefixes"]:
+                shared = shared_blocks(request["blocks"], blocks)
+                if shared > best_shared:
+                    best, best_shared = request, shared
+        return best
+
+    def check(self, blocks, prefixes, usage, n_messages):
+        """Compare the reported usage with the expectation and remember what this request cached"""
+        read, write = usage
+        now = time.time()
+        alert = None
+        with self._lock:
+            self.checked += 1
+            previous = self.predecessor(blocks, n_messages)
+            if previous is not None and read < previous["cached_tokens"] * (1 - self.tolerance):
+                predicted = max((tokens for _, digest, _, _ in prefixes
+                                 for tokens, at, ttl in [self._cached.get(digest, (0, 0, 0))]
+                                 if now - at <= ttl), default=0)
+                index, reason = first_divergence(previous["blocks"], blocks, previous["prefixes"][-1][0] + 1)
+                if reason is None:
+                    reason = (f"prefix unchanged ({now - previous['time']:.0f}s since the previous request): "
+                              f"the cache entry expired or was evicted, was still being written, or the request "
+                              f"reached another endpoint")
+                alert = {"expected_read": previous["cached_tokens"], "predicted_read": predicted,
+                         "reported_read": read, "divergent_block": previous["blocks"][index][0]
+                         if index is not None else None, "reason": reason}
+                self.alerts.append(alert)
+
+            # What this request left in the cache: exact for its last breakpoint, the rest by characters
+            if prefixes:
+                total_chars = prefixes[-1][2]
+                for _, digest, chars, ttl in prefixes:
+                    self._cached[digest] = (round((read + write) * chars / total_chars), now, ttl)
+            self._recent.append({"blocks": blocks, "prefixes": prefixes, "cached_tokens": read + write,
+                                 "time": now, "n_messages": n_messages})
+        if alert is not None:
+            log_event(log, logging.WARNING, "prefix_miss", **alert)
+        return alert
+
+    def summary(self):
+        return {"checked": self.checked, "alerts": len(self.alerts)}
+
+
+def _message_start_usage(event):
+    usage = getattr(event.message, "usage", None)
+    if usage is None:
+        return None
+    return (getattr(usage, "cache_read_input_tokens", None) or 0,
+            getattr(usage, "cache_creation_input_tokens", None) or 0)
+
+
+def _invocation_usage(event):
+    metrics = getattr(event, 'amazon-bedrock-invocationMetrics', None)
+    if not metrics:
+        return None
+    return metrics.get("cacheReadInputTokenCount") or 0, metrics.get("cacheWriteInputTokenCount") or 0
@@ -0,0 +1,274 @@
+import argparse
+import json
+import os
+import random
+import sys
+import uuid
+from collections import Counter
+
+# Document breakpoints per conversation; the rest of the 4-breakpoint budget stays with the turns
+DEFAULT_DOCUMENT_BREAKPOINTS = 2
+
+# Rough token count used for planning (about four characters per token)
+CHARS_PER_TOKEN = 4
+
+# Conversations all open with the same question, so identical document sequences share that prefix too
+FIRST_QUESTION = "<first question>"
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def load_documents(paths, n_parts=8):
+    """
+    Documents by name. Several files are one document each; a single file is split into n_parts
+    line ranges, each with its own header so no two parts are identical.
+    """
+    if len(paths) > 1:
+        documents = {}
+        for path in paths:
+            with open(path, 'r') as f:
+                documents[os.path.basename(path)] = f.read()
+        return documents
+
+    with open(paths[0], 'r') as f:
+        lines = f.read().splitlines(keepends=True)
+    size = -(-len(lines) // n_parts)
+    return {f"part{i + 1}": f"[Document part {i + 1}]\n" + "".join(lines[i * size:(i + 1) * size])
+            for i in range(n_parts) if lines[i * size:(i + 1) * size]}
+
+
+def make_workload(names, n_conversations, min_docs=2, max_docs=4, seed=0):
+    """
+    Conversations referencing overlapping document sets. Document popularity falls off as 1/rank,
+    and each conversation lists its documents in the order they were picked (its naive order).
+    """
+    rng = random.Random(seed)
+    popularity = list(names)
+    rng.shuffle(popularity)
+    weights = [1 / (rank + 1) for rank in range(len(popularity))]
+    conversations = []
+    for _ in range(n_conversations):
+        k = rng.randint(min_docs, min(max_docs, len(popularity)))
+        chosen = []
+        while len(chosen) < k:
+            name = rng.choices(popularity, weights)[0]
+            if name not in chosen:
+                chosen.append(name)
+        conversations.append(chosen)
+    return conversations
+
+
+def prefix_tokens(prefix, doc_tokens):
+    return sum(doc_tokens[name] for name in prefix if name != FIRST_QUESTION)
+
+
+def order_sequences(conversations, order):
+    """Every conversation's documents in the canonical order"""
+    rank = {name: i for i, name in enumerate(order)}
+    return [tuple(sorted(docs, key=rank.__getitem__)) for docs in conversations]
+
+
+def select_breakpoints(sequences, doc_tokens, budget=DEFAULT_DOCUMENT_BREAKPOINTS):
+    """
+    Greedily pick shared prefixes (nodes of the prefix trie) to place document breakpoints on.
+    Every conversation passing through a picked prefix gets a breakpoint there, at most `budget` each.
+    The gain of a prefix is what the conversations sharing it would read beyond the prefixes already
+    picked for them, less the one conversation that writes it first.
+    """
+    counts = Counter(sequence[:k] for sequence in sequences for k in range(1, len(sequence) + 1))
+    candidates = [prefix for prefix, count in counts.items() if count >= 2]
+    members = {prefix: [i for i, sequence in enumerate(sequences) if sequence[:len(prefix)] == prefix]
+               for prefix in candidates}
+    used = [0] * len(sequences)
+    best = [0] * len(sequences)
+    chosen = set()
+
+    while True:
+        best_gain, best_prefix = 0, None
+        for prefix in candidates:
+            if prefix in chosen or any(used[i] >= budget for i in members[prefix]):
+                continue
+            tokens = prefix_tokens(prefix, doc_tokens)
+            improvements = [max(0, tokens - best[i]) for i in members[prefix]]
+            gain = sum(improvements) * (len(improvements) - 1) / len(improvements)
+            if gain > best_gain:
+                best_gain, best_prefix = gain, prefix
+        if best_prefix is None:
+            return chosen
+        chosen.add(best_prefix)
+        tokens = prefix_tokens(best_prefix, doc_tokens)
+        for i in members[best_prefix]:
+            used[i] += 1
+            best[i] = max(best[i], tokens)
+
+
+def conversation_breakpoints(sequences, chosen):
+    """Breakpoint prefixes of each conversation's first request (the first question's breakpoint included)"""
+    return [[sequence[:k] for k in range(1, len(sequence) + 1) if sequence[:k] in chosen]
+            + [sequence + (FIRST_QUESTION,)] for sequence in sequences]
+
+
+def simulate_read_ratio(sequences, breakpoints, doc_tokens):
+    """
+    Fraction of document tokens the first requests read from the cache when the conversations run in order:
+    a request reads its longest breakpoint prefix written by an earlier one, then writes all of its own.
+    """
+    cached = set()
+    read = total = 0
+    for sequence, prefixes in zip(sequences, breakpoints):
+        total += prefix_tokens(sequence, doc_tokens)
+        read += max((prefix_tokens(p, doc_tokens) for p in prefixes if p in cached), default=0)
+        cached.update(prefixes)
+    return read / total if total else 0.0
+
+
+def plan_prefixes(conversations, doc_tokens, budget=DEFAULT_DOCUMENT_BREAKPOINTS, max_rounds=50):
+    """
+    Canonical document order and breakpoint placement maximizing shared cached prefixes.
+    Starts from the better of two popularity orders and improves it with adjacent swaps.
+    """
+    frequency = Counter(name for docs in conversations for name in set(docs))
+    names = list(frequency)
+
+    def evaluate(order):
+        sequences = order_sequences(conversations, order)
+        breakpoints = conversation_breakpoints(sequences, select_breakpoints(sequences, doc_tokens, budget))
+        return simulate_read_ratio(sequences, breakpoints, doc_tokens), sequences, breakpoints
+
+    starts = [
+        sorted(names, key=lambda name: (-frequency[name], -doc_tokens[name], name)),
+        sorted(names, key=lambda name: (-frequency[name] * doc_tokens[name], name)),
+    ]
+    best_order = max(starts, key=lambda order: evaluate(order)[0])
+    best_ratio = evaluate(best_order)[0]
+
+    for _ in range(max_rounds):
+        improved = False
+        for i in range(len(best_order) - 1):
+            order = best_order[:i] + [best_order[i + 1], best_order[i]] + best_order[i + 2:]
+            ratio = evaluate(order)[0]
+            if ratio > best_ratio:
+                best_order, best_ratio, improved = order, ratio, True
+        if not improved:
+            break
+
+    ratio, sequences, breakpoints = evaluate(best_order)
+    return {"order": best_order, "sequences": sequences, "breakpoints": breakpoints, "predicted_read_ratio": ratio}
+
+
+def naive_plan(conversations, doc_tokens):
+    """Each conversation keeps its own document order; the only breakpoint is the first question's"""
+    sequences = [tuple(docs) for docs in conversations]
+    breakpoints = conversation_breakpoints(sequences, set())
+    return {"order": None, "sequences": sequences, "breakpoints": breakpoints,
+            "predicted_read_ratio": simulate_read_ratio(sequences, breakpoints, doc_tokens)}
+
+
+def document_blocks(sequence, breakpoints, documents, cache_control):
+    """Content blocks of a conversation's documents, with cache_control on the planned prefixes"""
+    blocks = []
+    for k, name in enumerate(sequence):
+        block = {
+            "type": "text",
+            "text": documents[name],
+        }
+        if sequence[:k + 1] in breakpoints:
+            block["cache_control"] = dict(cache_control)
+        blocks.append(block)
+    return blocks
+
+
+def measured_read_ratio(df):
+    """Cache-read ratio (read / prompt tokens) of the first turns and of all turns"""
+    prompt = df['input_tokens'] + df['cache_creation_input_tokens'] + df['cache_read_input_tokens']
+    first = df['turn'] == 1
+    return (df.loc[first, 'cache_read_input_tokens'].sum() / prompt[first].sum(),
+            df['cache_read_input_tokens'].sum() / prompt.sum())
+
+
+def run_plan(client, model_id, plan, documents, result_dir, n_turns, cache_control, system_prompt):
+    """Run every conversation of a plan in order; returns the turn rows of all of them"""
+    import pandas as pd
+    from benchmark_runner import run_conversation
+
+    os.makedirs(result_dir, exist_ok=True)
+    frames = []
+    for i, (sequence, breakpoints) in enumerate(zip(plan["sequences"], plan["breakpoints"])):
+        print(f"Conversation {i + 1}/{len(plan['sequences'])}: {', '.join(sequence)}")
+        blocks = document_blocks(sequence, breakpoints, documents, cache_control)
+        rows = run_conversation(client, model_id, None, i, n_turns, cache_control=cache_control,
+                                system_prompt=system_prompt, documents=blocks)
+        df = pd.DataFrame(rows)
+        df['documents'] = "|".join(sequence)
+        df.to_csv(f"{result_dir}/cache_experiment_results_prefix_plan_{i}.csv", index=False)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Plan document order and breakpoints for cross-conversation cache reuse.")
+    parser.add_argument("--documents", nargs="+", default=["RomeoAndJuliet.txt"],
+                        help="Document files (a single file is split into --parts documents)")
+    parser.add_argument("--parts", type=int, default=8)
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--min-docs", type=int, default=2)
+    parser.add_argument("--max-docs", type=int, default=4)
+    parser.add_argument("--doc-breakpoints", type=int, default=DEFAULT_DOCUMENT_BREAKPOINTS, choices=[1, 2, 3])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--plan-only", action="store_true", help="Print the plan without calling the model")
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--model", default="us.anthropic.claude-3-7-sonnet-20250219-v1:0")
+    parser.add_argument("--region", default="us-west-2")
+    parser.add_argument("--endpoint-url", help="Bedrock-compatible endpoint, e.g. `cli.py simulate`")
+    parser.add_argument("--ttl", choices=["5m", "1h"], default="5m")
+    parser.add_argument("--result-dir", default="prefix_plan")
+    args = parser.parse_args(argv)
+
+    documents = load_documents(args.documents, args.parts)
+    doc_tokens = {name: estimate_tokens(text) for name, text in documents.items()}
+    conversations = make_workload(list(documents), args.conversations, args.min_docs, args.max_docs, args.seed)
+
+    plans = {
+        "naive": naive_plan(conversations, doc_tokens),
+        "planned": plan_prefixes(conversations, doc_tokens, args.doc_breakpoints),
+    }
+    print(f"{len(documents)} documents, {len(conversations)} conversations")
+    print(f"Canonical order: {', '.join(plans['planned']['order'])}")
+    for mode, plan in plans.items():
+        print(f"  {mode:8s} predicted first-turn document read ratio: {plan['predicted_read_ratio']:.1%}")
+
+    os.makedirs(args.result_dir, exist_ok=True)
+    with open(os.path.join(args.result_dir, "plan.json"), "w") as f:
+        json.dump({mode: {"order": plan["order"], "predicted_read_ratio": plan["predicted_read_ratio"],
+                          "conversations": [{"documents": list(sequence),
+                                             "breakpoints": [list(p) for p in prefixes]}
+                                            for sequence, prefixes in zip(plan["sequences"], plan["breakpoints"])]}
+                   for mode, plan in plans.items()}, f, indent=2)
+    if args.plan_only:
+        return 0
+
+    from benchmark_runner import DEFAULT_SYSTEM_PROMPT, make_bedrock_client, make_cache_control
+    from results_io import write_run_metadata
+
+    client = make_bedrock_client(args.region, base_url=args.endpoint_url)
+    cache_control = make_cache_control(args.ttl)
+    # A per-run tag in the system prompt keeps the two modes (and earlier runs) from reading each other's cache
+    run_tag = uuid.uuid4().hex[:8]
+    print("\n=== Measured cache-read ratio ===")
+    for mode, plan in plans.items():
+        folder = os.path.join(args.result_dir, mode)
+        write_run_metadata(folder, {"model": args.model, "provider": "bedrock", "endpoint": args.endpoint_url,
+                                    "policy": f"prefix-plan-{mode}", "cache_ttl": args.ttl,
+                                    "n_experiments": len(conversations), "n_turns": args.turns})
+        df = run_plan(client, args.model, plan, documents, folder, args.turns, cache_control,
+                      f"{DEFAULT_SYSTEM_PROMPT} [run {run_tag} {mode}]")
+        first, overall = measured_read_ratio(df)
+        print(f"  {mode:8s} first turns {first:.1%}, all turns {overall:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
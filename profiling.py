@@ -0,0 +1,160 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+# Where client-side time goes: the first stack frame (from the leaf upwards) matching a rule decides.
+# Rules are (category, path fragments).
+CATEGORY_RULES = [
+    ("network wait", ("/ssl.py", "/socket.py", "/selectors.py", "httpcore/_backends", "/http/client.py")),
+    ("event-stream decode", ("botocore/eventstream", "botocore/parsers", "_stream_decoder", "/json/decoder.py")),
+    ("pydantic event parsing", ("pydantic", "anthropic/_models.py", "anthropic/_streaming.py")),
+    ("request signing", ("botocore/auth", "botocore/credentials", "botocore/session", "lib/bedrock/_auth")),
+    ("request serialization", ("/json/encoder.py", "httpx/_content", "anthropic/_base_client.py",
+                               "anthropic/_utils/_transform", "anthropic/_qs.py")),
+    # The harness reports through log_event (run_log.py); formatting and I/O run on the log writer thread
+    ("logging", ("/logging/__init__.py", "/logging/handlers.py", "run_log.py")),
+    ("harness", ("benchmark_runner.py",)),
+]
+
+
+def categorize(stack):
+    """Category of one sampled stack, given as (filename, function, lineno) tuples from leaf to root"""
+    for filename, _, _ in stack:
+        normalized = filename.replace(os.sep, "/")
+        for category, fragments in CATEGORY_RULES:
+            if any(fragment in normalized for fragment in fragments):
+                return category
+    return "other"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler: a background thread snapshots the target thread's stack every `interval` seconds.
+    Samples are attributed to the current phase (e.g. "exp 1 turn 3") set with set_phase().
+    """
+
+    def __init__(self, interval=0.002, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.phase = "setup"
+        self.phase_order = []
+        self.phase_wall = defaultdict(float)
+        self.category_samples = defaultdict(Counter)
+        self.self_samples = Counter()
+        self.inclusive_samples = Counter()
+        self._phase_started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def set_phase(self, phase):
+        now = time.perf_counter()
+        if self._phase_started is not None:
+            self.phase_wall[self.phase] += now - self._phase_started
+        self.phase = phase
+        if phase not in self.phase_order:
+            self.phase_order.append(phase)
+        self._phase_started = now
+
+    def start(self):
+        self.set_phase(self.phase)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="sampling-profiler")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.set_phase("stopped")
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_name, frame.f_lineno))
+                    frame = frame.f_back
+                phase = self.phase
+                self.category_samples[phase][categorize(stack)] += 1
+                leaf_file, leaf_function, leaf_line = stack[0]
+                self.self_samples[f"{leaf_function} ({os.path.basename(leaf_file)}:{leaf_line})"] += 1
+                for function in {f"{name} ({os.path.basename(filename)})" for filename, name, _ in stack}:
+                    self.inclusive_samples[function] += 1
+            time.sleep(self.interval)
+
+    def phase_breakdown(self):
+        """Per phase: wall time and the estimated milliseconds spent in each category"""
+        rows = []
+        for phase in self.phase_order:
+            if phase in ("setup", "stopped"):
+                continue
+            samples = self.category_samples[phase]
+            total = sum(samples.values())
+            wall_ms = self.phase_wall[phase] * 1000
+            row = {"phase": phase, "wall_ms": wall_ms, "samples": total}
+            for category, count in samples.items():
+                row[category] = wall_ms * count / total if total else 0.0
+            rows.append(row)
+        return rows
+
+    def report(self, top=15, output=None):
+        """Print per-phase category times and the hottest functions; optionally save everything as JSON"""
+        rows = self.phase_breakdown()
+        categories = [c for c, _ in CATEGORY_RULES] + ["other"]
+        categories = [c for c in categories if any(c in row for row in rows)]
+
+        print("\n=== Client-side time per turn (ms, estimated from samples) ===")
+        header = f"{'Phase':18s} | {'Wall':>8s} | " + " | ".join(f"{c[:14]:>14s}" for c in categories)
+        print(header)
+        print("-" * len(header))
+        for row in rows:
+            print(f"{row['phase']:18s} | {row['wall_ms']:8.1f} | "
+                  + " | ".join(f"{row.get(c, 0.0):14.1f}" for c in categories))
+
+        total_samples = sum(self.self_samples.values()) or 1
+        print(f"\n=== Top {top} functions by self samples ({total_samples} samples, {self.interval * 1000:.1f} ms interval) ===")
+        for function, count in self.self_samples.most_common(top):
+            print(f"  {count / total_samples:6.1%}  {function}")
+        print(f"\n=== Top {top} functions by inclusive samples ===")
+        for function, count in self.inclusive_samples.most_common(top):
+            print(f"  {count / total_samples:6.1%}  {function}")
+
+        if output:
+            with open(output, "w") as f:
+                json.dump({"interval": self.interval, "phases": rows,
+                           "self": self.self_samples.most_common(), "inclusive": self.inclusive_samples.most_common()},
+                          f, indent=2)
+            print(f"\nProfile saved as '{output}'.")
+        return rows
+
+
+def import_profile(module):
+    """
+    Import `module` in a fresh interpreter under -X importtime.
+    Returns (cumulative milliseconds, set of top-level packages the import pulled in).
+    """
+    # Run next to this file so the repo's own modules resolve from any working directory
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise ImportError(f"Importing {module} failed:\n{completed.stderr.splitlines()[-1]}")
+    cumulative = None
+    packages = set()
+    for line in completed.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        packages.add(parts[2].split(".")[0])
+        if parts[2] == module:
+            cumulative = int(parts[1]) / 1000
+    return cumulative, packages
+
+
+def measure_import_times(modules=("pandas", "anthropic", "boto3", "matplotlib.pyplot")):
+    """Cold import time of each module in a fresh interpreter, in milliseconds (python -X importtime)"""
+    return {module: import_profile(module)[0] for module in modules}
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+from scipy.stats import mannwhitneyu
+
+from results_io import load_folder, per_turn_values
+
+# Metrics checked by the gate and the direction that counts as a regression
+# ('higher' = larger candidate values are worse, 'lower' = smaller values are worse)
+GATE_METRICS = {
+    'ttft': 'higher',
+    'invocation_latency': 'higher',
+    'cache_read_input_tokens': 'lower',
+}
+
+# Default regression thresholds in percent (relative change of the per-turn median)
+DEFAULT_THRESHOLDS = {
+    'ttft': 10.0,
+    'invocation_latency': 10.0,
+    'cache_read_input_tokens': 5.0,
+}
+
+DEFAULT_ALPHA = 0.05
+MIN_SAMPLES = 3
+
+
+def percent_change(base_value, current_value):
+    """Relative change in percent; a zero baseline counts as +/-100% so the verdict stays valid JSON"""
+    if base_value == 0:
+        return 100.0 * float(np.sign(current_value))
+    return ((current_value - base_value) / base_value) * 100
+
+
+def holm_adjust(p_values):
+    """Holm-Bonferroni step-down adjustment so the gate controls the family-wise error rate"""
+    p_values = np.asarray(p_values, dtype=float)
+    n = len(p_values)
+    order = np.argsort(p_values)
+    adjusted = np.empty(n)
+    running_max = 0.0
+    for rank, idx in enumerate(order):
+        running_max = max(running_max, (n - rank) * p_values[idx])
+        adjusted[idx] = min(1.0, running_max)
+    return adjusted
+
+
+def compare_metric(base_values, cand_values, direction):
+    """
+    Run a one-sided Mann-Whitney U test of the candidate against the baseline for one turn.
+    Returns (p_value, baseline_median, candidate_median, percent_change).
+    """
+    base_median = float(np.median(base_values))
+    cand_median = float(np.median(cand_values))
+    alternative = 'greater' if direction == 'higher' else 'less'
+
+    if np.all(base_values == base_values[0]) and np.all(cand_values == base_values[0]):
+        # Identical constant samples (e.g. zero cache reads on turn 1): nothing to test
+        p_value = 1.0
+    else:
+        p_value = float(mannwhitneyu(cand_values, base_values, alternative=alternative).pvalue)
+
+    return p_value, base_median, cand_median, percent_change(base_median, cand_median)
+
+
+def run_gate(base_df, cand_df, thresholds, alpha=DEFAULT_ALPHA, metrics=None, min_samples=MIN_SAMPLES):
+    """
+    Compare a candidate result set to a baseline turn by turn.
+    A (metric, turn) pair regresses when its median moves in the bad direction by more than
+    the metric threshold and the Holm-adjusted p-value is below alpha.
+    """
+    metrics = metrics or list(GATE_METRICS)
+    results = []
+
+    for metric in metrics:
+        direction = GATE_METRICS[metric]
+        base_turns = per_turn_values(base_df, metric)
+        cand_turns = per_turn_values(cand_df, metric)
+
+        for turn in sorted(set(base_turns) | set(cand_turns)):
+            base_values = base_turns.get(turn, np.array([]))
+            cand_values = cand_turns.get(turn, np.array([]))
+            result = {
+                'metric': metric,
+                'turn': turn,
+                'direction': direction,
+                'n_baseline': int(len(base_values)),
+                'n_candidate': int(len(cand_values)),
+                'threshold_pct': thresholds[metric],
+            }
+
+            if len(base_values) < min_samples or len(cand_values) < min_samples:
+                result['status'] = 'insufficient_data'
+                results.append(result)
+                continue
+
+            p_value, base_median, cand_median, pct = compare_metric(base_values, cand_values, direction)
+            result.update({
+                'baseline_median': base_median,
+                'candidate_median': cand_median,
+                'percent_change': pct,
+                'p_value': p_value,
+                'status': 'tested',
+            })
+            results.append(result)
+
+    tested = [r for r in results if r['status'] == 'tested']
+    if tested:
+        for result, p_adj in zip(tested, holm_adjust([r['p_value'] for r in tested])):
+            result['p_adjusted'] = float(p_adj)
+
+    for result in tested:
+        pct = result['percent_change']
+        threshold = result['threshold_pct']
+        beyond_threshold = pct > threshold if result['direction'] == 'higher' else pct < -threshold
+        result['regressed'] = bool(beyond_threshold and result['p_adjusted'] < alpha)
+        result['status'] = 'regressed' if result['regressed'] else 'ok'
+
+    return results
+
+
+def print_gate_results(results, baseline, candidate):
+    """Print a per-turn table of the gate results"""
+    print(f"\n=== Regression Gate (Baseline: {baseline}, Candidate: {candidate}) ===")
+    header = f"{'Metric':>25s} | Turn | {'Baseline':>10s} | {'Candidate':>10s} | {'Change':>8s} | {'p(adj)':>7s} | Status"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if r['status'] == 'insufficient_data':
+            print(f"{r['metric']:>25s} | {r['turn']:4d} | {'N/A':>10s} | {'N/A':>10s} | {'N/A':>8s} | {'N/A':>7s} | "
+                  f"insufficient data ({r['n_baseline']}/{r['n_candidate']})")
+            continue
+        print(f"{r['metric']:>25s} | {r['turn']:4d} | {r['baseline_median']:10.3f} | {r['candidate_median']:10.3f} | "
+              f"{r['percent_change']:+7.1f}% | {r['p_adjusted']:7.4f} | {r['status'].upper()}")
+
+
+def parse_thresholds(values):
+    """Parse repeated `metric=percent` arguments on top of the defaults"""
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for value in values or []:
+        metric, _, pct = value.partition('=')
+        if metric not in GATE_METRICS or not pct:
+            raise ValueError(f"Invalid threshold '{value}', expected one of {list(GATE_METRICS)} as metric=percent")
+        thresholds[metric] = float(pct)
+    return thresholds
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Fail when a candidate result folder regresses against a baseline.")
+    parser.add_argument('--baseline', help="Baseline result folder")
+    parser.add_argument('--candidate', help="Candidate result folder")
+    parser.add_argument('--baseline-query', nargs='+', metavar='KEY=VALUE',
+                        help="Pool the catalog runs matching this selector as the baseline instead")
+    parser.add_argument('--candidate-query', nargs='+', metavar='KEY=VALUE',
+                        help="Pool the catalog runs matching this selector as the candidate instead")
+    parser.add_argument('--catalog', default='results_catalog.sqlite', help="Catalog searched by the queries")
+    parser.add_argument('--threshold', action='append', metavar='METRIC=PCT',
+                        help="Regression threshold in percent, e.g. ttft=10 (repeatable)")
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA, help="Family-wise significance level")
+    parser.add_argument('--metric', action='append', choices=list(GATE_METRICS),
+                        help="Restrict the gate to these metrics (repeatable)")
+    parser.add_argument('--min-samples', type=int, default=MIN_SAMPLES,
+                        help="Minimum runs per turn on each side before a turn is tested")
+    parser.add_argument('--output', default='regression_verdict.json', help="Path of the JSON verdict")
+    args = parser.parse_args(argv)
+
+    try:
+        thresholds = parse_thresholds(args.threshold)
+    except ValueError as e:
+        parser.error(str(e))
+
+    sides = []
+    for side, folder, query in (('baseline', args.baseline, args.baseline_query),
+                                ('candidate', args.candidate, args.candidate_query)):
+        if query:
+            from results_catalog import load_runs, open_catalog, parse_selector, select_runs
+            conn = open_catalog(args.catalog)
+            try:
+                runs = select_runs(conn, parse_selector(query))
+            except ValueError as e:
+                parser.error(str(e))
+            if not runs:
+                parser.error(f"No runs in {args.catalog} match the {side} query {' '.join(query)}.")
+            print(f"{side}: {len(runs)} runs matching {' '.join(query)}")
+            sides.append((' '.join(query), load_runs(conn, [run['run_id'] for run in runs])))
+        elif folder:
+            if not os.path.exists(folder):
+                parser.error(f"{folder} folder not found.")
+            sides.append((folder, load_folder(folder)))
+        else:
+            parser.error(f"Give --{side} or --{side}-query.")
+    (args.baseline, base_df), (args.candidate, cand_df) = sides
+    for name, df in sides:
+        if df.empty:
+            parser.error(f"{name} has no turn rows to compare.")
+
+    results = run_gate(base_df, cand_df, thresholds, alpha=args.alpha, metrics=args.metric,
+                       min_samples=args.min_samples)
+    print_gate_results(results, args.baseline, args.candidate)
+
+    regressions = [r for r in results if r['status'] == 'regressed']
+    # A gate that tested nothing has not shown the candidate is fine
+    tested = [r for r in results if r['status'] != 'insufficient_data']
+    if not tested:
+        print(f"\nNo metric had {args.min_samples} runs per turn on both sides; nothing was tested.")
+    verdict = {
+        'baseline': args.baseline,
+        'candidate': args.candidate,
+        'alpha': args.alpha,
+        'thresholds_pct': thresholds,
+        'test': 'mann-whitney-u (one-sided, holm-adjusted)',
+        'passed': bool(tested) and not regressions,
+        'tested': len(tested),
+        'regressions': [{'metric': r['metric'], 'turn': r['turn'], 'percent_change': r['percent_change'],
+                         'p_adjusted': r['p_adjusted']} for r in regressions],
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(verdict, f, indent=2)
+
+    print(f"\nVerdict: {'PASS' if verdict['passed'] else 'FAIL'} ({len(regressions)} regressions, "
+          f"{len(tested)} tested), saved as '{args.output}'.")
+    return 0 if verdict['passed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
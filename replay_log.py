@@ -0,0 +1,318 @@
+import argparse
+import gzip
+import hashlib
+import json
+import queue
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+REPLAY_LOG_VERSION = 1
+
+# Request parameters that are not part of the body the model sees (the SDK moves them into the URL / adds them)
+TRANSPORT_KEYS = ("model", "stream", "anthropic_version")
+
+
+def request_hash(body):
+    """Content hash of a request body; the same for the SDK's parameters and the JSON the endpoint receives"""
+    body = {key: value for key, value in body.items() if key not in TRANSPORT_KEYS}
+    data = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def event_dict(event):
+    """Stream event as sent on the wire (SDK event objects or plain dicts)"""
+    return event.to_dict() if hasattr(event, "to_dict") else dict(event)
+
+
+class ReplayedError(Exception):
+    """Error response of a recorded request, raised again on replay"""
+
+    def __init__(self, status_code, error_type, message):
+        super().__init__(f"{error_type}: {message}" if error_type else message)
+        self.status_code = status_code
+        self.error_type = error_type
+
+
+class _Messages:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model, **params):
+        return self._owner.create(model, **params)
+
+
+class ReplayRecorder:
+    """
+    Wraps a client and writes every request and every stream event into a gzip JSON-lines replay log:
+      body     {"hash", "body"}                once per distinct request body
+      request  {"id", "hash", "model", "start_ns"}  start_ns is the offset from the start of the recording
+      event    {"id", "offset_ns", "event"}   offset from the request's create() call
+      error    {"id", "offset_ns", "status", "error_type", "message"}
+    The timed path only notes event offsets; once a stream ends its exchange is queued, and hashing,
+    encoding and the gzip write happen on the writer thread. Nothing is dropped: close() drains the queue.
+    """
+
+    def __init__(self, client, path, metadata=None):
+        self.client = client
+        self.path = path
+        self.messages = _Messages(self)
+        self.requests = 0
+        self._hashes = set()
+        self._origin = time.perf_counter_ns()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._write([{"kind": "header", "version": REPLAY_LOG_VERSION, "metadata": metadata or {},
+                      "started_utc": datetime.now(timezone.utc).isoformat()}])
+        self._writer = threading.Thread(target=self._drain, name="replay-writer", daemon=True)
+        self._writer.start()
+
+    def create(self, model, **params):
+        start = time.perf_counter_ns()
+        with self._lock:
+            request_id = self.requests
+            self.requests += 1
+        # Messages are snapshotted because remove_cache_control() later swaps their content
+        if params.get("messages"):
+            params = dict(params, messages=[dict(m) for m in params["messages"]])
+        try:
+            stream = self.client.messages.create(model=model, **params)
+        except Exception as e:
+            self._queue.put((request_id, model, start, params, [], (time.perf_counter_ns() - start, e)))
+            raise
+        return self._record_stream(stream, request_id, model, start, params)
+
+    def _record_stream(self, stream, request_id, model, start, params):
+        events = []
+        try:
+            for event in stream:
+                events.append((time.perf_counter_ns() - start, event))
+                yield event
+        finally:
+            self._queue.put((request_id, model, start, params, events, None))
+
+    def _drain(self):
+        """Writer thread: hash, encode and write each queued exchange until close() sends None"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self._write(self._records(*item))
+
+    def _records(self, request_id, model, start, params, events, error):
+        digest = request_hash(params)
+        records = []
+        if digest not in self._hashes:
+            self._hashes.add(digest)
+            records.append({"kind": "body", "hash": digest,
+                            "body": {k: v for k, v in params.items() if k not in TRANSPORT_KEYS}})
+        records.append({"kind": "request", "id": request_id, "hash": digest, "model": model,
+                        "start_ns": start - self._origin})
+        records.extend({"kind": "event", "id": request_id, "offset_ns": offset, "event": event_dict(event)}
+                       for offset, event in events)
+        if error is not None:
+            offset, e = error
+            records.append({"kind": "error", "id": request_id, "offset_ns": offset,
+                            "status": getattr(e, "status_code", None),
+                            "error_type": "ThrottlingException" if "Throttl" in str(e) else type(e).__name__,
+                            "message": str(e)})
+        return records
+
+    def _write(self, records):
+        for record in records:
+            self._file.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n")
+
+    def close(self):
+        """Write everything still queued and close the log"""
+        self._queue.put(None)
+        self._writer.join()
+        self._file.close()
+
+
+class ReplayLog:
+    """
+    A loaded replay log. Exchanges are kept per request hash in recording order, so a request
+    that was throttled and retried replays the throttle first and then the response.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header = {}
+        self.bodies = {}
+        self.exchanges = []
+        by_id = {}
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                kind = record["kind"]
+                if kind == "header":
+                    self.header = record
+                elif kind == "body":
+                    self.bodies[record["hash"]] = record["body"]
+                elif kind == "request":
+                    exchange = dict(record, events=[], error=None)
+                    by_id[record["id"]] = exchange
+                    self.exchanges.append(exchange)
+                elif kind == "event":
+                    by_id[record["id"]]["events"].append((record["offset_ns"], record["event"]))
+                elif kind == "error":
+                    by_id[record["id"]]["error"] = record
+        self.exchanges.sort(key=lambda exchange: exchange["id"])
+        self._lock = threading.Lock()
+        self.rewind()
+
+    def rewind(self):
+        """Start handing out exchanges from the beginning again"""
+        with self._lock:
+            self._by_hash = defaultdict(deque)
+            for exchange in self.exchanges:
+                self._by_hash[exchange["hash"]].append(exchange)
+            self._unused = deque(self.exchanges)
+            self._used = set()
+            self.matched = 0
+            self.unmatched = 0
+
+    def next_exchange(self, body):
+        """
+        Recorded exchange for a request body: the next unused one with the same hash, else the
+        next unused one in recording order (e.g. after a harness change altered the prompts).
+        """
+        digest = request_hash(body)
+        with self._lock:
+            queue = self._by_hash.get(digest)
+            while queue and queue[0]["id"] in self._used:
+                queue.popleft()
+            if queue:
+                exchange = queue.popleft()
+                self.matched += 1
+            else:
+                while self._unused and self._unused[0]["id"] in self._used:
+                    self._unused.popleft()
+                if not self._unused:
+                    return None
+                exchange = self._unused.popleft()
+                self.unmatched += 1
+            self._used.add(exchange["id"])
+            return exchange
+
+    def summary(self):
+        """One row per recorded request: timing from the event offsets and cache usage"""
+        rows = []
+        for exchange in self.exchanges:
+            row = {"id": exchange["id"], "hash": exchange["hash"][:12], "start_s": exchange["start_ns"] / 1e9,
+                   "status": (exchange["error"]["status"] or "error") if exchange["error"] else 200, "events": 0,
+                   "ttft_s": None, "total_s": None, "cache_read": 0, "cache_write": 0}
+            for offset, event in exchange["events"]:
+                row["events"] += 1
+                # TTFT as the harness measures it: the first content_block_start
+                if row["ttft_s"] is None and event.get("type") == "content_block_start":
+                    row["ttft_s"] = offset / 1e9
+                if event.get("type") == "message_start":
+                    usage = event["message"].get("usage") or {}
+                    row["cache_read"] = usage.get("cache_read_input_tokens") or 0
+                    row["cache_write"] = usage.get("cache_creation_input_tokens") or 0
+                row["total_s"] = offset / 1e9
+            rows.append(row)
+        return rows
+
+
+def sleep_until(start, offset_ns, time_scale):
+    """Sleep until offset_ns * time_scale after start (perf_counter_ns); 0 replays as fast as possible"""
+    if time_scale <= 0:
+        return
+    remaining = start + offset_ns * time_scale - time.perf_counter_ns()
+    if remaining > 0:
+        time.sleep(remaining / 1e9)
+
+
+def stream_constructor():
+    """Function turning a recorded event dict back into the SDK's stream event object"""
+    from anthropic._models import construct_type
+    from anthropic.types import RawMessageStreamEvent
+
+    return lambda event: construct_type(type_=RawMessageStreamEvent, value=event)
+
+
+def timed_stream(events, start, time_scale, construct):
+    """Yield recorded (offset_ns, event) pairs as SDK events at their offsets from start"""
+    for offset, event in events:
+        # Built before the wait, so the construction time is part of the recorded offset
+        event = construct(event)
+        sleep_until(start, offset, time_scale)
+        yield event
+
+
+class ReplayClient:
+    """
+    Client answering from a replay log with the recorded events at their recorded offsets
+    (times time_scale), so the harness and analyzers run exactly as they did against the API.
+    """
+
+    def __init__(self, log, time_scale=1.0):
+        self.log = log if isinstance(log, ReplayLog) else ReplayLog(log)
+        self.time_scale = time_scale
+        self.messages = _Messages(self)
+        # Imported here rather than in create(), where the import would count against the first TTFT
+        self._construct = stream_constructor()
+
+    def create(self, model, **params):
+        start = time.perf_counter_ns()
+        exchange = self.log.next_exchange(params)
+        if exchange is None:
+            raise RuntimeError(f"Replay log {self.log.path} has no more recorded requests")
+        error = exchange["error"]
+        if error:
+            sleep_until(start, error["offset_ns"], self.time_scale)
+            raise ReplayedError(error["status"], error["error_type"], error["message"])
+        return timed_stream(exchange["events"], start, self.time_scale, self._construct)
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Inspect or serve a recorded replay log.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    info = subparsers.add_parser("info", help="Per-request timing and cache usage of a log")
+    info.add_argument("log")
+    info.add_argument("--csv", help="Also save the per-request table here")
+    serve = subparsers.add_parser("serve", help="Serve the log from the local stand-in endpoint")
+    serve.add_argument("log")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--time-scale", type=float, default=1.0, help="Multiply the recorded offsets")
+    args = parser.parse_args(argv)
+
+    log = ReplayLog(args.log)
+    if args.command == "serve":
+        from local_bedrock_server import LocalBedrockServer
+
+        server = LocalBedrockServer(port=args.port, profile={"time_scale": args.time_scale}, replay=log)
+        print(f"Replaying {len(log.exchanges)} recorded requests on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        print(f"Matched {log.matched} requests by body, {log.unmatched} in recording order")
+        return 0
+
+    rows = log.summary()
+    print(f"{args.log}: {len(rows)} requests, {len(log.bodies)} distinct bodies, "
+          f"recorded {log.header.get('started_utc', '?')}")
+    print(f"{'Id':>4s} | {'Start':>8s} | {'Status':>6s} | {'Events':>6s} | {'TTFT':>7s} | {'Total':>7s} | "
+          f"{'Read':>7s} | {'Write':>7s} | Body")
+    print("-" * 90)
+    for row in rows:
+        ttft = f"{row['ttft_s']:6.3f}s" if row['ttft_s'] is not None else f"{'-':>7s}"
+        total = f"{row['total_s']:6.3f}s" if row['total_s'] is not None else f"{'-':>7s}"
+        print(f"{row['id']:4d} | {row['start_s']:7.2f}s | {row['status']!s:>6s} | {row['events']:6d} | {ttft} | "
+              f"{total} | {row['cache_read']:7d} | {row['cache_write']:7d} | {row['hash']}")
+    if args.csv:
+        import pandas as pd
+        pd.DataFrame(rows).to_csv(args.csv, index=False)
+        print(f"Saved '{args.csv}'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+import argparse
+import base64
+import glob
+import html
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')  # Non-interactive backend: never blocks in headless jobs
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from analyze_cache_and_latency_ttft import folder_colors
+from results_io import load_folder
+
+# Per-turn metrics summarised for every folder (column -> axis label)
+TURN_METRICS = {
+    'invocation_latency': 'Invocation Latency (seconds)',
+    'ttft': 'TTFT (seconds)',
+    'generation_time': 'Generation Time (seconds)',
+    'ms_per_token': 'Milliseconds per output token',
+    'tokens_per_sec': 'Output tokens per second',
+    'cache_creation_input_tokens': 'Cache Creation Input Tokens',
+    'cache_read_input_tokens': 'Cache Read Input Tokens',
+}
+
+# Figures of the report: (name, title, [(metric, marker), ...], with error bars)
+FIGURES = [
+    ('performance_comparison', 'Performance Comparison',
+     [('invocation_latency', 'o'), ('ttft', 's'), ('ms_per_token', '^')], True),
+    ('cache_metrics_comparison', 'Cache Metrics Comparison',
+     [('cache_creation_input_tokens', 'o'), ('cache_read_input_tokens', 's')], False),
+    ('generation_time_tokens_comparison', 'Generation Time and Output Throughput Comparison',
+     [('generation_time', 'D'), ('tokens_per_sec', '^')], True),
+]
+
+
+def summarize_folder(folder):
+    """
+    Load one result folder and reduce it to per-turn mean/std of every report metric.
+    Runs in a worker process; only the small summary frame is sent back.
+    """
+    df = load_folder(folder)
+    if df.empty:
+        return folder, pd.DataFrame(), {}
+
+    gen_time = df['invocation_latency'] - df['ttft']
+    valid = (gen_time > 0) & (df['output_tokens'] > 0)
+    df['ms_per_token'] = np.where(valid, gen_time / df['output_tokens'].where(valid, 1) * 1000, np.nan)
+    df['tokens_per_sec'] = np.where(valid, df['output_tokens'] / gen_time.where(valid, 1), np.nan)
+
+    metrics = [m for m in TURN_METRICS if m in df.columns]
+    per_turn = df.groupby('turn')[metrics].agg(['mean', 'std']).fillna(0)
+    per_turn.columns = [f"{metric}_{stat}" for metric, stat in per_turn.columns]
+
+    overall = {
+        'files': int(df['source_file'].nunique()),
+        'rows': int(len(df)),
+        'latency_mean': float(df['invocation_latency'].mean()),
+        'latency_std': float(df['invocation_latency'].std(ddof=0)),
+        'ttft_mean': float(df['ttft'].mean()),
+        'ttft_std': float(df['ttft'].std(ddof=0)),
+        'tokens_per_sec_mean': float(df['tokens_per_sec'].mean()),
+    }
+    return folder, per_turn.reset_index(), overall
+
+
+def render_figure(name, title, panels, errorbars, summaries, dpi):
+    """Render one comparison figure over all folders and return it as PNG bytes"""
+    colors = folder_colors(len(summaries))
+    fig, axes = plt.subplots(1, len(panels), figsize=(7 * len(panels), 6), squeeze=False)
+
+    for ax, (metric, marker) in zip(axes[0], panels):
+        for idx, (folder, per_turn) in enumerate(summaries):
+            if per_turn.empty or f"{metric}_mean" not in per_turn:
+                continue
+            if errorbars:
+                ax.errorbar(per_turn['turn'], per_turn[f"{metric}_mean"], yerr=per_turn[f"{metric}_std"],
+                            marker=marker, capsize=5, color=colors[idx],
+                            label=folder, linewidth=2, markersize=6, alpha=0.8)
+            else:
+                ax.plot(per_turn['turn'], per_turn[f"{metric}_mean"], marker=marker, color=colors[idx],
+                        label=folder, linewidth=2, markersize=6, alpha=0.8)
+
+        ax.set_xlabel('Turn', fontsize=12)
+        ax.set_ylabel(TURN_METRICS[metric], fontsize=12)
+        ax.set_title(f"{TURN_METRICS[metric].split(' (')[0]} by Turn", fontsize=14)
+        ax.grid(True, alpha=0.3)
+
+    # One shared legend so dozens of folders do not cover the data
+    handles, labels = axes[0][0].get_legend_handles_labels()
+    if handles:
+        fig.legend(handles, labels, loc='lower center', ncol=min(len(labels), 4), fontsize=9,
+                   bbox_to_anchor=(0.5, -0.02 - 0.03 * ((len(labels) - 1) // 4)))
+    fig.suptitle(title, fontsize=16)
+    fig.tight_layout(rect=(0, 0.08, 1, 1))
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return name, buffer.getvalue()
+
+
+def render_ttft_distribution(summaries_raw, dpi):
+    """Box plot of all TTFT samples per folder"""
+    labels = [folder for folder, _ in summaries_raw]
+    fig, ax = plt.subplots(figsize=(max(8, 0.6 * len(labels)), 6))
+    ax.boxplot([values for _, values in summaries_raw], showfliers=False)
+    ax.set_xticks(range(1, len(labels) + 1))
+    ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=9)
+    ax.set_ylabel('TTFT (seconds)', fontsize=12)
+    ax.set_title('TTFT Distribution by Folder', fontsize=14)
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return 'ttft_distribution', buffer.getvalue()
+
+
+def load_ttft_samples(folder):
+    """All TTFT samples of one folder"""
+    df = load_folder(folder)
+    return folder, df['ttft'].dropna().to_numpy() if 'ttft' in df.columns else np.array([])
+
+
+def build_tables(summaries, overalls):
+    """Summary table per folder and per-turn TTFT table with differences against the first folder"""
+    summary = pd.DataFrame([{'folder': folder, **overalls[folder]} for folder, _ in summaries])
+
+    base_folder, base_turns = summaries[0]
+    base_ttft = base_turns.set_index('turn')['ttft_mean'] if not base_turns.empty else pd.Series(dtype=float)
+    ttft_table = pd.DataFrame({'turn': base_ttft.index})
+    for folder, per_turn in summaries:
+        if per_turn.empty:
+            continue
+        values = per_turn.set_index('turn')['ttft_mean'].reindex(base_ttft.index)
+        if folder == base_folder:
+            ttft_table[folder] = [f"{v:.3f}s" for v in values]
+        else:
+            diffs = (values - base_ttft) / base_ttft * 100
+            ttft_table[folder] = [f"{v:.3f}s ({d:+.1f}%)" if pd.notna(v) else 'N/A' for v, d in zip(values, diffs)]
+    return summary, ttft_table
+
+
+def markdown_table(df):
+    """Render a DataFrame as a GitHub-flavoured Markdown table"""
+    def fmt(value):
+        return f"{value:.3f}" if isinstance(value, float) else str(value)
+    lines = ["| " + " | ".join(str(c) for c in df.columns) + " |",
+             "|" + "|".join("---" for _ in df.columns) + "|"]
+    for row in df.itertuples(index=False):
+        lines.append("| " + " | ".join(fmt(v) for v in row) + " |")
+    return "\n".join(lines)
+
+
+def write_report(path, fmt, folders, summary, ttft_table, images):
+    """Write one self-contained report with images embedded as base64 data URIs"""
+    generated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    encoded = {name: base64.b64encode(png).decode('ascii') for name, png in images}
+
+    if fmt == 'md':
+        parts = ["# Prompt Caching Benchmark Report", f"Generated {generated}. Baseline: `{folders[0]}`.",
+                 "## Folder Summary", markdown_table(summary),
+                 "## TTFT by Turn (difference vs baseline)", markdown_table(ttft_table)]
+        for name, data in encoded.items():
+            parts.append(f"## {name.replace('_', ' ').title()}\n\n![{name}](data:image/png;base64,{data})")
+        content = "\n\n".join(parts) + "\n"
+    else:
+        parts = ["<!DOCTYPE html><html><head><meta charset='utf-8'><title>Prompt Caching Benchmark Report</title>",
+                 "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse}"
+                 "td,th{border:1px solid #ccc;padding:4px 8px;text-align:right}img{max-width:100%}</style></head><body>",
+                 "<h1>Prompt Caching Benchmark Report</h1>",
+                 f"<p>Generated {generated}. Baseline: <code>{html.escape(folders[0])}</code>.</p>",
+                 "<h2>Folder Summary</h2>", summary.to_html(index=False, float_format=lambda v: f"{v:.3f}"),
+                 "<h2>TTFT by Turn (difference vs baseline)</h2>", ttft_table.to_html(index=False)]
+        for name, data in encoded.items():
+            parts.append(f"<h2>{html.escape(name.replace('_', ' ').title())}</h2>"
+                         f"<img alt='{html.escape(name)}' src='data:image/png;base64,{data}'>")
+        parts.append("</body></html>")
+        content = "\n".join(parts)
+
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def generate_report(folders, output, fmt='html', workers=None, dpi=150):
+    """Summarise every folder and render all figures in worker processes, then write the report"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        loaded = list(pool.map(summarize_folder, folders))
+        summaries = [(folder, per_turn) for folder, per_turn, _ in loaded]
+        overalls = {folder: overall for folder, _, overall in loaded}
+
+        figure_jobs = [pool.submit(render_figure, name, title, panels, errorbars, summaries, dpi)
+                       for name, title, panels, errorbars in FIGURES]
+        ttft_samples = list(pool.map(load_ttft_samples, folders))
+        figure_jobs.append(pool.submit(render_ttft_distribution, ttft_samples, dpi))
+        images = [job.result() for job in figure_jobs]
+
+    summary, ttft_table = build_tables(summaries, overalls)
+    write_report(output, fmt, folders, summary, ttft_table, images)
+    return output
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Generate a self-contained comparison report for result folders.")
+    parser.add_argument('folders', nargs='+', help="Result folders or glob patterns; the first one is the baseline")
+    parser.add_argument('--output', default=None, help="Report path (default: report_<date>.<format>)")
+    parser.add_argument('--format', choices=['html', 'md'], default='html')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--dpi', type=int, default=150)
+    args = parser.parse_args(argv)
+
+    folders = []
+    for pattern in args.folders:
+        matches = sorted(p for p in glob.glob(pattern) if os.path.isdir(p))
+        folders.extend(matches or [pattern])
+
+    missing = [folder for folder in folders if not os.path.isdir(folder)]
+    if missing:
+        parser.error(f"Folders not found: {', '.join(missing)}")
+
+    output = args.output or f"report_{datetime.now().strftime('%y%m%d')}.{args.format}"
+    generate_report(folders, output, fmt=args.format, workers=args.workers, dpi=args.dpi)
+    print(f"Report for {len(folders)} folders saved as '{output}'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
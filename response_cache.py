@@ -0,0 +1,169 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from replay_log import TRANSPORT_KEYS, event_dict, stream_constructor, timed_stream
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 3600
+ENTRY_SUFFIX = ".json.gz"
+
+
+def memo_key(model, params):
+    """Canonical hash of the model, the sampling parameters and the messages of a request"""
+    body = {key: value for key, value in params.items() if key not in TRANSPORT_KEYS}
+    data = json.dumps({"model": model, "body": body}, sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+                      default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class _Messages:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model, **params):
+        return self._owner.create(model, **params)
+
+
+class MemoizingClient:
+    """
+    Opt-in development cache in front of a client. A miss streams from the client and stores the
+    whole event sequence with nanosecond offsets (one gzip file per request hash in cache_dir);
+    a hit replays it at the original timing (times time_scale, 0 = instantly) without any request.
+    Entries are evicted least recently used first once cache_dir exceeds max_bytes, and when
+    unused for max_age seconds. Errors and streams abandoned half-way are not stored.
+    A finished miss is queued; encoding, writing and eviction happen on a writer thread, so they do not
+    count against the request's latency. close() writes what is still queued.
+    """
+
+    def __init__(self, client, cache_dir, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE_SECONDS,
+                 time_scale=1.0):
+        self.client = client
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.time_scale = time_scale
+        self.messages = _Messages(self)
+        self.hits = self.misses = self.evictions = 0
+        self._construct = stream_constructor()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.evict()
+        self._writer = threading.Thread(target=self._drain, name="response-cache-writer", daemon=True)
+        self._writer.start()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def create(self, model, **params):
+        start = time.perf_counter_ns()
+        key = memo_key(model, params)
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # Last use, for LRU eviction
+        except (OSError, ValueError):
+            entry = None
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return timed_stream(entry["events"], start, self.time_scale, self._construct)
+
+        with self._lock:
+            self.misses += 1
+        stream = self.client.messages.create(model=model, **params)
+        return self._store(stream, key, model, start)
+
+    def _store(self, stream, key, model, start):
+        events = []
+        for event in stream:
+            events.append((time.perf_counter_ns() - start, event))
+            yield event
+        # Only reached when the stream was read to the end
+        self._queue.put((key, model, time.time(), events))
+
+    def _drain(self):
+        """Writer thread: store each queued miss until close() sends None"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            key, model, created, events = item
+            self.write_entry(key, {"model": model, "created": created,
+                                   "events": [(offset, event_dict(event)) for offset, event in events]})
+
+    def close(self):
+        """Write every queued entry and stop the writer"""
+        self._queue.put(None)
+        self._writer.join()
+
+    def write_entry(self, key, entry):
+        path = self._path(key)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(temporary, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(temporary, path)
+        self.evict()
+
+    def entries(self):
+        """(last_used, size, path) of every stored entry, least recently used first"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(ENTRY_SUFFIX):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        """Drop entries unused for max_age, then the least recently used until under max_bytes"""
+        with self._lock:
+            entries = self.entries()
+            now = time.time()
+            total = sum(size for _, size, _ in entries)
+            for last_used, size, path in entries:
+                if total <= self.max_bytes and now - last_used <= self.max_age:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.evictions += 1
+
+    def stats(self):
+        entries = self.entries()
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(entries), "bytes": sum(size for _, size, _ in entries)}
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Inspect, trim or clear the development response cache.")
+    parser.add_argument("cache_dir", nargs="?", default=".response_cache")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024)
+    parser.add_argument("--max-age-hours", type=float, default=DEFAULT_MAX_AGE_SECONDS / 3600)
+    parser.add_argument("--clear", action="store_true", help="Remove every entry")
+    args = parser.parse_args(argv)
+
+    cache = MemoizingClient(None, args.cache_dir, max_bytes=args.max_mb * 1024 * 1024,
+                            max_age=-1 if args.clear else args.max_age_hours * 3600)
+    stats = cache.stats()
+    print(f"{args.cache_dir}: {stats['entries']} entries, {stats['bytes'] / 1024 / 1024:.1f} MB "
+          f"({stats['evictions']} evicted)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+DEFAULT_CATALOG = "results_catalog.sqlite"
+
+# Per-turn columns stored as real columns (queried and loaded back); the rest of a row goes to `extra`
+TURN_COLUMNS = ("experiment", "turn", "ttft", "invocation_latency", "first_byte_latency", "input_tokens",
+                "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    folder TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    model TEXT,
+    provider TEXT,
+    policy TEXT,
+    cache_ttl TEXT,
+    endpoint TEXT,
+    run_date TEXT,
+    n_files INTEGER,
+    n_rows INTEGER,
+    signature TEXT,
+    indexed_at REAL,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS turns (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    source_file TEXT,
+    experiment INTEGER,
+    turn INTEGER,
+    ttft REAL,
+    invocation_latency REAL,
+    first_byte_latency REAL,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    cache_creation_input_tokens INTEGER,
+    cache_read_input_tokens INTEGER,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_model ON runs(model);
+CREATE INDEX IF NOT EXISTS runs_provider ON runs(provider);
+CREATE INDEX IF NOT EXISTS runs_policy ON runs(policy);
+CREATE INDEX IF NOT EXISTS runs_date ON runs(run_date);
+CREATE INDEX IF NOT EXISTS turns_run_turn ON turns(run_id, turn);
+CREATE INDEX IF NOT EXISTS turns_turn ON turns(turn);
+"""
+
+# Selector keys: runs column and SQL condition
+SELECTOR_KEYS = {
+    "model": "(model = :model OR model LIKE '%' || :model || '%')",
+    "provider": "provider = :provider",
+    "policy": "policy = :policy",
+    "ttl": "cache_ttl = :ttl",
+    "name": "name LIKE '%' || :name || '%'",
+    "folder": "folder LIKE '%' || :folder || '%'",
+    "since": "run_date >= :since",
+    "until": "run_date <= :until",
+}
+
+# YYMMDD in folder names such as 37_250627_ttft
+FOLDER_DATE = re.compile(r"(?<!\d)(\d{2})(\d{2})(\d{2})(?!\d)")
+
+
+def open_catalog(path=DEFAULT_CATALOG):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def folder_signature(folder):
+    """Changes whenever an experiment CSV or the run metadata of the folder is added, removed or rewritten"""
+    from results_io import RUN_METADATA_FILE, list_result_files
+
+    digest = hashlib.sha1()
+    for path in list_result_files(folder) + [os.path.join(folder, RUN_METADATA_FILE)]:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def run_date(folder, metadata, csv_files):
+    """Date of a run: its recorded start, else a YYMMDD in the folder name, else its oldest CSV"""
+    if metadata.get("started"):
+        return metadata["started"][:10]
+    match = FOLDER_DATE.search(os.path.basename(os.path.normpath(folder)))
+    if match:
+        year, month, day = (int(part) for part in match.groups())
+        if 1 <= month <= 12 and 1 <= day <= 31:
+            return f"20{year:02d}-{month:02d}-{day:02d}"
+    if csv_files:
+        return time.strftime("%Y-%m-%d", time.gmtime(min(os.path.getmtime(path) for path in csv_files)))
+    return None
+
+
+def index_folder(conn, folder, force=False):
+    """Add or refresh one result folder; returns 'indexed', 'unchanged' or 'empty'"""
+    from results_io import list_result_files, load_folder, load_run_metadata
+
+    folder = os.path.abspath(folder)
+    csv_files = list_result_files(folder)
+    if not csv_files:
+        return "empty"
+    signature = folder_signature(folder)
+    existing = conn.execute("SELECT signature FROM runs WHERE folder = ?", (folder,)).fetchone()
+    if existing is not None and existing["signature"] == signature and not force:
+        return "unchanged"
+
+    metadata = load_run_metadata(folder)
+    df = load_folder(folder)
+    with conn:
+        conn.execute("DELETE FROM runs WHERE folder = ?", (folder,))
+        run_id = conn.execute(
+            "INSERT INTO runs (folder, name, model, provider, policy, cache_ttl, endpoint, run_date, n_files, "
+            "n_rows, signature, indexed_at, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (folder, os.path.basename(folder), metadata.get("model"), metadata.get("provider"),
+             metadata.get("policy"), metadata.get("cache_ttl"), metadata.get("endpoint"),
+             run_date(folder, metadata, csv_files), len(csv_files), len(df), signature, time.time(),
+             json.dumps(metadata))).lastrowid
+        extra_columns = [c for c in df.columns if c not in TURN_COLUMNS and c not in ("source_file", "generation_time")]
+        rows = []
+        for record in df.to_dict("records"):
+            values = [_sql_value(record.get(column)) for column in TURN_COLUMNS]
+            extra = {c: _sql_value(record[c]) for c in extra_columns}
+            rows.append([run_id, record.get("source_file")] + values + [json.dumps(extra, default=str)])
+        conn.executemany(f"INSERT INTO turns (run_id, source_file, {', '.join(TURN_COLUMNS)}, extra) "
+                         f"VALUES ({', '.join('?' * (len(TURN_COLUMNS) + 3))})", rows)
+    return "indexed"
+
+
+def _sql_value(value):
+    """numpy scalars and NaN to what sqlite3 stores"""
+    if value is None:
+        return None
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def find_result_folders(root):
+    """
+    Every folder under root written by a runner: one with run metadata or experiment CSVs.
+    Other CSVs (analyzer outputs, summaries, campaign parts) do not make a folder a run.
+    """
+    from results_io import RUN_METADATA_FILE
+
+    return sorted(dirpath for dirpath, _, filenames in os.walk(root)
+                  if RUN_METADATA_FILE in filenames
+                  or any(name.startswith("cache_experiment_results") and name.endswith(".csv") for name in filenames))
+
+
+def prune(conn):
+    """Drop runs whose folder no longer exists; returns how many"""
+    missing = [row["run_id"] for row in conn.execute("SELECT run_id, folder FROM runs")
+               if not os.path.isdir(row["folder"])]
+    with conn:
+        conn.executemany("DELETE FROM runs WHERE run_id = ?", [(run_id,) for run_id in missing])
+    return len(missing)
+
+
+def relative_date(value):
+    """'2025-06-27' as is; '-7d' -> the date seven days ago (UTC)"""
+    match = re.fullmatch(r"-(\d+)d", value)
+    if match:
+        return time.strftime("%Y-%m-%d", time.gmtime(time.time() - int(match.group(1)) * 86400))
+    return value
+
+
+def parse_selector(tokens):
+    """['model=haiku', 'since=-7d', ...] -> {'model': 'haiku', 'since': '2025-...'}"""
+    if isinstance(tokens, str):
+        tokens = tokens.split()
+    selector = {}
+    for token in tokens:
+        key, _, value = token.partition("=")
+        if key not in SELECTOR_KEYS or not value:
+            raise ValueError(f"Bad selector '{token}' (KEY=VALUE with KEY one of {', '.join(SELECTOR_KEYS)})")
+        selector[key] = relative_date(value) if key in ("since", "until") else value
+    return selector
+
+
+def select_runs(conn, selector):
+    """Runs matching every condition of the selector, oldest first"""
+    where = " AND ".join(SELECTOR_KEYS[key] for key in selector) or "1"
+    return [dict(row) for row in conn.execute(
+        f"SELECT run_id, folder, name, model, provider, policy, cache_ttl, run_date, n_files, n_rows "
+        f"FROM runs WHERE {where} ORDER BY run_date, name", selector)]
+
+
+def load_runs(conn, run_ids, extra=False):
+    """
+    Per-turn rows of the given runs as one DataFrame, like results_io.load_folder does for a folder
+    (with a run_id column). The columns outside TURN_COLUMNS are only unpacked if extra is set.
+    """
+    import pandas as pd
+
+    run_ids = list(run_ids)
+    query = (f"SELECT run_id, source_file, {', '.join(TURN_COLUMNS)}{', extra' if extra else ''} FROM turns "
+             f"WHERE run_id IN ({', '.join('?' * len(run_ids))}) ORDER BY run_id, source_file, turn")
+    df = pd.read_sql_query(query, conn, params=run_ids)
+    if extra and not df.empty:
+        df = pd.concat([df.drop(columns="extra"), pd.DataFrame([json.loads(e) for e in df["extra"]])], axis=1)
+    if not df.empty:
+        df['generation_time'] = df['invocation_latency'] - df['ttft']
+    return df
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Index result folders in SQLite and select runs by query.")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    index = subparsers.add_parser("index", help="Add or refresh result folders (searched recursively)")
+    index.add_argument("paths", nargs="+")
+    index.add_argument("--force", action="store_true", help="Re-read folders that did not change")
+    query = subparsers.add_parser("query", help="List the runs matching a selector")
+    query.add_argument("selector", nargs="*", metavar="KEY=VALUE", help=f"Keys: {', '.join(SELECTOR_KEYS)}")
+    query.add_argument("--folders", action="store_true", help="Print only the folders, e.g. for `cli.py analyze`")
+    subparsers.add_parser("prune", help="Drop runs whose folder was deleted")
+    args = parser.parse_args(argv)
+
+    conn = open_catalog(args.catalog)
+    if args.command == "index":
+        counts = {}
+        for path in args.paths:
+            for folder in find_result_folders(path):
+                status = index_folder(conn, folder, force=args.force)
+                counts[status] = counts.get(status, 0) + 1
+                if status == "indexed":
+                    print(f"  indexed {folder}")
+        print(f"{args.catalog}: " + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+    elif args.command == "query":
+        try:
+            selector = parse_selector(args.selector)
+        except ValueError as e:
+            parser.error(str(e))
+        start = time.perf_counter()
+        runs = select_runs(conn, selector)
+        elapsed = (time.perf_counter() - start) * 1000
+        if args.folders:
+            print("\n".join(run["folder"] for run in runs))
+            return 0
+        print(f"{'Date':10s} | {'Name':28s} | {'Model':46s} | {'Policy':16s} | {'TTL':3s} | {'Files':>5s} | {'Rows':>6s}")
+        print("-" * 130)
+        for run in runs:
+            print(f"{run['run_date'] or '-':10s} | {run['name'][:28]:28s} | {(run['model'] or '-')[:46]:46s} | "
+                  f"{(run['policy'] or '-')[:16]:16s} | {run['cache_ttl'] or '-':3s} | {run['n_files']:5d} | "
+                  f"{run['n_rows']:6d}")
+        print(f"\n{len(runs)} runs ({elapsed:.1f} ms)")
+    elif args.command == "prune":
+        print(f"Removed {prune(conn)} runs of deleted folders")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
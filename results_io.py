@@ -0,0 +1,61 @@
+import glob
+import json
+import os
+
+import pandas as pd
+
+# Written by the runners next to the experiment CSVs; describes the configuration of the run
+RUN_METADATA_FILE = "run_metadata.json"
+
+
+def write_run_metadata(folder, metadata):
+    """Record the configuration (model, provider, policy, cache TTL, ...) of a result folder"""
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, RUN_METADATA_FILE), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+
+def load_run_metadata(folder):
+    """Return the run metadata of a result folder, or an empty dict for folders recorded before it existed"""
+    path = os.path.join(folder, RUN_METADATA_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def list_result_files(folder):
+    """Return the per-experiment CSV files of a result folder in a stable order"""
+    return sorted(glob.glob(os.path.join(folder, "*.csv")))
+
+
+def load_folder(folder):
+    """
+    Load every experiment CSV in a result folder into one DataFrame.
+    A `source_file` column is added so each row can be traced back to its experiment file.
+    """
+    frames = []
+    for csv_file in list_result_files(folder):
+        try:
+            df = pd.read_csv(csv_file)
+        except Exception as e:
+            print(f"Error reading {csv_file}: {e}")
+            continue
+        df['source_file'] = os.path.basename(csv_file)
+        frames.append(df)
+
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    if 'invocation_latency' in df.columns and 'ttft' in df.columns:
+        df['generation_time'] = df['invocation_latency'] - df['ttft']
+    return df
+
+
+def per_turn_values(df, column):
+    """Group one metric column by turn: {turn: numpy array of values}"""
+    if df.empty or column not in df.columns:
+        return {}
+    values = df[['turn', column]].dropna()
+    return {int(turn): group[column].to_numpy(dtype=float) for turn, group in values.groupby('turn')}
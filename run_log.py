@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+LOGGER_NAME = "benchmark"
+DEFAULT_QUEUE_SIZE = 10000
+
+_listener = None
+_queue_handler = None
+
+
+def get_logger():
+    return logging.getLogger(LOGGER_NAME)
+
+
+def log_event(logger, level, event, **fields):
+    """Log a structured event; nothing is built when the level is disabled"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread through a bounded queue.
+    The caller only enqueues: formatting, hashing and I/O all happen on the writer thread,
+    and a full queue drops the record (counted) instead of blocking the turn loop.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class PromptStore:
+    """
+    Content-addressed store of prompt bodies: each distinct body is written once as <sha256>.json.
+    The directory is only created by the first put, so runs below DEBUG leave no empty prompts folder.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._seen = set()
+
+    def put(self, prompt):
+        encoded = json.dumps(prompt, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        digest = hashlib.sha256(encoded).hexdigest()
+        if digest not in self._seen:
+            if not self._seen:
+                os.makedirs(self.directory, exist_ok=True)
+            self._seen.add(digest)
+            path = os.path.join(self.directory, f"{digest}.json")
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(encoded)
+        return digest
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, event and the event's fields (prompts replaced by their hash)"""
+
+    def __init__(self, prompt_store=None):
+        super().__init__()
+        self.prompt_store = prompt_store
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "event": record.getMessage(),
+        }
+        for key, value in getattr(record, "fields", {}).items():
+            if key == "prompt":
+                if self.prompt_store is not None:
+                    entry["prompt_sha256"] = self.prompt_store.put(value)
+                continue
+            entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Short human-readable line: event followed by key=value fields (prompts are never printed)"""
+
+    def format(self, record):
+        fields = " ".join(f"{key}={value}" for key, value in getattr(record, "fields", {}).items()
+                          if key != "prompt")
+        return f"{record.getMessage()} {fields}".rstrip()
+
+
+def configure_logging(log_file=None, level="INFO", prompt_dir=None, console=True, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Route the benchmark logger through a bounded queue to a background writer thread.
+    log_file receives JSON lines; prompt bodies (DEBUG only) go to prompt_dir by content hash.
+    """
+    shutdown_logging()
+    global _listener, _queue_handler
+
+    handlers = []
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(JsonLinesFormatter(PromptStore(prompt_dir) if prompt_dir else None))
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(ConsoleFormatter())
+        handlers.append(console_handler)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    logger = get_logger()
+    logger.handlers = [_queue_handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+def shutdown_logging():
+    """Drain the queue and stop the writer thread; reports records dropped on a full queue"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    if _queue_handler.dropped:
+        print(f"Warning: {_queue_handler.dropped} log records dropped (log queue full)")
+    get_logger().removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
@@ -0,0 +1,296 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from arm_settings import ARM_KEYS, parse_arm
+
+# A claim whose file has not been touched for this long is considered abandoned and may be taken over
+DEFAULT_LEASE_SECONDS = 300
+
+PLAN_FILE = "plan.json"
+
+
+def campaign_paths(campaign_dir):
+    return {name: os.path.join(campaign_dir, name) for name in ("claims", "done", "parts", "workers")}
+
+
+def write_json_atomic(path, data):
+    """Write to a temporary file and rename it, so readers on other hosts never see a partial file"""
+    temporary = f"{path}.{socket.gethostname()}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(temporary, path)
+
+
+def make_plan(campaign_dir, arms, n_experiments, n_turns):
+    """
+    Experiment matrix of a campaign: one job per arm and experiment number, written to plan.json
+    in a directory every worker can read (a shared filesystem, or a copy per host).
+    """
+    for path in campaign_paths(campaign_dir).values():
+        os.makedirs(path, exist_ok=True)
+    plan = {
+        "campaign": uuid.uuid4().hex[:8],
+        "created": time.time(),
+        "n_turns": n_turns,
+        "arms": arms,
+        "jobs": [{"job_id": f"{name}-{exp_num:04d}", "arm": name, "exp_num": exp_num}
+                 for exp_num in range(n_experiments) for name in arms],
+    }
+    write_json_atomic(os.path.join(campaign_dir, PLAN_FILE), plan)
+    return plan
+
+
+def load_plan(campaign_dir):
+    with open(os.path.join(campaign_dir, PLAN_FILE)) as f:
+        return json.load(f)
+
+
+def parse_shard(value):
+    """'2/4' -> (1, 4): the second of four static shards"""
+    index, _, count = value.partition("/")
+    index, count = int(index), int(count)
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard {value} is not between 1/{count} and {count}/{count}")
+    return index - 1, count
+
+
+def try_claim(campaign_dir, job_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Claim a job by creating its claim file exclusively. A claim not touched within the lease
+    (its worker died) is taken over by the one worker that creates the marker named after the
+    stale claim's mtime, and only if the claim still has that mtime (no heartbeat since).
+    """
+    paths = campaign_paths(campaign_dir)
+    if os.path.exists(os.path.join(paths["done"], job_id)):
+        return False
+    claim = os.path.join(paths["claims"], job_id)
+    owner = {"worker": worker_id, "claimed": time.time()}
+    try:
+        fd = os.open(claim, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            seen = os.stat(claim).st_mtime_ns
+            if time.time() - seen / 1e9 <= lease_seconds:
+                return False
+            # A live claim or a fresh takeover has a newer mtime, so it never matches another worker's marker
+            os.close(os.open(f"{claim}.stale-{seen}", os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            if os.stat(claim).st_mtime_ns != seen:
+                return False
+        except OSError:
+            return False
+        write_json_atomic(claim, owner)
+        return True
+    with os.fdopen(fd, "w") as f:
+        json.dump(owner, f)
+    return True
+
+
+class Heartbeat:
+    """Touches a claim file periodically so other workers see the job is still running"""
+
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="claim-heartbeat")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                os.utime(self.path)
+            except OSError:
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(campaign_dir, worker_id=None, shard=None, endpoint_url=None, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Claim and run jobs of the plan until none are left (only those of one static shard if given).
+    Each job's turn rows are written, tagged with job, worker and host, to parts/<job_id>.<worker>.csv
+    before its done marker. Returns the number of jobs this worker ran.
+    """
+    import pandas as pd
+    from benchmark_runner import DEFAULT_SYSTEM_PROMPT, make_bedrock_client, make_cache_control, run_conversation
+
+    plan = load_plan(campaign_dir)
+    paths = campaign_paths(campaign_dir)
+    host = socket.gethostname()
+    worker_id = worker_id or f"{host}-{os.getpid()}"
+    jobs = plan["jobs"] if shard is None else [job for i, job in enumerate(plan["jobs"]) if i % shard[1] == shard[0]]
+    texts, clients, done = {}, {}, 0
+    started = time.time()
+
+    for job in jobs:
+        if not try_claim(campaign_dir, job["job_id"], worker_id, lease_seconds):
+            continue
+        arm = plan["arms"][job["arm"]]
+        url = endpoint_url or arm.get("endpoint_url")
+        if job["arm"] not in clients:
+            clients[job["arm"]] = make_bedrock_client(arm.get("region", "us-west-2"), base_url=url)
+        if arm["document"] not in texts:
+            with open(arm["document"], 'r') as file:
+                texts[arm["document"]] = file.read()
+        print(f"[{worker_id}] {job['job_id']}")
+
+        with Heartbeat(os.path.join(paths["claims"], job["job_id"]), lease_seconds / 3):
+            rows = run_conversation(clients[job["arm"]], arm["model"], texts[arm["document"]], job["exp_num"],
+                                    plan["n_turns"], cache_control=make_cache_control(arm["ttl"]),
+                                    max_tokens=arm["max_tokens"],
+                                    system_prompt=f"{DEFAULT_SYSTEM_PROMPT} [run {plan['campaign']} {job['arm']}]")
+        df = pd.DataFrame(rows)
+        df["job_id"], df["arm"], df["worker"], df["host"] = job["job_id"], job["arm"], worker_id, host
+        part = os.path.join(paths["parts"], f"{job['job_id']}.{worker_id}.csv")
+        df.to_csv(part + ".tmp", index=False)
+        os.replace(part + ".tmp", part)
+        write_json_atomic(os.path.join(paths["done"], job["job_id"]),
+                          {"worker": worker_id, "part": os.path.basename(part), "finished": time.time()})
+        done += 1
+
+    write_json_atomic(os.path.join(paths["workers"], f"{worker_id}.json"),
+                      {"worker": worker_id, "host": host, "jobs": done, "started": started, "finished": time.time()})
+    return done
+
+
+def merge_campaign(campaign_dir, output_dir):
+    """
+    Combine the parts into one result folder per arm, in the layout the analyzer reads.
+    A job run twice (a lease taken over from a slow worker) keeps the part its done marker names,
+    else the earliest written. Returns (rows per arm, missing job ids).
+    """
+    import pandas as pd
+    from results_io import write_run_metadata
+
+    plan = load_plan(campaign_dir)
+    paths = campaign_paths(campaign_dir)
+    # Parts are <job_id>.<worker_id>.csv and both ids may contain dots (arm names, host names),
+    # so a part belongs to the longest job id of the plan that prefixes it
+    job_ids = sorted((job["job_id"] for job in plan["jobs"]), key=len, reverse=True)
+    parts = {}
+    for name in sorted(os.listdir(paths["parts"]), key=lambda n: os.path.getmtime(os.path.join(paths["parts"], n))):
+        job_id = next((job_id for job_id in job_ids if name.startswith(job_id + ".")), None)
+        if name.endswith(".csv") and job_id is not None:
+            parts.setdefault(job_id, []).append(name)
+
+    counts, missing = {}, []
+    for job in plan["jobs"]:
+        candidates = parts.get(job["job_id"], [])
+        marker = os.path.join(paths["done"], job["job_id"])
+        if os.path.exists(marker):
+            with open(marker) as f:
+                chosen = json.load(f)["part"]
+            if chosen not in candidates:
+                chosen = candidates[0] if candidates else None
+        else:
+            chosen = candidates[0] if candidates else None
+        if chosen is None:
+            missing.append(job["job_id"])
+            continue
+        arm = plan["arms"][job["arm"]]
+        folder = os.path.join(output_dir, job["arm"])
+        if job["arm"] not in counts:
+            counts[job["arm"]] = 0
+            write_run_metadata(folder, {"model": arm["model"], "provider": "bedrock",
+                                        "endpoint": arm.get("endpoint_url"), "policy": "sliding-window",
+                                        "cache_ttl": arm["ttl"], "n_turns": plan["n_turns"],
+                                        "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(plan["created"])),
+                                        "campaign": plan["campaign"], "sharded": True})
+        df = pd.read_csv(os.path.join(paths["parts"], chosen))
+        df.to_csv(os.path.join(folder, f"cache_experiment_results_sharded_{job['exp_num']}.csv"), index=False)
+        counts[job["arm"]] += 1
+
+    for name, count in counts.items():
+        folder = os.path.join(output_dir, name)
+        with open(os.path.join(folder, "run_metadata.json")) as f:
+            metadata = json.load(f)
+        write_run_metadata(folder, dict(metadata, n_experiments=count))
+    return counts, missing
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Split experiments into shards run by independent workers.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    plan = subparsers.add_parser("plan", help="Write the experiment matrix of a campaign")
+    plan.add_argument("campaign_dir")
+    plan.add_argument("--arm", nargs="+", action="append", metavar="NAME [KEY=VALUE ...]",
+                      help=f"Configuration ({', '.join(ARM_KEYS)})")
+    plan.add_argument("--experiments", type=int, default=10, help="Conversations per arm")
+    plan.add_argument("--turns", type=int, default=10)
+    plan.add_argument("--model", default="us.anthropic.claude-3-7-sonnet-20250219-v1:0")
+    plan.add_argument("--region", default="us-west-2")
+    plan.add_argument("--endpoint-url")
+    plan.add_argument("--ttl", choices=["5m", "1h"], default="5m")
+    plan.add_argument("--max-tokens", type=int, default=256)
+    plan.add_argument("--document", default="RomeoAndJuliet.txt")
+
+    worker = subparsers.add_parser("worker", help="Claim and run jobs until none are left")
+    worker.add_argument("campaign_dir")
+    worker.add_argument("--shard", type=parse_shard, help="Only jobs of static shard I/N (no shared directory)")
+    worker.add_argument("--worker-id")
+    worker.add_argument("--endpoint-url", help="Override the arms' endpoint (e.g. a local stand-in)")
+    worker.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS)
+
+    merge = subparsers.add_parser("merge", help="Dedupe and combine the parts into one folder per arm")
+    merge.add_argument("campaign_dir")
+    merge.add_argument("--output-dir", default="sharded_results")
+
+    local = subparsers.add_parser("local", help="Run several worker processes here against a local stand-in")
+    local.add_argument("campaign_dir")
+    local.add_argument("--workers", type=int, default=3)
+    local.add_argument("--local-time-scale", type=float, default=1.0)
+    local.add_argument("--output-dir", default="sharded_results")
+    args = parser.parse_args(argv)
+
+    if args.command == "plan":
+        try:
+            parsed = [parse_arm(values) for values in (args.arm or [["default"]])]
+        except ValueError as e:
+            parser.error(str(e))
+        arms = {}
+        for name, overrides in parsed:
+            arms[name] = dict({"model": args.model, "region": args.region, "endpoint_url": args.endpoint_url,
+                               "ttl": args.ttl, "max_tokens": args.max_tokens, "document": args.document}, **overrides)
+        created = make_plan(args.campaign_dir, arms, args.experiments, args.turns)
+        print(f"Campaign {created['campaign']}: {len(created['jobs'])} jobs in '{args.campaign_dir}'")
+        return 0
+
+    if args.command == "worker":
+        ran = run_worker(args.campaign_dir, args.worker_id, args.shard, args.endpoint_url, args.lease)
+        print(f"Worker finished: {ran} jobs")
+        return 0
+
+    if args.command == "local":
+        from local_bedrock_server import LocalBedrockServer
+        server = LocalBedrockServer(profile={"time_scale": args.local_time_scale}).start()
+        command = [sys.executable, os.path.abspath(__file__), "worker", args.campaign_dir, "--endpoint-url", server.url]
+        start = time.time()
+        workers = [subprocess.Popen(command + ["--worker-id", f"local-{i + 1}"]) for i in range(args.workers)]
+        failed = sum(process.wait() != 0 for process in workers)
+        server.stop()
+        print(f"{args.workers} workers finished in {time.time() - start:.1f}s ({failed} failed)")
+
+    counts, missing = merge_campaign(args.campaign_dir, args.output_dir)
+    for name, count in counts.items():
+        print(f"  {name}: {count} conversations -> {os.path.join(args.output_dir, name)}")
+    if missing:
+        print(f"Missing {len(missing)} jobs: {', '.join(missing)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
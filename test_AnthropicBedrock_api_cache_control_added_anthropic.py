@@ -2,6 +2,8 @@ import time
 import json
 import os
 import pandas as pd
+from benchmark_runner import utc_timestamp
+from results_io import write_run_metadata
 from anthropic import Anthropic
 from functools import wraps
 import random 
@@ -19,6 +21,19 @@ if not os.path.exists(result_dir):
 n_experiments = 10
 n_turns = 10
 
+model_id = "claude-3-7-sonnet-20250219"  # 또는 "claude-3-haiku-20240307" 등
+cache_ttl = "5m"  # "5m" (default) or "1h"
+cache_control = {"type": "ephemeral"} if cache_ttl == "5m" else {"type": "ephemeral", "ttl": cache_ttl}
+
+write_run_metadata(result_dir, {
+    "model": model_id,
+    "provider": "anthropic",
+    "policy": "sliding-window",
+    "cache_ttl": cache_ttl,
+    "n_experiments": n_experiments,
+    "n_turns": n_turns,
+})
+
 def retry_with_exponential_backoff(
     max_retries=5,
     initial_delay=2,
@@ -167,9 +182,7 @@ for exp_num in range(n_experiments):
                     {
                         "type": "text",
                         "text": questions[turn] + " ",
-                        "cache_control": {
-                            "type": "ephemeral"  # Cache this content
-                        }
+                        "cache_control": dict(cache_control)  # Cache this content
                     },
                 ]
             }
@@ -180,9 +193,7 @@ for exp_num in range(n_experiments):
                     {
                         "type": "text",
                         "text": questions[turn] + " ",
-                        "cache_control": {
-                            "type": "ephemeral"  # Cache this content
-                        }
+                        "cache_control": dict(cache_control)  # Cache this content
                     },
                 ]
             }
@@ -193,8 +204,9 @@ for exp_num in range(n_experiments):
         print(f"-------------{turn}-------------")
         print(messages)
         
+        turn_start = time.time()
         full_response, metrics, ttft, invocation_latency = anthropic_model_with_ttft(
-            model_id="claude-3-7-sonnet-20250219",  # 또는 "claude-3-haiku-20240307" 등
+            model_id=model_id,
             messages=messages,
         )
         
@@ -214,6 +226,7 @@ for exp_num in range(n_experiments):
         })
     
         # Store data for this turn
+        turn_end = time.time()
         turn_data = {
             "experiment": exp_num + 1,
             "turn": turn + 1,
@@ -223,7 +236,9 @@ for exp_num in range(n_experiments):
             "cache_creation_input_tokens": metrics.get("cache_creation_input_tokens", 0),
             "cache_read_input_tokens": metrics.get("cache_read_input_tokens", 0),
             "invocation_latency": invocation_latency,
-            "ttft": ttft  
+            "ttft": ttft,
+            "turn_start_utc": utc_timestamp(turn_start),
+            "turn_end_utc": utc_timestamp(turn_end),
         }
         print(turn_data)
         experiment_data.append(turn_data)
@@ -0,0 +1,201 @@
+import argparse
+import os
+import sys
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from scipy.stats import kruskal
+
+from analyze_cache_and_latency_ttft import folder_colors, show_figure
+from results_io import load_folder
+
+# Metrics broken down by wall-clock time: column -> (label, direction that counts as worse)
+METRICS = {
+    'ttft': ('TTFT', 'higher'),
+    'throughput': ('Output tokens/s', 'lower'),
+}
+
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+DEFAULT_WINDOW = '1h'
+DEFAULT_DRIFT_PCT = 20.0
+MIN_WINDOW_SAMPLES = 10
+
+
+def load_timed(folders, timezone='UTC'):
+    """
+    Turns of the folders that carry turn_start_utc, with local hour / weekday in `timezone`.
+    TTFT depends strongly on the turn (cache writes, growing context), so every metric is also given
+    relative to the median of the same folder and turn (`<metric>_rel`, 1.0 = typical for that turn).
+    """
+    frames = []
+    for folder in folders:
+        df = load_folder(folder)
+        if df.empty or 'turn_start_utc' not in df.columns:
+            print(f"  {folder}: no turn timestamps (recorded before turn_start_utc existed), skipped")
+            continue
+        df = df.dropna(subset=['turn_start_utc']).copy()
+        df['folder'] = folder
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    df['start'] = pd.to_datetime(df['turn_start_utc'], utc=True)
+    local = df['start'].dt.tz_convert(timezone)
+    df['hour'] = local.dt.hour
+    df['weekday'] = local.dt.weekday
+    decode_time = df['invocation_latency'] - df['ttft']
+    df['throughput'] = (df['output_tokens'] / decode_time).where(decode_time > 0)
+    for metric in METRICS:
+        df[f'{metric}_rel'] = df[metric] / df.groupby(['folder', 'turn'])[metric].transform('median')
+    return df.sort_values('start').reset_index(drop=True)
+
+
+def breakdown(df, key):
+    """Per hour of day or weekday: turns, and the median / P90 of each metric and of its relative value"""
+    aggregations = {'turns': ('ttft', 'size')}
+    for metric in METRICS:
+        aggregations[f'{metric}_p50'] = (metric, 'median')
+        aggregations[f'{metric}_p90'] = (metric, lambda x: x.quantile(0.9))
+        aggregations[f'{metric}_rel_p50'] = (f'{metric}_rel', 'median')
+    return df.groupby(key).agg(**aggregations).reset_index()
+
+
+def periodicity_test(df, key, metric, min_samples=MIN_WINDOW_SAMPLES):
+    """Kruskal-Wallis p-value that the relative metric differs between hours / weekdays (NaN if < 2 groups)"""
+    groups = [group[f'{metric}_rel'].dropna().to_numpy() for _, group in df.groupby(key)]
+    groups = [g for g in groups if len(g) >= min_samples]
+    if len(groups) < 2:
+        return float('nan')
+    return float(kruskal(*groups).pvalue)
+
+
+def rolling_median(df, metric, window=DEFAULT_WINDOW, min_samples=MIN_WINDOW_SAMPLES):
+    """Median of the relative metric over the trailing time window ending at each turn (NaN below min_samples)"""
+    series = df.set_index('start')[f'{metric}_rel']
+    rolling = series.rolling(window)
+    return rolling.median().where(rolling.count() >= min_samples).to_numpy()
+
+
+def drift_periods(df, metric, window=DEFAULT_WINDOW, threshold_pct=DEFAULT_DRIFT_PCT,
+                  min_samples=MIN_WINDOW_SAMPLES):
+    """
+    Periods where the rolling median of the relative metric is worse than typical (1.0) by more than
+    threshold_pct, e.g. TTFT 20% above its per-turn median for the whole window.
+    Returns rows of (start, end, turns, peak_pct).
+    """
+    rolled = rolling_median(df, metric, window, min_samples)
+    change = (rolled - 1) * 100 if METRICS[metric][1] == 'higher' else (1 - rolled) * 100
+    drifting = np.nan_to_num(change, nan=0.0) > threshold_pct
+    periods = []
+    start = None
+    for i, flag in enumerate(np.append(drifting, False)):
+        if flag and start is None:
+            start = i
+        elif not flag and start is not None:
+            periods.append({'metric': metric, 'start': df['start'].iloc[start], 'end': df['start'].iloc[i - 1],
+                            'turns': i - start, 'peak_pct': float(np.max(change[start:i]))})
+            start = None
+    return periods
+
+
+def plot_time_of_day(df, by_hour, by_weekday, periods, window, timezone, output):
+    """Per metric: median by hour of day, by weekday, and the timeline with its rolling median and drift periods"""
+    fig, axes = plt.subplots(len(METRICS), 3, figsize=(20, 5 * len(METRICS)), squeeze=False)
+    colors = folder_colors(3)
+    for row, (metric, (label, _)) in enumerate(METRICS.items()):
+        ax = axes[row][0]
+        ax.plot(by_hour['hour'], by_hour[f'{metric}_rel_p50'], marker='o', color=colors[0])
+        ax.axhline(1.0, color='gray', linestyle='--', linewidth=1)
+        ax.set_xticks(range(0, 24, 3))
+        ax.set_xlabel(f'Hour of day ({timezone})')
+        ax.set_ylabel(f'{label} / per-turn median')
+        ax.set_title(f'{label} by Hour of Day')
+        ax.grid(True, alpha=0.3)
+
+        ax = axes[row][1]
+        ax.bar([DAY_NAMES[d] for d in by_weekday['weekday']], by_weekday[f'{metric}_rel_p50'], color=colors[1], alpha=0.7)
+        ax.axhline(1.0, color='gray', linestyle='--', linewidth=1)
+        ax.set_ylabel(f'{label} / per-turn median')
+        ax.set_title(f'{label} by Day of Week')
+        ax.grid(True, alpha=0.3, axis='y')
+
+        ax = axes[row][2]
+        ax.scatter(df['start'], df[f'{metric}_rel'], s=6, alpha=0.3, color=colors[2])
+        ax.plot(df['start'], rolling_median(df, metric, window), color='black', linewidth=1.5,
+                label=f'Rolling median ({window})')
+        for period in (p for p in periods if p['metric'] == metric):
+            ax.axvspan(period['start'], period['end'], color='red', alpha=0.15)
+        ax.axhline(1.0, color='gray', linestyle='--', linewidth=1)
+        ax.set_ylabel(f'{label} / per-turn median')
+        ax.set_title(f'{label} over Time (drift periods shaded)')
+        ax.legend(fontsize=9)
+        ax.grid(True, alpha=0.3)
+        fig.autofmt_xdate()
+    plt.tight_layout()
+    plt.savefig(output, dpi=150, bbox_inches='tight')
+    show_figure(fig)
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="TTFT and throughput by time of day and day of week, and drift.")
+    parser.add_argument('folders', nargs='+', help="Result folders with turn_start_utc timestamps")
+    parser.add_argument('--timezone', default='UTC', help="Timezone of the hour / weekday breakdowns, e.g. US/Pacific")
+    parser.add_argument('--window', default=DEFAULT_WINDOW, help="Rolling window of the drift detection (pandas offset)")
+    parser.add_argument('--drift-pct', type=float, default=DEFAULT_DRIFT_PCT,
+                        help="Flag windows whose median is this much worse than typical")
+    parser.add_argument('--min-samples', type=int, default=MIN_WINDOW_SAMPLES, help="Turns a window needs")
+    parser.add_argument('--output-prefix', default='time_of_day')
+    args = parser.parse_args(argv)
+
+    for folder in args.folders:
+        if not os.path.exists(folder):
+            print(f"Warning: {folder} folder not found.")
+            return 1
+
+    df = load_timed(args.folders, args.timezone)
+    if df.empty:
+        print("No turns with timestamps.")
+        return 1
+    by_hour = breakdown(df, 'hour')
+    by_weekday = breakdown(df, 'weekday')
+    periods = [p for metric in METRICS
+               for p in drift_periods(df, metric, args.window, args.drift_pct, args.min_samples)]
+
+    print(f"\n=== Time of Day ({len(df)} turns, {df['start'].min():%Y-%m-%d %H:%M} to "
+          f"{df['start'].max():%Y-%m-%d %H:%M} UTC, hours in {args.timezone}) ===")
+    print(f"{'Hour':>4s} | {'Turns':>5s} | {'TTFT P50':>8s} | {'TTFT P90':>8s} | {'TTFT rel':>8s} | "
+          f"{'Tok/s P50':>9s} | {'Tok/s rel':>9s}")
+    print("-" * 72)
+    for row in by_hour.itertuples(index=False):
+        print(f"{row.hour:4d} | {row.turns:5d} | {row.ttft_p50:7.3f}s | {row.ttft_p90:7.3f}s | "
+              f"{row.ttft_rel_p50:8.2f} | {row.throughput_p50:9.1f} | {row.throughput_rel_p50:9.2f}")
+    print(f"\n{'Day':>4s} | {'Turns':>5s} | {'TTFT rel':>8s} | {'Tok/s rel':>9s}")
+    for row in by_weekday.itertuples(index=False):
+        print(f"{DAY_NAMES[row.weekday]:>4s} | {row.turns:5d} | {row.ttft_rel_p50:8.2f} | {row.throughput_rel_p50:9.2f}")
+
+    print("\nDifference between hours / weekdays (Kruskal-Wallis on per-turn relative values):")
+    for metric, (label, _) in METRICS.items():
+        print(f"  {label:16s} hour p={periodicity_test(df, 'hour', metric, args.min_samples):.4f}  "
+              f"weekday p={periodicity_test(df, 'weekday', metric, args.min_samples):.4f}")
+
+    print(f"\nDrift periods (rolling {args.window} median > {args.drift_pct:.0f}% worse than typical): {len(periods)}")
+    for period in periods:
+        print(f"  {METRICS[period['metric']][0]:16s} {period['start']:%Y-%m-%d %H:%M} to {period['end']:%m-%d %H:%M} UTC, "
+              f"{period['turns']} turns, peak {period['peak_pct']:+.0f}%")
+
+    df.to_csv(f"{args.output_prefix}_turns.csv", index=False)
+    by_hour.to_csv(f"{args.output_prefix}_by_hour.csv", index=False)
+    by_weekday.to_csv(f"{args.output_prefix}_by_weekday.csv", index=False)
+    pd.DataFrame(periods, columns=['metric', 'start', 'end', 'turns', 'peak_pct']).to_csv(
+        f"{args.output_prefix}_drift.csv", index=False)
+    plot_time_of_day(df, by_hour, by_weekday, periods, args.window, args.timezone, f"{args.output_prefix}.png")
+    print(f"\nSaved '{args.output_prefix}.png' and the by-hour, by-weekday, drift and turn CSVs.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import sys
+from contextlib import contextmanager
+
+SERVICE_NAME = "bedrock-prompt-caching"
+
+_tracer = None
+_span_file = None
+
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def record_exception(self, exception):
+        pass
+
+    def set_status(self, *args, **kwargs):
+        pass
+
+
+def configure_tracing(output_file=None, otlp_endpoint=None, service_name=SERVICE_NAME):
+    """
+    Install an OpenTelemetry tracer provider that exports spans to a JSON-lines file,
+    an OTLP/HTTP collector (e.g. http://localhost:4318/v1/traces), or both.
+    Requires opentelemetry-sdk (and opentelemetry-exporter-otlp-proto-http for a collector).
+    """
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        raise ImportError("Tracing requires opentelemetry-api and opentelemetry-sdk")
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    global _span_file
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    if output_file:
+        _span_file = open(output_file, "a")
+        provider.add_span_processor(BatchSpanProcessor(
+            ConsoleSpanExporter(out=_span_file, formatter=lambda span: span.to_json(indent=None) + "\n")))
+    if otlp_endpoint:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=otlp_endpoint)))
+
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+def get_tracer():
+    """
+    Tracer once OpenTelemetry is loaded (by configure_tracing() or an auto-instrumentation agent), else None.
+    OpenTelemetry is optional and is never imported here, so untraced runs do not pay for it at startup.
+    """
+    global _tracer
+    if _tracer is None and "opentelemetry.trace" in sys.modules:
+        _tracer = sys.modules["opentelemetry.trace"].get_tracer(SERVICE_NAME)
+    return _tracer
+
+
+@contextmanager
+def span(name, attributes=None):
+    """Start a span as the current span; exceptions are recorded on it and re-raised"""
+    tracer = get_tracer()
+    if tracer is None:
+        yield _NoopSpan()
+        return
+
+    with tracer.start_as_current_span(name, attributes=attributes, record_exception=False,
+                                      set_status_on_exception=False) as current:
+        try:
+            yield current
+        except Exception as e:
+            from opentelemetry.trace import Status, StatusCode
+
+            current.record_exception(e)
+            current.set_attribute("exception.type", type(e).__name__)
+            current.set_status(Status(StatusCode.ERROR, str(e)))
+            raise
+
+
+def shutdown_tracing():
+    """Flush pending spans before the process exits and close the span file"""
+    global _span_file
+    if "opentelemetry.trace" in sys.modules:
+        provider = sys.modules["opentelemetry.trace"].get_tracer_provider()
+        if hasattr(provider, "shutdown"):
+            provider.shutdown()
+    if _span_file is not None:
+        _span_file.close()
+        _span_file = None
@@ -0,0 +1,80 @@
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+
+from benchmark_runner import run_turn
+from run_log import get_logger, log_event
+
+log = get_logger()
+
+
+def run_interleaved(states, n_turns, think_time=0.0, interleave=1, profiler=None):
+    """
+    Run n_turns of every conversation state (see new_conversation), keeping at most `interleave`
+    conversations open at once. A conversation's next turn is due think_time seconds after its
+    previous turn ended; while it waits, turns of the other open conversations run, so the
+    process only sleeps when no turn is due. Turns run one at a time, so latencies are not
+    skewed by concurrent requests.
+
+    Every turn row gets think_time, turn_gap (the actual time since the conversation's previous
+    turn, which is what the cache TTL sees) and schedule_lag (how late the turn started).
+    Returns campaign totals: wall_time, busy_time, idle_time, max_schedule_lag.
+    """
+    pending = deque(states)
+    due_turns = []  # (due, sequence, state, turn, previous_turn_end)
+    sequence = itertools.count()
+
+    def open_next(now):
+        if pending:
+            heapq.heappush(due_turns, (now, next(sequence), pending.popleft(), 0, None))
+
+    campaign_start = time.monotonic()
+    for _ in range(max(1, interleave)):
+        open_next(campaign_start)
+
+    busy_time = idle_time = max_lag = 0.0
+    while due_turns:
+        due, _, state, turn, previous_end = heapq.heappop(due_turns)
+        wait = due - time.monotonic()
+        if wait > 0:
+            if profiler is not None:
+                profiler.set_phase("between turns")
+            time.sleep(wait)
+            idle_time += wait
+
+        start = time.monotonic()
+        if profiler is not None:
+            profiler.set_phase(f"exp {state['exp_num'] + 1} turn {turn + 1}")
+        turn_data = run_turn(state, turn, n_turns)
+        end = time.monotonic()
+        busy_time += end - start
+
+        lag = max(0.0, start - due)
+        if turn:
+            # First turns only wait for a free slot; the lag that matters is the one stretching think time
+            max_lag = max(max_lag, lag)
+        turn_data["think_time"] = think_time if turn else 0.0
+        turn_data["turn_gap"] = start - previous_end if previous_end is not None else 0.0
+        turn_data["schedule_lag"] = lag
+
+        if turn + 1 < n_turns:
+            heapq.heappush(due_turns, (end + think_time, next(sequence), state, turn + 1, end))
+        else:
+            log_event(log, logging.INFO, "conversation_done", experiment=state["exp_num"] + 1)
+            open_next(end)
+
+    if profiler is not None:
+        profiler.set_phase("between turns")
+    return {
+        "wall_time": time.monotonic() - campaign_start,
+        "busy_time": busy_time,
+        "idle_time": idle_time,
+        "max_schedule_lag": max_lag,
+    }
+
+
+def sequential_estimate(stats, n_conversations, n_turns, think_time):
+    """Wall time of the same campaign run one conversation at a time with a sleep after each turn"""
+    return stats["busy_time"] + n_conversations * max(0, n_turns - 1) * think_time